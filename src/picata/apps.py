@@ -10,7 +10,7 @@ class Config(AppConfig):
     name = "picata"
 
     def ready(self) -> None:
-        """Configure Wagtail admin with custom models, and register document transformers."""
+        """Configure Wagtail admin, register document transformers, and connect signals."""
         #
         # Register the 'custom article type' model with the Wagtail admin
         from wagtail_modeladmin.options import modeladmin_register
@@ -21,13 +21,152 @@ class Config(AppConfig):
 
         # Add document transformers to the HTMLProcessingMiddleware
         from picata.middleware import HTMLProcessingMiddleware
-        from picata.transformers import AnchorInserter, add_heading_ids
+        from picata.transformers import HEADING_TAGS, AnchorInserter, add_heading_ids
 
         ## Add ids to all headings missing them within html > body > main
         HTMLProcessingMiddleware.add_transformer(add_heading_ids)
 
         ## Add anchored pillcrows to headings in designated pages
         anchor_inserter = AnchorInserter(
-            root=".//article", targets=".//h1 | .//h2 | .//h3 | .//h4 | .//h5 | .//h6"
+            root=".//article",
+            targets=".//h1 | .//h2 | .//h3 | .//h4 | .//h5 | .//h6",
+            root_tag="article",
+            target_tags=HEADING_TAGS,
         )
         HTMLProcessingMiddleware.add_transformer(anchor_inserter)
+
+        # Keep pages' indexed dates, pre-rendered content and search documents in step
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from wagtail.models import Page
+        from wagtail.signals import (
+            page_published,
+            page_slug_changed,
+            page_unpublished,
+            post_page_move,
+        )
+
+        from picata.signals import (
+            clear_rendered_content,
+            copy_page_dates,
+            fill_related_articles,
+            forget_page_dates,
+            forget_related_articles,
+            forget_renderings_of_links,
+            forget_renderings_of_moved_links,
+            index_page_tags,
+            move_page_dates,
+            purge_cached_page,
+            purge_moved_page,
+            purge_renamed_page,
+            refresh_related_articles,
+            retire_cached_content,
+            retire_on_page_created,
+            schedule_artifacts,
+            schedule_export,
+            store_rendered_content,
+            unindex_page_tags,
+            update_search_document,
+        )
+
+        post_save.connect(copy_page_dates, dispatch_uid="picata_page_dates")
+        post_page_move.connect(move_page_dates, dispatch_uid="picata_page_dates_moved")
+        post_delete.connect(
+            forget_page_dates, sender=Page, dispatch_uid="picata_page_dates_deleted"
+        )
+        page_published.connect(store_rendered_content, dispatch_uid="picata_store_rendered")
+        page_unpublished.connect(clear_rendered_content, dispatch_uid="picata_clear_rendered")
+        page_published.connect(forget_renderings_of_links, dispatch_uid="picata_links_published")
+        page_unpublished.connect(
+            forget_renderings_of_links, dispatch_uid="picata_links_unpublished"
+        )
+        post_delete.connect(
+            forget_renderings_of_links, sender=Page, dispatch_uid="picata_links_deleted"
+        )
+        post_page_move.connect(forget_renderings_of_moved_links, dispatch_uid="picata_links_moved")
+        page_slug_changed.connect(
+            forget_renderings_of_moved_links, dispatch_uid="picata_links_renamed"
+        )
+        page_published.connect(update_search_document, dispatch_uid="picata_search_document")
+        page_published.connect(index_page_tags, dispatch_uid="picata_index_tags_published")
+        page_unpublished.connect(index_page_tags, dispatch_uid="picata_index_tags_unpublished")
+        post_delete.connect(unindex_page_tags, dispatch_uid="picata_unindex_tags_deleted")
+        page_published.connect(refresh_related_articles, dispatch_uid="picata_related_published")
+        page_unpublished.connect(forget_related_articles, dispatch_uid="picata_related_unpublished")
+        post_migrate.connect(fill_related_articles, sender=self, dispatch_uid="picata_related_fill")
+
+        # Retire cached results derived from content when pages change (after the above have
+        # updated what they derive from it, since receivers are called in order)
+        page_published.connect(retire_cached_content, dispatch_uid="picata_retire_published")
+        page_unpublished.connect(retire_cached_content, dispatch_uid="picata_retire_unpublished")
+        post_delete.connect(retire_cached_content, dispatch_uid="picata_retire_deleted")
+        post_page_move.connect(retire_cached_content, dispatch_uid="picata_retire_moved")
+        post_save.connect(retire_on_page_created, dispatch_uid="picata_retire_created")
+
+        # Rewrite the static sitemap and feeds (if enabled) once changes are committed
+        page_published.connect(schedule_artifacts, dispatch_uid="picata_artifacts_published")
+        page_unpublished.connect(schedule_artifacts, dispatch_uid="picata_artifacts_unpublished")
+        post_delete.connect(schedule_artifacts, dispatch_uid="picata_artifacts_deleted")
+
+        # Purge anonymous visitors' cached copies of changed pages, and their ancestors
+        page_published.connect(purge_cached_page, dispatch_uid="picata_purge_published")
+        page_unpublished.connect(purge_cached_page, dispatch_uid="picata_purge_unpublished")
+        post_delete.connect(purge_cached_page, dispatch_uid="picata_purge_deleted")
+        post_page_move.connect(purge_moved_page, dispatch_uid="picata_purge_moved")
+        page_slug_changed.connect(purge_renamed_page, dispatch_uid="picata_purge_renamed")
+
+        # Re-export affected pages of the static site (if enabled) once changes are committed
+        page_published.connect(schedule_export, dispatch_uid="picata_export_published")
+        page_unpublished.connect(schedule_export, dispatch_uid="picata_export_unpublished")
+
+        self.connect_image_receivers()
+
+    def connect_image_receivers(self) -> None:
+        """Connect the receivers of signals about images, renditions and social settings."""
+        from django.db.models.signals import post_delete, post_save
+        from wagtail.images import get_image_model
+        from wagtail.signals import page_published
+
+        from picata.models import SocialSettings
+        from picata.signals import (
+            forget_deleted_rendition,
+            forget_renderings_of_image,
+            forget_saved_image,
+            plan_page_renditions,
+            plan_social_renditions,
+            plan_upload_renditions,
+            schedule_placeholder,
+        )
+
+        # Generate image renditions (ahead of the requests for them) and placeholders in workers
+        page_published.connect(plan_page_renditions, dispatch_uid="picata_renditions_published")
+        post_save.connect(
+            plan_upload_renditions,
+            sender=get_image_model(),
+            dispatch_uid="picata_renditions_uploaded",
+        )
+        post_save.connect(
+            plan_social_renditions, sender=SocialSettings, dispatch_uid="picata_renditions_social"
+        )
+        post_save.connect(
+            schedule_placeholder, sender=get_image_model(), dispatch_uid="picata_placeholder"
+        )
+
+        # Stop serving deleted renditions' (and changed images') files by their cached paths
+        post_delete.connect(
+            forget_deleted_rendition,
+            sender=get_image_model().get_rendition_model(),
+            dispatch_uid="picata_forget_rendition",
+        )
+        post_save.connect(
+            forget_saved_image, sender=get_image_model(), dispatch_uid="picata_forget_image"
+        )
+
+        # Re-render stored article content showing images once they're changed or deleted
+        post_save.connect(
+            forget_renderings_of_image, sender=get_image_model(), dispatch_uid="picata_image_saved"
+        )
+        post_delete.connect(
+            forget_renderings_of_image,
+            sender=get_image_model(),
+            dispatch_uid="picata_image_deleted",
+        )
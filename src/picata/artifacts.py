@@ -0,0 +1,111 @@
+"""Static copies of the sitemap and article feeds, written to disk for nginx to serve.
+
+Each artifact is rendered by its usual Django view (against a request for the default
+`Site`), and written atomically, alongside gzip and (where the `brotli` package is
+installed) Brotli-compressed variants, under `PICATA_ARTIFACTS_ROOT`. The files are
+rewritten whenever a page is published, unpublished or deleted, and by
+`manage.py write_static_artifacts`; the views remain as a fallback for nginx, for any
+artifact that hasn't been written.
+"""
+
+import gzip
+import os
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+from wagtail.contrib.sitemaps.views import sitemap
+from wagtail.models import Site
+
+from picata.views import AtomArticleFeed, RSSArticleFeed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Files to write, relative to the artifacts root, with the path and view that produce them
+ARTIFACTS: dict[str, tuple[str, Callable[[HttpRequest], HttpResponse]]] = {
+    "sitemap.xml": ("/sitemap.xml", sitemap),
+    "feeds/rss/index.xml": ("/feeds/rss/", RSSArticleFeed()),
+    "feeds/atom/index.xml": ("/feeds/atom/", AtomArticleFeed()),
+}
+
+
+def artifacts_root() -> Path | None:
+    """Return the directory artifacts are written to, or None if they're disabled."""
+    root = getattr(settings, "PICATA_ARTIFACTS_ROOT", None)
+    return Path(root) if root else None
+
+
+def write_atomically(path: Path, content: bytes) -> None:
+    """Write `content` to `path` via a temporary file, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(content)
+        Path(temp_name).chmod(0o644)
+        Path(temp_name).replace(path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def variant_paths(path: Path) -> list[Path]:
+    """Return the paths of the precompressed variants written alongside `path`."""
+    suffixes = ["gz"] if brotli is None else ["gz", "br"]
+    return [path.with_name(f"{path.name}.{suffix}") for suffix in suffixes]
+
+
+def write_variants(path: Path, content: bytes) -> list[Path]:
+    """Write precompressed `.gz` (and `.br`) variants of `content`, alongside `path`."""
+    written = []
+    for variant in variant_paths(path):
+        if variant.suffix == ".gz":
+            write_atomically(variant, gzip.compress(content, compresslevel=9, mtime=0))
+        else:
+            write_atomically(variant, brotli.compress(content))
+        written.append(variant)
+    return written
+
+
+def write_with_variants(path: Path, content: bytes) -> list[Path]:
+    """Write `content` to `path`, with precompressed `.gz` and `.br` siblings."""
+    write_atomically(path, content)
+    return [path, *write_variants(path, content)]
+
+
+def site_request(path: str, site: Site | None = None) -> HttpRequest:
+    """Return a GET request for `path` on a `Site` (by default, the default site)."""
+    site = site or Site.objects.get(is_default_site=True)
+    secure = site.port == 443  # noqa: PLR2004
+    host = site.hostname if site.port in {80, 443} else f"{site.hostname}:{site.port}"
+    return RequestFactory().get(path, headers={"host": host}, secure=secure)
+
+
+def render_artifact(path: str, view: Callable[[HttpRequest], HttpResponse]) -> bytes:
+    """Render the response of `view` to a request for `path`."""
+    response = view(site_request(path))
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code != 200:  # noqa: PLR2004
+        raise RuntimeError(f"Rendering {path} returned HTTP {response.status_code}")
+    return response.content
+
+
+def write_artifacts(root: Path | None = None) -> list[Path]:
+    """Render and write every artifact under `root` (by default, `PICATA_ARTIFACTS_ROOT`).
+
+    Returns the paths written, or an empty list if artifacts are disabled.
+    """
+    root = root or artifacts_root()
+    if root is None:
+        return []
+    written = []
+    for name, (path, view) in ARTIFACTS.items():
+        written += write_with_variants(root / name, render_artifact(path, view))
+    return written
@@ -1,9 +1,15 @@
 """Wagtail "blocks"."""
 
+import copy
+import hashlib
+from functools import cache
+
 import pygments
 from django.forms import CharField
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from pygments import formatters, lexers
+from pygments.lexer import Lexer
 from pygments.util import ClassNotFound
 from wagtail.blocks import (
     CharBlock,
@@ -12,15 +18,51 @@ from wagtail.blocks import (
     ListBlock,
     RichTextBlock,
     StreamBlock,
+    StreamValue,
     StructBlock,
     TextBlock,
     URLBlock,
 )
 from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.models import AbstractImage
 
+from picata.caches import ResultCache, cache_from_settings
+from picata.renditions import RESPONSIVE, picture_images, picture_tag
+from picata.transformers import annotate_headings
 from picata.typing.wagtail import BlockRenderContext, BlockRenderValue
 from picata.validators import HREFValidator
 
+DEFAULT_HIGHLIGHT_CACHE = {
+    "BACKEND": "picata.caches.TieredCache",
+    "OPTIONS": {"max_entries": 512, "key_prefix": "picata:pygments"},
+}
+
+# Pygments' HTML formatter keeps no state between calls, so one instance serves all
+HTML_FORMATTER = formatters.HtmlFormatter(cssclass="pygments")
+
+
+@cache
+def get_highlight_cache() -> ResultCache:
+    """Return the cache of highlighted code, as configured by `PICATA_HIGHLIGHT_CACHE`."""
+    return cache_from_settings("PICATA_HIGHLIGHT_CACHE", DEFAULT_HIGHLIGHT_CACHE)
+
+
+@cache
+def get_lexer(language: str) -> Lexer:
+    """Return the (shared) Pygments lexer for a language; raises `ClassNotFound` if unknown."""
+    return lexers.get_lexer_by_name(language)
+
+
+def highlight(code: str, language: str) -> str:
+    """Return `code` highlighted as HTML, memoised by language and a hash of the code."""
+    key = f"{language}:{hashlib.sha256(code.encode()).hexdigest()}"
+    highlight_cache = get_highlight_cache()
+    highlighted_code = highlight_cache.get(key)
+    if highlighted_code is None:
+        highlighted_code = pygments.highlight(code, get_lexer(language), HTML_FORMATTER)
+        highlight_cache.set(key, highlighted_code)
+    return highlighted_code
+
 
 class HREFField(CharField):
     """Custom field for href attributes (i.e. URLs but also schemes like 'mailto:')."""
@@ -128,9 +170,7 @@ class CodeBlock(StructBlock):
         language = value.get("language", "plaintext")
 
         try:
-            lexer = lexers.get_lexer_by_name(language)
-            formatter = formatters.HtmlFormatter(cssclass="pygments")
-            highlighted_code = pygments.highlight(code, lexer, formatter)
+            highlighted_code = highlight(code, language)
         except ClassNotFound:
             highlighted_code = f"<pre><code>{code}</code></pre>"
 
@@ -159,6 +199,15 @@ class SectionBlock(StructBlock):
         help_text=None,
     )
 
+    def render_basic(self, value: BlockRenderValue, context: BlockRenderContext = None) -> str:
+        """Render the section's heading, at its level, followed by its content."""
+        return format_html(
+            "<section><h{level}>{heading}</h{level}>{content}</section>",
+            level=value.get("level") or 2,
+            heading=value.get("heading", ""),
+            content=self.child_blocks["content"].render(value.get("content"), context),
+        )
+
     class Meta:
         """Meta-info for the block."""
 
@@ -166,14 +215,52 @@ class SectionBlock(StructBlock):
         label = "Section"
 
 
+class AnchoredStreamBlock(StreamBlock):
+    """A StreamBlock giving headings in its rendered output ids and anchored pilcrows.
+
+    Annotating headings as the stream renders does the work of the `add_heading_ids`
+    and `AnchorInserter` document transformers, for pages that render their content
+    this way. When rendered with `{% include_block %}`, ids are kept unique against
+    a `heading_ids` set in the template context.
+    """
+
+    def render_basic(self, value: StreamValue, context: BlockRenderContext = None) -> str:
+        """Render each child block, then annotate the headings in the result."""
+        html = super().render_basic(value, context)
+        seen_ids = context.get("heading_ids") if context else None
+        return mark_safe(annotate_headings(html, seen_ids))  # noqa: S308
+
+
 class WrappedImageChooserBlock(ImageChooserBlock):
-    """An ImageChooserBlock that wraps the output in a div."""
+    """An ImageChooserBlock rendering a responsive `<picture>`, wrapped in a div.
+
+    Only the first image on a page (tracked by an `image_ids` set in the template context)
+    is loaded eagerly; the rest are probably below the fold, so load lazily. Images with an
+    `ImagePlaceholder` show it (and their dominant colour) in their place until they load.
+    A stream's images are loaded together, with their renditions and placeholders.
+    """
+
+    # Renditions to generate ahead of requests (see `picata.renditions`)
+    planned_filter_specs = (RESPONSIVE,)
+
+    def bulk_to_python(self, values: list[int | None]) -> list[AbstractImage | None]:
+        """Load the images for a stream's blocks, with their renditions and placeholders."""
+        images = picture_images().in_bulk(values)
+        # Like Wagtail's chooser blocks, give each block its own instance of a repeated image
+        return [copy.copy(images.get(image_id)) for image_id in values]
 
     def render_basic(self, value: BlockRenderValue, context: BlockRenderContext = None) -> str:
-        """Render the image wrapped in a div with a custom class."""
+        """Render the image's responsive variants wrapped in a div with a custom class."""
         if not value:  # If no image is selected, return an empty string
             return ""
 
-        # Use Wagtail's default rendering for the image, wrapped in a <div>
-        image_tag = super().render_basic(value, context)
-        return f'<div class="image-wrapper">{image_tag}</div>'
+        shown_ids = context.get("image_ids") if context else None
+        placeholder = getattr(value, "placeholder", None)
+        picture = picture_tag(
+            value,
+            lazy=shown_ids is None or bool(shown_ids),
+            attributes={"style": placeholder.style()} if placeholder else None,
+        )
+        if shown_ids is not None:
+            shown_ids.add(value.pk)
+        return format_html('<div class="image-wrapper">{}</div>', picture)
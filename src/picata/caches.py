@@ -0,0 +1,199 @@
+"""Pluggable, size-bounded caches for memoising expensive and deterministic work.
+
+Results derived from the site's content can include the current `content_generation`
+in their keys; bumping it (as page publishing signals do) retires them all at once.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class ResultCache(Protocol):
+    """Interface shared by every cache backend in this module."""
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Return the value stored under `key`, or None on a miss."""
+
+    def set(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store `value` under `key`."""
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache, if present."""
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+
+
+class LRUCache:
+    """Thread-safe, in-process cache holding at most `max_entries` items.
+
+    The least-recently read or written entry is evicted once the cache is full.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        """Set the size bound and initialise empty storage."""
+        if max_entries < 1:
+            raise ValueError("LRUCache needs room for at least one entry.")
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Return the value stored under `key` and mark it most-recently used."""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store `value` under `key`, evicting the least-recently used entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache, if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries currently held."""
+        return len(self._data)
+
+
+class DjangoCache:
+    """Adapter exposing one of Django's configured `CACHES` as a `ResultCache`.
+
+    Entries are shared between worker processes; size bounds and eviction are
+    left to the Django cache backend (e.g. `MAX_ENTRIES` in its `OPTIONS`).
+    """
+
+    def __init__(
+        self, alias: str = "default", key_prefix: str = "picata", timeout: int | None = None
+    ) -> None:
+        """Remember which Django cache to use, how to namespace keys, and for how long."""
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+
+    @property
+    def cache(self) -> Any:  # noqa: ANN401
+        """Return the (thread-local) Django cache connection."""
+        return caches[self.alias]
+
+    def make_key(self, key: str) -> str:
+        """Namespace `key` so different picata caches can share one Django cache."""
+        return f"{self.key_prefix}:{key}"
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Return the value stored under `key`, or None on a miss."""
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store `value` under `key` for the configured timeout."""
+        self.cache.set(self.make_key(key), value, self.timeout)
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache, if present."""
+        self.cache.delete(self.make_key(key))
+
+    def clear(self) -> None:
+        """Clear the whole underlying Django cache (which may be shared with others)."""
+        self.cache.clear()
+
+
+class TieredCache:
+    """An in-process `LRUCache` in front of a `DjangoCache` shared between processes.
+
+    Reads are answered locally where possible, and fall through to the shared cache
+    (re-populating the local tier on a hit); writes go to both tiers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        alias: str = "default",
+        key_prefix: str = "picata",
+        timeout: int | None = None,
+    ) -> None:
+        """Create both tiers from their respective options."""
+        self.local = LRUCache(max_entries)
+        self.shared = DjangoCache(alias, key_prefix, timeout)
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Return the value stored under `key` in either tier, or None on a miss."""
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:  # noqa: ANN401
+        """Store `value` under `key` in both tiers."""
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from both tiers."""
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self) -> None:
+        """Clear both tiers."""
+        self.local.clear()
+        self.shared.clear()
+
+
+def cache_from_settings(setting_name: str, default: dict[str, Any]) -> ResultCache:
+    """Instantiate a cache from a `{"BACKEND": …, "OPTIONS": {…}}` dict in the settings."""
+    config = getattr(settings, setting_name, default)
+    backend = import_string(config["BACKEND"])
+    return backend(**config.get("OPTIONS", {}))
+
+
+CONTENT_GENERATION_KEY = "picata:content-generation"
+
+
+def generation_cache() -> Any:  # noqa: ANN401
+    """Return the Django cache holding the content generation (see `PICATA_GENERATION_CACHE`).
+
+    Use a cache shared between worker processes (e.g. Redis or Memcached) for changes
+    in one process to retire results cached by the others.
+    """
+    return caches[getattr(settings, "PICATA_GENERATION_CACHE", "default")]
+
+
+def content_generation() -> int:
+    """Return the current content generation."""
+    cache = generation_cache()
+    generation = cache.get(CONTENT_GENERATION_KEY)
+    if generation is None:
+        # Start from the clock, so a lost counter never returns to a generation used before
+        cache.add(CONTENT_GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(CONTENT_GENERATION_KEY)
+    return generation
+
+
+def bump_content_generation() -> int:
+    """Start a new content generation, retiring every result keyed on the previous one."""
+    cache = generation_cache()
+    try:
+        return cache.incr(CONTENT_GENERATION_KEY)
+    except ValueError:  # The counter's been lost (or was never set)
+        return content_generation()
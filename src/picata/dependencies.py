@@ -0,0 +1,31 @@
+"""Tracking of which pages are shown (e.g. as previews or links) in the rendering of another.
+
+Code that shows other pages calls `note_included` with their ids. While a rendering runs
+inside `tracking_inclusions`, those ids are collected, so a static export knows which
+pages to re-render when one of them changes (see `picata.export`); otherwise, noting
+them costs nothing.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_included: ContextVar[set[int] | None] = ContextVar("picata_included_pages", default=None)
+
+
+@contextmanager
+def tracking_inclusions() -> Iterator[set[int]]:
+    """Collect the ids of every page noted as included within the block."""
+    included: set[int] = set()
+    token = _included.set(included)
+    try:
+        yield included
+    finally:
+        _included.reset(token)
+
+
+def note_included(page_ids: Iterable[int]) -> None:
+    """Record that the given pages are shown in whatever's being rendered."""
+    included = _included.get()
+    if included is not None:
+        included.update(page_ids)
@@ -0,0 +1,223 @@
+"""Export of the public site as static files, for nginx to serve without Django.
+
+Every live, public page of the default `Site` is rendered through the full middleware
+stack (including `HTMLProcessingMiddleware`, but bypassing the page cache) and written
+to `<root>/<path>/index.html`, with precompressed variants, alongside the sitemap and
+feeds (see `picata.artifacts`). Full exports render in a pool of worker processes, into
+a fresh directory that then replaces the old one.
+
+Each rendering notes the other pages it shows (see `picata.dependencies`), and these are
+kept as `ExportDependency` rows. Publishing, unpublishing or deleting a page then
+re-exports just the page, its ancestors, and the pages that show it (or, for pages in the
+menus, which every page shows, the whole site), in the background. Exports hold a lock
+on their directory, so they're written one at a time. Requests with query strings (e.g.
+listings' later pages) and from logged-in users are left to Django; see
+`config/nginx-site-export.conf`.
+"""
+
+# NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
+# pyright: reportAttributeAccessIssue=false
+
+import fcntl
+import logging
+import os
+import shutil
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections, transaction
+from wagtail.models import Page, Site
+from wagtail.query import PageQuerySet
+
+from picata.artifacts import site_request, write_artifacts, write_with_variants
+from picata.dependencies import tracking_inclusions
+from picata.models import ExportDependency, RelatedArticle
+from picata.page_cache import RENDER_AFRESH
+
+logger = logging.getLogger(__name__)
+
+# Number of pages each worker process renders per task
+BATCH_SIZE = 25
+
+# Pages rendered by a batch, each mapped to the ids of the other pages it shows
+ExportResults = dict[int, set[int]]
+
+_handler: BaseHandler | None = None
+
+
+def export_root() -> Path | None:
+    """Return the directory the site's exported to, or None if exports are disabled."""
+    root = getattr(settings, "PICATA_EXPORT_ROOT", None)
+    return Path(root) if root else None
+
+
+@contextmanager
+def export_lock(root: Path) -> Iterator[None]:
+    """Hold the lock on the export at `root` (shared between processes) until exiting."""
+    root.parent.mkdir(parents=True, exist_ok=True)
+    with root.with_name(f"{root.name}.lock").open("w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def get_handler() -> BaseHandler:
+    """Return this process's handler for requests, through the configured middleware."""
+    global _handler  # noqa: PLW0603
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    return _handler
+
+
+def exportable_pages(site: Site) -> PageQuerySet:
+    """Return the pages of `site` anyone can see, i.e. that are live and unrestricted."""
+    return site.root_page.get_descendants(inclusive=True).live().public().order_by("path")
+
+
+def page_path(url_path: str, site: Site) -> str:
+    """Return the path a page (by its `url_path`) is served at on `site`."""
+    return "/" + url_path[len(site.root_page.url_path) :]
+
+
+def output_file(root: Path, path: str) -> Path:
+    """Return the file a page served at `path` is exported to."""
+    return root / path.strip("/") / "index.html"
+
+
+def render_page(path: str, site: Site) -> tuple[int, bytes, set[int]]:
+    """Render the page at `path`, returning its status, content and the pages it shows."""
+    request = site_request(path, site)
+    request.META[RENDER_AFRESH] = True
+    with tracking_inclusions() as included:
+        response = get_handler().get_response(request)
+        content = b"".join(response) if response.streaming else response.content
+    # NB: Not `response.close()`, whose `request_finished` signal closes the DB connection
+    return response.status_code, content, included
+
+
+def export_batch(root: Path, site: Site, batch: list[tuple[int, str]]) -> ExportResults:
+    """Render and write a batch of pages (by id and path), returning those exported."""
+    results = {}
+    for page_id, path in batch:
+        status, content, included = render_page(path, site)
+        if status != 200:  # noqa: PLR2004
+            logger.warning(f"Not exporting {path}, which returned HTTP {status}")
+            continue
+        write_with_variants(output_file(root, path), content)
+        results[page_id] = included - {page_id}
+    return results
+
+
+def export_pages(root: Path, site: Site, pages: PageQuerySet, workers: int = 1) -> ExportResults:
+    """Render and write pages of `site` under `root`, in `workers` processes."""
+    batches = [
+        [(page.pk, page_path(page.url_path, site)) for page in batch]
+        for batch in (pages[i : i + BATCH_SIZE] for i in range(0, pages.count(), BATCH_SIZE))
+    ]
+    render = partial(export_batch, root, site)
+    if workers <= 1 or len(batches) <= 1:
+        return {page_id: ids for batch in batches for page_id, ids in render(batch).items()}
+
+    # Forked workers mustn't share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+        return {
+            page_id: ids
+            for results in pool.map(render, batches)
+            for page_id, ids in results.items()
+        }
+
+
+def record_dependencies(results: ExportResults, *, replace_all: bool = False) -> None:
+    """Store the pages shown on each exported page, replacing any recorded before."""
+    with transaction.atomic():
+        previous = ExportDependency.objects.all()
+        if not replace_all:
+            previous = previous.filter(page__in=results.keys())
+        previous.delete()
+        ExportDependency.objects.bulk_create(
+            ExportDependency(page_id=page_id, included_id=included_id)
+            for page_id, included_ids in results.items()
+            for included_id in included_ids
+        )
+
+
+def export_site(root: Path | None = None, workers: int | None = None) -> int:
+    """Export every public page, the sitemap and feeds, returning the number of pages.
+
+    The export's written to a sibling of `root` (by default, `PICATA_EXPORT_ROOT`), which
+    then replaces it, so pages that are no longer public disappear with it.
+    """
+    root = root or export_root()
+    if root is None:
+        raise ValueError("No export directory; set PICATA_EXPORT_ROOT.")
+    site = Site.objects.select_related("root_page").get(is_default_site=True)
+    staging, retired = root.with_name(f"{root.name}.new"), root.with_name(f"{root.name}.old")
+    with export_lock(root):
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        workers = workers or os.cpu_count() or 1
+        results = export_pages(staging, site, exportable_pages(site), workers)
+        write_artifacts(staging)
+        record_dependencies(results, replace_all=True)
+
+        shutil.rmtree(retired, ignore_errors=True)
+        if root.exists():
+            root.rename(retired)
+        staging.rename(root)
+        shutil.rmtree(retired, ignore_errors=True)
+    return len(results)
+
+
+def affected_page_ids(page: Page) -> set[int] | None:
+    """Return the ids of pages whose export shows a page, or None if every page does."""
+    if page.show_in_menus:
+        return None
+    return (
+        {page.pk}
+        | set(page.get_ancestors().values_list("pk", flat=True))
+        | set(ExportDependency.objects.filter(included=page).values_list("page", flat=True))
+        | set(RelatedArticle.objects.filter(target_id=page.pk).values_list("source", flat=True))
+    )
+
+
+def export_page_changes(page_id: int, url_path: str, affected_ids: set[int] | None) -> int:
+    """Re-export the pages affected by a page being published, unpublished or deleted.
+
+    The page's `url_path` and `affected_ids` (see `affected_page_ids`) are found as it
+    changes, since neither can be once it's been deleted. Pages that are no longer public
+    have their files removed, and the sitemap and feeds are rewritten. Nothing's done until
+    the site's first been exported in full. Returns the number of pages re-exported.
+    """
+    root = export_root()
+    if root is None or not root.exists():
+        return 0
+    if affected_ids is None:
+        return export_site(root, workers=1)
+
+    site = Site.objects.select_related("root_page").get(is_default_site=True)
+    with export_lock(root):
+        pages = exportable_pages(site).filter(pk__in=affected_ids)
+        results = export_pages(root, site, pages)
+        withdrawn_ids = affected_ids - results.keys()
+        withdrawn_paths = dict(
+            Page.objects.filter(pk__in=withdrawn_ids).values_list("pk", "url_path")
+        )
+        if page_id in withdrawn_ids:
+            withdrawn_paths.setdefault(page_id, url_path)
+        for withdrawn_path in withdrawn_paths.values():
+            if withdrawn_path.startswith(site.root_page.url_path):
+                index = output_file(root, page_path(withdrawn_path, site))
+                for file in index.parent.glob(f"{index.name}*"):
+                    file.unlink()
+        ExportDependency.objects.filter(page__in=withdrawn_ids).delete()
+        record_dependencies(results)
+        write_artifacts(root)
+    return len(results)
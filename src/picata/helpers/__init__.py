@@ -4,6 +4,8 @@
 # pyright: reportAttributeAccessIssue=false
 
 import re
+from collections.abc import AsyncIterable, Iterable
+from datetime import datetime
 from ipaddress import AddressValueError, IPv4Address
 
 from django.apps import apps
@@ -14,6 +16,9 @@ from lxml.etree import _Element
 # Pre-compile commonly used regular expressions
 ALPHANUMERIC_REGEX = re.compile(r"[^a-zA-Z0-9]")
 
+# Position in a date-ordered listing: the (effective) date and id of the last row seen
+DateCursor = tuple[datetime | None, int]
+
 
 def get_models_of_type(base_type: type[Model]) -> list[type[Model]]:
     """Retrieve all concrete subclasses of the given base Model type."""
@@ -44,28 +49,58 @@ def get_public_ip() -> IPv4Address | None:
     return None
 
 
+def encode_date_cursor(cursor: DateCursor) -> str:
+    """Serialise a listing cursor for use in a query string."""
+    date, pk = cursor
+    return f"{date.isoformat() if date else ''}_{pk}"
+
+
+def decode_date_cursor(token: str | None) -> DateCursor | None:
+    """Parse a listing cursor from a query string, returning None if it's missing or invalid."""
+    if not token:
+        return None
+    date, _, pk = token.rpartition("_")
+    try:
+        return (datetime.fromisoformat(date) if date else None, int(pk))
+    except ValueError:
+        return None
+
+
 def get_full_text(element: _Element) -> str:
     """Extract text from an element and its descendants, concatenate it, and trim whitespace."""
     return "".join(element.xpath(".//text()")).strip()
 
 
 def make_response(
-    original_response: HttpResponse,
-    new_content: str | bytes,
-) -> HttpResponse:
-    """Create a new HttpResponse while preserving attributes from the original response."""
+    original_response: HttpResponse | StreamingHttpResponse,
+    new_content: str | bytes | Iterable[bytes] | AsyncIterable[bytes],
+) -> HttpResponse | StreamingHttpResponse:
+    """Create a new response while preserving attributes from the original response.
+
+    A `StreamingHttpResponse` is replaced by another, streaming `new_content` (which
+    should then be an iterable, or async iterable, of byte-strings).
+    """
+    new_response: HttpResponse | StreamingHttpResponse
     if isinstance(original_response, StreamingHttpResponse):
-        raise TypeError("StreamingHttpResponse objects are not supported.")
-    new_response = HttpResponse(
-        content=new_content,
-        content_type=original_response.get("Content-Type", None),
-        status=original_response.status_code,
-    )
+        if isinstance(new_content, str | bytes):
+            raise TypeError("StreamingHttpResponse content must be an iterable of bytes.")
+        new_response = StreamingHttpResponse(
+            streaming_content=new_content,
+            content_type=original_response.get("Content-Type", None),
+            status=original_response.status_code,
+        )
+    else:
+        new_response = HttpResponse(
+            content=new_content,
+            content_type=original_response.get("Content-Type", None),
+            status=original_response.status_code,
+        )
     for key, value in original_response.headers.items():
-        new_response[key] = value
+        if key.lower() != "content-length":  # The content's been replaced
+            new_response[key] = value
     new_response.cookies = original_response.cookies
     for attr in dir(original_response):
-        if not attr.startswith("_") and not hasattr(HttpResponse, attr):
+        if not attr.startswith("_") and not hasattr(type(new_response), attr):
             setattr(new_response, attr, getattr(original_response, attr))
 
     return new_response
@@ -3,12 +3,19 @@
 # NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
 # pyright: reportAttributeAccessIssue=false
 
+from collections import defaultdict
+from collections.abc import Iterable
+from functools import reduce
+from operator import or_
 from typing import Any, cast
 
-from wagtail.models import Page
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q, prefetch_related_objects
+from wagtail.models import Page, Site
 from wagtail.query import PageQuerySet
 
-from picata.models import TaggedPage
+from picata.dependencies import note_included
+from picata.models import Article, BasePage, PageTagRelation, PostSeries, TaggedPage
 from picata.typing import UserOrNot
 
 from . import get_models_of_type
@@ -18,40 +25,58 @@ TAGGED_PAGE_TYPES = get_models_of_type(TaggedPage)
 
 def visible_pages_qs(user: UserOrNot = None, page_qs: PageQuerySet | None = None) -> PageQuerySet:
     """Return a QuerySet of all pages derived from `Page` visible to the user."""
-    pages = page_qs if page_qs else cast(PageQuerySet, Page.objects.all())
+    pages = page_qs if page_qs is not None else cast(PageQuerySet, Page.objects.all())
     if not user or not user.is_authenticated:
         pages = pages.live()
     return pages
 
 
-def filter_pages_by_tags(pages: list[Page], tags: set[str]) -> list[TaggedPage]:
-    """Filter a list of pages to those containing all of a list of tags."""
-    filtered_pages = []
-    for page in pages:
-        try:
-            if isinstance(page, tuple(TAGGED_PAGE_TYPES)):
-                page_tags = {tag.name for tag in page.tags.all()}
-                if set(tags).issubset(page_tags):
-                    filtered_pages.append(page)
-        except AttributeError:
-            continue
-    return filtered_pages
-
-
-def filter_pages_by_type(pages: list[Page], page_type_slugs: set[str]) -> list[Page]:
-    """Filter a list of pages to those with a `page_type` matching any of the given slugs."""
-    filtered_pages = []
+def filter_pages_by_tags(
+    pages: PageQuerySet, tags: set[str], *, live_only: bool = False
+) -> PageQuerySet:
+    """Filter pages to those tagged with all of the given tags (by name).
+
+    When only live pages are wanted, their ids are taken from the precomputed tag index.
+    """
+    if live_only:
+        from picata.tag_index import get_tag_index
+
+        return pages.filter(id__in=sorted(get_tag_index().pages_tagged_with_all(tags)))
+
+    tagged_with_all = (
+        PageTagRelation.objects.filter(tag__name__in=tags)
+        .values("content_object_id")
+        .annotate(matched=Count("tag", distinct=True))
+        .filter(matched=len(tags))
+        .values("content_object_id")
+    )
+    return pages.filter(id__in=tagged_with_all)
+
+
+def filter_pages_by_type(pages: PageQuerySet, page_type_slugs: set[str]) -> PageQuerySet:
+    """Filter pages to those with a `page_type` matching any of the given slugs."""
+    of_type = Article.objects.filter(page_type__slug__in=page_type_slugs).values("pk")
+    return pages.filter(id__in=of_type)
+
+
+def bulk_specific(pages: Iterable[Page]) -> list[Page]:
+    """Return the specific instance of each page, in the order given.
+
+    Pages are grouped by content type, and each concrete model is fetched with a single
+    query (unlike `page.specific`, which costs a query per page). Pages whose model no
+    longer exists are returned as they are.
+    """
+    pages = list(pages)
+    ids_by_content_type = defaultdict(list)
     for page in pages:
-        try:
-            if (
-                hasattr(page, "page_type")
-                and page.page_type
-                and page.page_type.slug in page_type_slugs
-            ):
-                filtered_pages.append(page)
-        except AttributeError:
-            continue
-    return filtered_pages
+        ids_by_content_type[page.content_type_id].append(page.pk)
+
+    specific_by_id: dict[int, Page] = {}
+    for content_type_id, ids in ids_by_content_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is not None:
+            specific_by_id.update(model.objects.in_bulk(ids))
+    return [specific_by_id.get(page.pk, page) for page in pages]
 
 
 def page_preview_data(page: Page, user: UserOrNot) -> dict[str, Any]:
@@ -60,3 +85,49 @@ def page_preview_data(page: Page, user: UserOrNot) -> dict[str, Any]:
     if hasattr(page, "get_publication_data"):
         page_data.update(page.get_publication_data())
     return page_data
+
+
+def prefetch_preview_data(pages: Iterable[Page], user: UserOrNot) -> list[Page]:
+    """Load everything `page_preview_data` needs for many pages, in a fixed number of queries.
+
+    Loads the parts of any `PostSeries` (visible to `user`), each page's latest revision
+    and site, and the tags and type of each `Article`. Returns the pages passed in.
+    """
+    pages = list(pages)
+
+    # Fetch the parts of every series together, and hand them out to their parents
+    series = [page for page in pages if isinstance(page, PostSeries)]
+    parts: list[Page] = []
+    if series:
+        in_any_series = reduce(or_, (Q(path__startswith=s.path, depth=s.depth + 1) for s in series))
+        parts = list(Article.objects.filter(in_any_series).live_for_user(user).by_date())
+        parts_by_parent_path = defaultdict(list)
+        for part in parts:
+            parts_by_parent_path[part.path[: -Page.steplen]].append(part)
+        for series_page in series:
+            series_page.prefetched_parts = parts_by_parent_path[series_page.path]
+
+    all_pages = [*pages, *parts]
+    prefetch_related_objects(all_pages, "latest_revision")
+    prefetch_related_objects(
+        [page for page in all_pages if isinstance(page, Article)], "page_type", "tags"
+    )
+
+    # Sites are looked up from the (cached) site root paths, with one query for the lot
+    unsited_pages = [
+        page for page in all_pages if isinstance(page, BasePage) and not page.has_cached_site()
+    ]
+    if unsited_pages:
+        sites = {site.pk: site for site in Site.objects.all()}
+        for page in unsited_pages:
+            url_parts = page.get_url_parts()
+            page.cache_site(sites.get(url_parts[0]) if url_parts else None)
+
+    return pages
+
+
+def bulk_page_preview_data(pages: Iterable[Page], user: UserOrNot) -> list[dict[str, Any]]:
+    """Return `page_preview_data` for each of many pages, using a fixed number of queries."""
+    pages = prefetch_preview_data(pages, user)
+    note_included(page.pk for page in pages)
+    return [page_preview_data(page, user) for page in pages]
@@ -0,0 +1,16 @@
+"""Rich text image formats, rendering responsive `<picture>`s (found by Wagtail on start-up)."""
+
+from django.utils.translation import gettext_lazy as _
+from wagtail.images.formats import register_image_format, unregister_image_format
+
+from picata.renditions import ResponsiveFormat
+
+# Replace Wagtail's default formats with responsive ones, of the same names and widths
+for name in ("fullwidth", "left", "right"):
+    unregister_image_format(name)
+
+register_image_format(
+    ResponsiveFormat("fullwidth", _("Full width"), "richtext-image full-width", 800)
+)
+register_image_format(ResponsiveFormat("left", _("Left-aligned"), "richtext-image left", 500))
+register_image_format(ResponsiveFormat("right", _("Right-aligned"), "richtext-image right", 500))
@@ -0,0 +1 @@
+"""Django management tooling for the Picata application."""
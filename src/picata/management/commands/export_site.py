@@ -0,0 +1,33 @@
+"""Management command to export the public site as static files."""
+
+import os
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from picata.export import export_root, export_site
+
+
+class Command(BaseCommand):
+    """Pre-render every public page (and the sitemap and feeds) for nginx to serve."""
+
+    help = "Render every live, public page to PICATA_EXPORT_ROOT, in parallel."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Allow choosing the directory and the number of worker processes."""
+        parser.add_argument("--root", type=Path, help="Directory to export the site to.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes to render pages in (default: one per CPU).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Export the site."""
+        root = options["root"] or export_root()
+        if root is None:
+            raise CommandError("Set PICATA_EXPORT_ROOT or pass --root.")
+        count = export_site(root, options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} pages to {root}."))
@@ -0,0 +1,37 @@
+"""Management command to generate every image rendition (and placeholder) the site will use."""
+
+from concurrent.futures import wait
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from wagtail.images import get_image_model
+from wagtail.models import Page
+
+from picata.placeholders import store_placeholder
+from picata.renditions import plan_site, submit_job, submit_plan
+
+
+class Command(BaseCommand):
+    """Plan the renditions shown by every live page (and social image), and generate them."""
+
+    help = (
+        "Generate missing image renditions and placeholders, in PICATA_RENDITION_WORKERS processes."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Generate the renditions and placeholders, waiting for every worker to finish."""
+        plan = plan_site(Page.objects.live().specific().iterator())
+        image_ids = list(get_image_model().objects.values_list("pk", flat=True))
+        futures = submit_plan(plan)
+        futures += [submit_job(store_placeholder, image_id) for image_id in image_ids]
+        done, _ = wait(futures)
+        failed = [future for future in done if future.exception() is not None]
+        for future in failed:
+            self.stderr.write(f"Failed: {future.exception()}")
+        specs = sum(len(filter_specs) for filter_specs in plan.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Planned {specs} renditions of {len(plan)} images, and checked "
+                f"{len(image_ids)} placeholders ({len(failed)} failures)."
+            )
+        )
@@ -0,0 +1,18 @@
+"""Management command to recompute related articles for every live article."""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from picata.related import rebuild_related_articles
+
+
+class Command(BaseCommand):
+    """Rescore all related articles, e.g. after tuning weights or importing articles."""
+
+    help = "Recompute the related articles of every live article."
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Rebuild term counts and related articles in a single pass."""
+        count = rebuild_related_articles()
+        self.stdout.write(self.style.SUCCESS(f"Scored related articles for {count} articles."))
@@ -0,0 +1,20 @@
+"""Management command to rebuild the index of live pages carrying each tag."""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from picata.caches import bump_content_generation
+from picata.tag_index import rebuild_tag_index
+
+
+class Command(BaseCommand):
+    """Rebuild the tag index from scratch, e.g. after loading pages outside the admin."""
+
+    help = "Rebuild the tag index from every live page's tags."
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Rebuild the index, and have every process reload it."""
+        count = rebuild_tag_index()
+        bump_content_generation()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} tags."))
@@ -0,0 +1,21 @@
+"""Management command to (re-)render the stored content of every live article."""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from picata.models import Article
+
+
+class Command(BaseCommand):
+    """Re-render stored article content, e.g. after a deployment changes how blocks render."""
+
+    help = "Render and store the content of every live article."
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Render each live article's content in turn."""
+        count = 0
+        for article in Article.objects.live().iterator():
+            article.store_rendered_content()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered content for {count} articles."))
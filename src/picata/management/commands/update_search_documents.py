@@ -0,0 +1,21 @@
+"""Management command to (re-)build the full-text search document of every page."""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.models import Page
+
+from picata.search import index_pages, uses_postgres_search
+
+
+class Command(BaseCommand):
+    """Rebuild search documents, e.g. after changing a page type's `search_fields`."""
+
+    help = "Build the Postgres full-text search document for every page."
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Index every page below the tree root in turn."""
+        if not uses_postgres_search():
+            raise CommandError("Postgres full-text search isn't in use with this database.")
+        count = index_pages(Page.objects.filter(depth__gt=1).specific().iterator())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} pages."))
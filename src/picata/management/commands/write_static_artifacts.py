@@ -0,0 +1,26 @@
+"""Management command to write static copies of the sitemap and feeds for nginx."""
+
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from picata.artifacts import artifacts_root, write_artifacts
+
+
+class Command(BaseCommand):
+    """Write the sitemap and feeds (with precompressed variants), e.g. after deploying."""
+
+    help = "Write the sitemap and article feeds to PICATA_ARTIFACTS_ROOT, for nginx to serve."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Allow writing to a directory other than `PICATA_ARTIFACTS_ROOT`."""
+        parser.add_argument("--root", type=Path, help="Directory to write the artifacts to.")
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: ANN401
+        """Render and write every artifact."""
+        root = options["root"] or artifacts_root()
+        if root is None:
+            raise CommandError("Set PICATA_ARTIFACTS_ROOT or pass --root.")
+        paths = write_artifacts(root)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(paths)} files to {root}."))
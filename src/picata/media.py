@@ -0,0 +1,180 @@
+"""Serving images' renditions and documents' files, with nginx sending the bytes.
+
+Django still checks each request: an image URL's signature, or (through Wagtail's
+`before_serve_document` hooks) a document's collection privacy. Rather than streaming
+the file through a gunicorn worker, it then answers with an `X-Accel-Redirect` to the
+file's path under `PICATA_ACCEL_REDIRECT_URL`, an `internal` nginx location aliasing
+`MEDIA_ROOT` (see `config/nginx-site-prod.conf`), which handles range requests and
+conditional GETs itself. With no `PICATA_ACCEL_REDIRECT_URL` (e.g. in development),
+files are streamed by Django as usual.
+
+`sendfile` is a Wagtail `SENDFILE_BACKEND`, used for documents. Images are served by
+`ImageServeView`, which remembers the file of each image's rendition for a filter spec
+in a cache shared between workers (`PICATA_RENDITION_PATH_CACHE`), so repeat requests
+for an image skip the database. Entries are dropped as renditions are deleted, and as
+their images are saved.
+
+The view's URLs name an image and filter spec, which stay the same when the image's file
+is replaced, so `image_url` adds the image's version (a hash of its file and focal point)
+as a query string. Responses to URLs naming the current version are cached for good;
+others (e.g. from pages rendered before a file was replaced) only for an hour.
+"""
+
+import hashlib
+import mimetypes
+from functools import cache
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+from wagtail.images.models import AbstractImage, AbstractRendition
+from wagtail.images.utils import verify_signature
+from wagtail.images.views.serve import ServeView, generate_image_url
+from wagtail.utils import sendfile_streaming_backend
+
+from picata.caches import ResultCache, cache_from_settings
+
+DEFAULT_RENDITION_PATH_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"key_prefix": "picata:rendition", "timeout": None},
+}
+
+# Versioned renditions' URLs are signed and name their filter spec, so only change with the image
+IMAGE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@cache
+def get_rendition_path_cache() -> ResultCache:
+    """Return the cache of renditions' files, as configured by `PICATA_RENDITION_PATH_CACHE`."""
+    return cache_from_settings("PICATA_RENDITION_PATH_CACHE", DEFAULT_RENDITION_PATH_CACHE)
+
+
+def rendition_key(image_id: int | str, filter_spec: str) -> str:
+    """Return the cache key for the file of an image's rendition for a filter spec."""
+    return f"{image_id}:{filter_spec}"
+
+
+def forget_rendition_path(image_id: int, filter_spec: str) -> None:
+    """Drop the cached file of an image's rendition, e.g. once it's been deleted."""
+    get_rendition_path_cache().delete(rendition_key(image_id, filter_spec))
+
+
+def forget_image_paths(image: AbstractImage) -> None:
+    """Drop the cached files of all an image's renditions, e.g. once its file's been replaced."""
+    for filter_spec in set(image.renditions.values_list("filter_spec", flat=True)):
+        forget_rendition_path(image.pk, filter_spec)
+
+
+def image_version(image: AbstractImage) -> str:
+    """Return a token that changes whenever an image's file (or focal point) does.
+
+    Images saved without their file's hash (e.g. outside Wagtail's forms) get it computed.
+    """
+    source = "|".join(
+        str(value)
+        for value in (
+            image.file.name,
+            image.get_file_hash(),
+            image.focal_point_x,
+            image.focal_point_y,
+            image.focal_point_width,
+            image.focal_point_height,
+        )
+    )
+    return hashlib.sha256(source.encode()).hexdigest()[:12]
+
+
+def image_url(image: AbstractImage, filter_spec: str) -> str:
+    """Return the URL serving an image's rendition for a filter spec, at its current version."""
+    return f"{generate_image_url(image, filter_spec)}?{urlencode({'v': image_version(image)})}"
+
+
+def accel_redirect(path: Path | str) -> str | None:
+    """Return the internal nginx URL for a file, if it's served that way (and under MEDIA_ROOT)."""
+    prefix = getattr(settings, "PICATA_ACCEL_REDIRECT_URL", None)
+    if not prefix:
+        return None
+    try:
+        relative = Path(path).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+    except ValueError:
+        return None
+    return prefix.rstrip("/") + "/" + quote(relative.as_posix())
+
+
+def sendfile(request: HttpRequest, filename: str, **kwargs: Any) -> HttpResponse:  # noqa: ANN401
+    """Answer with an `X-Accel-Redirect` to a file, for nginx to send (a Wagtail sendfile backend).
+
+    Files nginx can't reach are streamed by Wagtail's default backend instead. Responses
+    are only cacheable privately, since documents may be restricted to some visitors.
+    """
+    location = accel_redirect(filename)
+    if location is None:
+        return sendfile_streaming_backend.sendfile(request, filename, **kwargs)
+    response = HttpResponse()
+    response["X-Accel-Redirect"] = location
+    patch_cache_control(response, private=True)
+    return response
+
+
+class ImageServeView(ServeView):
+    """Wagtail's image-serving view, handing renditions to nginx and caching their paths."""
+
+    def get(
+        self,
+        request: HttpRequest,
+        signature: str,
+        image_id: str,
+        filter_spec: str,
+        filename: str | None = None,
+    ) -> HttpResponse:
+        """Serve a known rendition without touching the database, or look it up as usual.
+
+        The cache holds each rendition's file with its image's version, so a URL naming
+        another version is looked up afresh.
+        """
+        version = request.GET.get("v")
+        cached = get_rendition_path_cache().get(rendition_key(image_id, filter_spec))
+        if cached is None or not version or cached[0] != version:
+            response = super().get(request, signature, image_id, filter_spec, filename)
+        elif verify_signature(signature.encode(), image_id, filter_spec, key=self.key):
+            response = self.respond(cached[1], current=True)
+        else:
+            raise PermissionDenied
+        if response.status_code == 200 and getattr(response, "current", False):  # noqa: PLR2004
+            # Replacing (not patching, which keeps the lower max-age) the view's Cache-Control
+            response["Cache-Control"] = f"public, max-age={IMAGE_MAX_AGE}, immutable"
+        return response
+
+    def serve(self, rendition: AbstractRendition) -> HttpResponse:
+        """Remember the rendition's file (with its image's version), and serve it."""
+        version = image_version(rendition.image)
+        get_rendition_path_cache().set(
+            rendition_key(rendition.image_id, rendition.filter_spec),
+            (version, rendition.file.name),
+        )
+        return self.respond(rendition.file.name, current=self.request.GET.get("v") == version)
+
+    def respond(self, name: str, *, current: bool) -> HttpResponse:
+        """Return a response for a rendition's file (by its name in the default storage).
+
+        It's marked `current` if it was requested at its image's current version.
+        """
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        try:
+            location = accel_redirect(default_storage.path(name))
+        except NotImplementedError:  # Storage without local paths
+            location = None
+        if location is None:
+            response = FileResponse(default_storage.open(name), content_type=content_type)
+        else:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = location
+        response["Content-Security-Policy"] = "default-src 'none'"
+        response["X-Content-Type-Options"] = "nosniff"
+        response.current = current
+        return response
@@ -1,17 +1,45 @@
-"""HTML-processing middlware; should be placed last in (at the heart of) MIDDLEWARE."""
+"""HTML-processing middlware; should be placed last in (at the heart of) MIDDLEWARE.
 
+`PageCacheMiddleware`, which caches its output for anonymous visitors, goes just before it.
+"""
+
+import hashlib
 import logging
 import re
 from collections.abc import Callable
+from types import FunctionType
 from typing import ClassVar
 
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from lxml import etree
 
+from picata.caches import cache_from_settings
 from picata.helpers import make_response
+from picata.page_cache import (
+    bypasses_cache,
+    entry_key,
+    freeze_response,
+    get_page_cache,
+    is_cacheable,
+    path_version,
+    thaw_response,
+)
+from picata.streaming import (
+    atransform_html_chunks,
+    supports_single_pass,
+    transform_html,
+    transform_html_chunks,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HTML_CACHE = {
+    "BACKEND": "picata.caches.LRUCache",
+    "OPTIONS": {"max_entries": 256},
+}
+
 
 class HTMLProcessingMiddleware:
     """Middleware register for text/html document transformers."""
@@ -19,29 +47,106 @@ class HTMLProcessingMiddleware:
     transformers: ClassVar[list[Callable[[etree._Element], None]]] = []
 
     def __init__(self, get_response: Callable) -> None:
-        """Standard middleware initialisation; get the get_response method."""
+        """Standard middleware initialisation; get the get_response method and result cache."""
         self.get_response = get_response
+        self.cache = cache_from_settings("PICATA_HTML_CACHE", DEFAULT_HTML_CACHE)
+        self.pipeline = getattr(settings, "PICATA_HTML_PIPELINE", "tree")
 
-    def __call__(self, request: HttpRequest) -> HttpResponse:
+    def __call__(self, request: HttpRequest) -> HttpResponse | StreamingHttpResponse:
         """Filter the response through every registered transformer function."""
         response = self.get_response(request)
 
+        # Pages which annotated their own headings as they rendered needn't be transformed
+        if getattr(response, "pre_transformed", False):
+            return response
+
+        if "text/html" in response.get("Content-Type", "") and response.streaming:
+            return self.process_streaming(response)
+
         if "text/html" in response.get("Content-Type", ""):
-            doctype = self.extract_doctype(response.content.decode())
-            tree = etree.fromstring(response.content, etree.HTMLParser())  # noqa: S320
-            if tree is not None:
-                for transformer in self.transformers:
-                    transformer(tree)
-                processed_html = etree.tostring(
-                    tree,
-                    pretty_print=True,  # type: ignore [reportCallIssue]
-                    method="html",  # type: ignore [reportCallIssue]
-                    encoding=str,  # type: ignore [reportCallIssue]
-                )
-                return make_response(response, f"{doctype}\n{processed_html}")
+            pipeline = self.select_pipeline()
+            cache_key = self.cache_key(response.content, pipeline)
+            processed_html = self.cache.get(cache_key)
+            if processed_html is None:
+                if pipeline == "stream":
+                    processed_html = self.process_single_pass(response.content, response.charset)
+                else:
+                    processed_html = self.process(response.content)
+                if processed_html is None:
+                    return response
+                self.cache.set(cache_key, processed_html)
+            return make_response(response, processed_html)
 
         return response
 
+    def select_pipeline(self) -> str:
+        """Use the configured pipeline, unless "stream" is chosen but can't be honoured."""
+        if self.pipeline == "stream" and not supports_single_pass(self.transformers):
+            logger.warning(
+                "PICATA_HTML_PIPELINE is 'stream', but not every transformer declares the "
+                "element tags it handles; falling back to the 'tree' pipeline."
+            )
+            self.pipeline = "tree"
+        return self.pipeline
+
+    def process_streaming(self, response: StreamingHttpResponse) -> StreamingHttpResponse:
+        """Transform a streaming response chunk-by-chunk, as it's sent to the client.
+
+        Streamed documents can only be handled by the single-pass pipeline, and are never
+        cached, since the whole document is never held in memory. If some transformer
+        can't run in a single pass, the response is passed through untouched.
+        """
+        if not supports_single_pass(self.transformers):
+            logger.warning("Passing a streamed HTML response through untransformed.")
+            return response
+        transformers = list(self.transformers)
+        transform = atransform_html_chunks if response.is_async else transform_html_chunks
+        return make_response(
+            response,
+            transform(response.streaming_content, transformers, response.charset),  # type: ignore [arg-type]
+        )
+
+    def process_single_pass(self, content: bytes, encoding: str) -> str | None:
+        """Transform an HTML document in one event-driven pass; return None if it won't parse."""
+        try:
+            return transform_html(content, self.transformers, encoding)  # type: ignore [arg-type]
+        except etree.LxmlError:
+            logger.exception("Couldn't transform HTML document in a single pass.")
+            return None
+
+    def process(self, content: bytes) -> str | None:
+        """Parse, transform and re-serialise an HTML document; return None if it won't parse."""
+        doctype = self.extract_doctype(content.decode())
+        tree = etree.fromstring(content, etree.HTMLParser())  # noqa: S320
+        if tree is None:
+            return None
+        for transformer in self.transformers:
+            transformer(tree)
+        processed_html = etree.tostring(
+            tree,
+            pretty_print=True,  # type: ignore [reportCallIssue]
+            method="html",  # type: ignore [reportCallIssue]
+            encoding=str,  # type: ignore [reportCallIssue]
+        )
+        return f"{doctype}\n{processed_html}"
+
+    @classmethod
+    def cache_key(cls, content: bytes, pipeline: str = "tree") -> str:
+        """Hash the raw document together with the transformers that will be applied to it."""
+        digest = hashlib.sha256(pipeline.encode())
+        for transformer in cls.transformers:
+            digest.update(cls.describe_transformer(transformer).encode())
+            digest.update(b"\0")
+        digest.update(content)
+        return f"html:{digest.hexdigest()}"
+
+    @staticmethod
+    def describe_transformer(transformer: Callable[[etree._Element], None]) -> str:
+        """Return a description of a transformer that's stable across processes."""
+        if isinstance(transformer, FunctionType):
+            return f"{transformer.__module__}.{transformer.__qualname__}"
+        return repr(transformer)
+
     @staticmethod
     def extract_doctype(html: str) -> str:
         """Extract the DOCTYPE declaration from the HTML."""
@@ -52,3 +157,35 @@ class HTMLProcessingMiddleware:
     def add_transformer(cls, func: Callable[[etree._Element], None]) -> None:
         """Add a transformation function to the global pipeline."""
         cls.transformers.append(func)
+
+
+class PageCacheMiddleware:
+    """Serve anonymous visitors finished Wagtail pages from the cache (see `picata.page_cache`).
+
+    Place it immediately before `HTMLProcessingMiddleware`, so the cache holds transformed
+    documents, and after the session and authentication middleware. Disabled when
+    `PICATA_PAGE_CACHE` is None.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        """Standard middleware initialisation; get the page cache, if it's enabled."""
+        page_cache = get_page_cache()
+        if page_cache is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cache = page_cache
+
+    def __call__(self, request: HttpRequest) -> HttpResponse | StreamingHttpResponse:
+        """Return a cached response if there is one, or cache the response if it's fit to."""
+        if bypasses_cache(request):
+            return self.get_response(request)
+
+        key = entry_key(request, path_version(self.cache, request.path))
+        entry = self.cache.get(key)
+        if entry is not None:
+            return thaw_response(entry)
+
+        response = self.get_response(request)
+        if is_cacheable(request, response):
+            self.cache.set(key, freeze_response(response))
+        return response
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0003_postseries_summary_alter_postseries_introduction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rendered_content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
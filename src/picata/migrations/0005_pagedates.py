@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def copy_page_dates(apps, schema_editor):
+    """Copy the dates of every existing page into its `PageDates`."""
+    Page = apps.get_model('wagtailcore', 'Page')
+    PageDates = apps.get_model('picata', 'PageDates')
+    pages = Page.objects.annotate(
+        effective_date=Coalesce('last_published_at', 'latest_revision_created_at')
+    )
+    PageDates.objects.bulk_create(
+        (
+            PageDates(page_id=page_id, effective_date=effective_date)
+            for page_id, effective_date in pages.values_list('pk', 'effective_date').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0004_article_rendered_content'),
+        ('wagtailcore', '0094_alter_page_locale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageDates',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dates', serialize=False, to='wagtailcore.page')),
+                ('effective_date', models.DateTimeField(help_text='When the page was last published, or else last edited.', null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'page dates',
+                'indexes': [models.Index(fields=['-effective_date', '-page'], name='picata_page_effective_date')],
+            },
+        ),
+        migrations.RunPython(copy_page_dates, migrations.RunPython.noop),
+    ]
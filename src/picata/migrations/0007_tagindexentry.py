@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0006_pagesearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagIndexEntry',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='index_entry', serialize=False, to='picata.pagetag')),
+                ('page_ids', models.JSONField(default=list)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'tag index entries',
+            },
+        ),
+    ]
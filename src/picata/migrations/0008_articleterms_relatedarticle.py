@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0007_tagindexentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleTerms',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='terms', serialize=False, to='picata.article')),
+                ('counts', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name_plural': 'article terms',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='picata.article')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='picata.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', '-score'], name='picata_related_source_score')],
+            },
+        ),
+    ]
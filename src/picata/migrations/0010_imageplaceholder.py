@@ -0,0 +1,22 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0009_exportdependency'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagePlaceholder',
+            fields=[
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='placeholder', serialize=False, to='wagtailimages.image')),
+                ('file_hash', models.CharField(blank=True, max_length=40)),
+                ('data_uri', models.TextField()),
+                ('colour', models.CharField(max_length=7)),
+            ],
+        ),
+    ]
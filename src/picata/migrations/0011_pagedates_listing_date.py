@@ -0,0 +1,76 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_listing_dates(apps, schema_editor):
+    """Note the parent and listing date of every existing page in its `PageDates`."""
+    Page = apps.get_model('wagtailcore', 'Page')
+    PageDates = apps.get_model('picata', 'PageDates')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    article_type = ContentType.objects.filter(app_label='picata', model='article').first()
+
+    pages = list(
+        Page.objects.order_by('path').values_list(
+            'pk',
+            'path',
+            'depth',
+            'live',
+            'content_type_id',
+            'first_published_at',
+            'latest_revision_created_at',
+            'last_published_at',
+        )
+    )
+    ids_by_path = {}
+    own_dates = {}
+    latest_child_dates = {}
+    for pk, path, depth, live, content_type_id, *dates in pages:
+        ids_by_path[path] = pk
+        own_dates[pk] = next((date for date in dates if date is not None), None)
+        parent_path = path[: -len(path) // depth]
+        if live and article_type and content_type_id == article_type.pk and own_dates[pk]:
+            latest = latest_child_dates.get(parent_path)
+            latest_child_dates[parent_path] = max(latest, own_dates[pk]) if latest else own_dates[pk]
+
+    PageDates.objects.bulk_create(
+        (
+            PageDates(
+                page_id=pk,
+                parent_id=ids_by_path.get(path[: -len(path) // depth]) if depth > 1 else None,
+                effective_date=last_published_at or latest_revision_created_at,
+                listing_date=latest_child_dates.get(path) or own_dates[pk],
+            )
+            for pk, path, depth, _, _, _, latest_revision_created_at, last_published_at in pages
+        ),
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['page'],
+        update_fields=['parent', 'effective_date', 'listing_date'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('picata', '0010_imageplaceholder'),
+        ('wagtailcore', '0094_alter_page_locale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagedates',
+            name='listing_date',
+            field=models.DateTimeField(help_text='When the page (or, for a series, its latest live article) was first published.', null=True),
+        ),
+        migrations.AddField(
+            model_name='pagedates',
+            name='parent',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='child_dates', to='wagtailcore.page'),
+        ),
+        migrations.AddIndex(
+            model_name='pagedates',
+            index=models.Index(fields=['parent', '-listing_date', '-page'], name='picata_page_listing_date'),
+        ),
+        migrations.RunPython(copy_listing_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def fill_tag_index(apps, schema_editor):
+    """Index the live pages carrying each tag, as `picata.tag_index.rebuild_tag_index` does."""
+    PageTagRelation = apps.get_model('picata', 'PageTagRelation')
+    TagIndexEntry = apps.get_model('picata', 'TagIndexEntry')
+    page_ids_by_tag = {}
+    relations = PageTagRelation.objects.filter(content_object__live=True).order_by(
+        'tag', 'content_object'
+    )
+    for tag_id, page_id in relations.values_list('tag', 'content_object').distinct():
+        page_ids_by_tag.setdefault(tag_id, []).append(page_id)
+
+    TagIndexEntry.objects.all().delete()
+    TagIndexEntry.objects.bulk_create(
+        TagIndexEntry(tag_id=tag_id, page_ids=page_ids, page_count=len(page_ids))
+        for tag_id, page_ids in page_ids_by_tag.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0011_pagedates_listing_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_tag_index, migrations.RunPython.noop),
+    ]
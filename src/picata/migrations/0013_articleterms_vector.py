@@ -0,0 +1,31 @@
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def forget_term_counts(apps, schema_editor):
+    """Drop the term counts recorded so far, to be rescored (with vectors) after migrating.
+
+    Term counts are derived from articles' searchable text, which only the real models
+    describe, so `picata.signals.fill_related_articles` rebuilds them once `migrate` is done.
+    """
+    apps.get_model('picata', 'ArticleTerms').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('picata', '0012_fill_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articleterms',
+            name='vector',
+            field=models.JSONField(default=dict, help_text='TF-IDF weights of the most significant terms.'),
+        ),
+        migrations.AddIndex(
+            model_name='articleterms',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='picata_article_terms_vector'),
+        ),
+        migrations.RunPython(forget_term_counts, migrations.RunPython.noop),
+    ]
@@ -3,25 +3,43 @@
 # NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
 # pyright: reportAttributeAccessIssue=false
 
+import hashlib
+import json
 from collections import OrderedDict
-from datetime import datetime, timedelta
+from collections.abc import Iterable
+from datetime import MAXYEAR, datetime, timedelta
 from typing import Any, ClassVar, TypedDict, cast
 
 from django.apps import apps
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models import (
     CASCADE,
     SET_NULL,
     CharField,
+    DateTimeField,
+    F,
+    FloatField,
     ForeignKey,
+    Index,
+    JSONField,
     Model,
+    OneToOneField,
+    PositiveIntegerField,
+    Q,
+    QuerySet,
     SlugField,
     TextField,
+    UniqueConstraint,
 )
-from django.db.models.functions import Coalesce
-from django.http import HttpRequest
+from django.db.models.functions import Cast
+from django.http import HttpRequest, HttpResponse
 from django.urls import reverse
-from django.utils.timezone import now
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.timezone import localtime, make_aware, now
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 from taggit.models import TagBase, TaggedItemBase
@@ -31,15 +49,19 @@ from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 from wagtail.fields import RichTextField, StreamField
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.images.models import Image
-from wagtail.models import Page, PageManager, PanelPlaceholder
+from wagtail.models import Page, PageManager, PanelPlaceholder, ReferenceIndex, Site
 from wagtail.query import PageQuerySet
 from wagtail.search import index
 from wagtail_modeladmin.options import ModelAdmin
 
+from picata.dependencies import note_included
+from picata.helpers import DateCursor, decode_date_cursor, encode_date_cursor
+from picata.transformers import anchor_id
 from picata.typing import Args, Kwargs, UserOrNot
 from picata.typing.wagtail import PageContext
 
 from .blocks import (
+    AnchoredStreamBlock,
     CodeBlock,
     StaticIconLinkListsBlock,
     WrappedImageChooserBlock,
@@ -50,14 +72,79 @@ class ChronoPageQuerySet(PageQuerySet):
     """QuerySet for pages that can be ordered based on dates."""
 
     def with_effective_date(self) -> "ChronoPageQuerySet":
-        """Annotate pages with 'effective_date' to allow date-based ordering."""
-        return self.annotate(
-            effective_date=Coalesce("last_published_at", "latest_revision_created_at", now())
-        )
+        """Annotate pages with 'effective_date' to allow date-based ordering.
+
+        The date's read from the page's indexed `PageDates` (joined, rather than outer-joined,
+        so the database can walk the index); pages with neither a last-published nor a
+        latest-revision date get NULL.
+        """
+        return self.filter(dates__isnull=False).annotate(effective_date=F("dates__effective_date"))
 
     def by_date(self) -> "ChronoPageQuerySet":
-        """Return all pages ordered by descending 'effective_date'."""
-        return self.with_effective_date().order_by("-effective_date")
+        """Return all pages ordered by descending 'effective_date', and then by descending id.
+
+        Undated pages come first, as if dated "now"; the id breaks ties, giving the total
+        order keyset pagination needs.
+        """
+        return self.with_effective_date().order_by(
+            F("effective_date").desc(nulls_first=True), "-pk"
+        )
+
+    def with_listing_date(self) -> "ChronoPageQuerySet":
+        """Annotate pages with 'listing_date', the date they're listed under.
+
+        That's when a page was first published (or last edited, if it's never been
+        published), unless it has live `Article` children (i.e. it's a `PostSeries`): then
+        it's that of its latest child. It's read from the page's indexed `PageDates`.
+        """
+        return self.filter(dates__isnull=False).annotate(listing_date=F("dates__listing_date"))
+
+    def by_listing_date(self) -> "ChronoPageQuerySet":
+        """Return all pages ordered by descending 'listing_date', and then by descending id."""
+        return self.with_listing_date().order_by(F("listing_date").desc(nulls_first=True), "-pk")
+
+    def listed_under(self, parent: Page) -> "ChronoPageQuerySet":
+        """Filter to the children of `parent`, as found by their indexed `PageDates`."""
+        return self.filter(dates__parent=parent)
+
+    def in_year(self, year: int, field: str = "listing_date") -> "ChronoPageQuerySet":
+        """Filter to pages whose `field` falls in `year` (in the current time zone).
+
+        The bounds are computed here, so the database compares the date as it's indexed.
+        """
+        start = make_aware(datetime(year, 1, 1))  # noqa: DTZ001
+        end = make_aware(datetime(year + 1, 1, 1))  # noqa: DTZ001
+        return self.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+
+    def after(
+        self, cursor: DateCursor | None, field: str = "effective_date"
+    ) -> "ChronoPageQuerySet":
+        """Return pages following `cursor` (a date and id) in descending order of `field`."""
+        if cursor is None:
+            return self
+        date, pk = cursor
+        if date is None:
+            return self.filter(
+                Q(**{f"{field}__isnull": True, "pk__lt": pk}) | Q(**{f"{field}__isnull": False})
+            )
+        return self.filter(Q(**{f"{field}__lt": date}) | Q(**{field: date, "pk__lt": pk}))
+
+    def keyset_page(
+        self, size: int, cursor: DateCursor | None = None, field: str = "effective_date"
+    ) -> tuple[list[Page], DateCursor | None]:
+        """Return up to `size` pages following `cursor`, and the cursor for the next page.
+
+        The queryset should be ordered by descending `field` and id (as by `by_date` or
+        `by_listing_date`). Seeking past the last row seen (rather than using OFFSET) lets
+        the database walk an index where there is one (as for both dates), so every
+        page costs the same however deep it is. The returned cursor is None when there are
+        no more pages.
+        """
+        rows = list(self.after(cursor, field)[: size + 1])
+        if len(rows) <= size:
+            return rows, None
+        last = rows[size - 1]
+        return rows[:size], (getattr(last, field), last.pk)
 
     def live_for_user(self, user: UserOrNot = None) -> "ChronoPageQuerySet":
         """Filter out non-live pages for non-authenticated users."""
@@ -96,6 +183,8 @@ class BasePublicationData(CorePublicationData, total=False):
 class BasePageContext(PageContext, total=False):
     """Return-type for an `Article`'s context dictionary."""
 
+    heading_ids: set[str]
+    image_ids: set[int]
     url: str
     published: bool | str
     updated: bool | str
@@ -109,6 +198,24 @@ class BasePage(Page):
 
     objects = ChronoPageManager()
 
+    # Set on page types whose templates render every heading in <main> with an id and anchor
+    # (e.g. via `AnchoredStreamBlock`), so `HTMLProcessingMiddleware` needn't transform them.
+    annotates_headings: ClassVar[bool] = False
+
+    def get_site(self) -> Site | None:
+        """Return the `Site` this page belongs to, remembering it for the instance's lifetime."""
+        if not self.has_cached_site():
+            self.cache_site(super().get_site())
+        return self._cached_site
+
+    def has_cached_site(self) -> bool:
+        """Return whether this instance already knows its `Site`."""
+        return hasattr(self, "_cached_site")
+
+    def cache_site(self, site: Site | None) -> None:
+        """Tell the instance which `Site` it belongs to (e.g. when loading pages in bulk)."""
+        self._cached_site = site
+
     def get_preview_fields(self, user: UserOrNot = None) -> dict[str, Any]:
         """Return a dictionary of data used in previewing this page type."""
         return {
@@ -169,8 +276,17 @@ class BasePage(Page):
 
         context = super().get_context(request, *args, **kwargs)
         context.update(page_preview_data(self, request.user))
+        context["heading_ids"] = set()  # Heading ids used so far, for `AnchoredStreamBlock`
+        context["image_ids"] = set()  # Images shown so far, for `WrappedImageChooserBlock`
         return cast(BasePageContext, {**context})
 
+    def serve(self, request: HttpRequest, *args: Args, **kwargs: Kwargs) -> HttpResponse:
+        """Serve the page, marking responses whose headings were annotated as they rendered."""
+        response = super().serve(request, *args, **kwargs)
+        if self.annotates_headings:
+            response.pre_transformed = True
+        return response
+
     class Meta:
         """Declare `BasePage` as an abstract `Page` class."""
 
@@ -201,6 +317,25 @@ class PageTagRelation(TaggedItemBase):
     )
 
 
+class TagIndexEntry(Model):
+    """The sorted ids of the live pages carrying a tag, maintained by `picata.tag_index`."""
+
+    tag: OneToOneField[PageTag] = OneToOneField(
+        PageTag, on_delete=CASCADE, primary_key=True, related_name="index_entry"
+    )
+    page_ids = JSONField(default=list)
+    page_count = PositiveIntegerField(default=0)
+
+    class Meta:
+        """Declare a human-friendly name for the model."""
+
+        verbose_name_plural = "tag index entries"
+
+    def __str__(self) -> str:
+        """Describe the entry by its tag and page count."""
+        return f"{self.tag_id}: {self.page_count} pages"
+
+
 class TaggedPage(BasePage):
     """Abstract base for a `Page` type supporting tags."""
 
@@ -225,13 +360,16 @@ class BasicPage(BasePage):
     """A basic page model for static content."""
 
     template = "picata/basic_page.html"
+    annotates_headings = True
 
     content = StreamField(
-        [
-            ("rich_text", RichTextBlock()),
-            ("code", CodeBlock()),
-            ("image", ImageChooserBlock()),
-        ],
+        AnchoredStreamBlock(
+            [
+                ("rich_text", RichTextBlock()),
+                ("code", CodeBlock()),
+                ("image", ImageChooserBlock()),
+            ]
+        ),
         use_json_field=True,
         blank=True,
         help_text="Main content for the page.",
@@ -346,23 +484,29 @@ class ArticleContext(SeriesPostMixinContext, BasePageContext):
     """Return-type for an `Article`'s context dictionary."""
 
     content: str
+    rendered_content: SafeString | None
+    title_id: str
+    related_articles: list["Article"]
 
 
 class Article(SeriesPostMixin, TaggedPage):
     """Class for article-like pages."""
 
     template = "picata/article.html"
+    annotates_headings = True
 
     tagline: CharField = CharField(
         blank=True, help_text="A short tagline for the article.", max_length=255
     )
     summary = RichTextField(blank=True, help_text="A summary to be displayed in previews.")
     content = StreamField(
-        [
-            ("rich_text", RichTextBlock()),
-            ("code", CodeBlock()),
-            ("image", ImageChooserBlock()),
-        ],
+        AnchoredStreamBlock(
+            [
+                ("rich_text", RichTextBlock()),
+                ("code", CodeBlock()),
+                ("image", ImageChooserBlock()),
+            ]
+        ),
         use_json_field=True,
         blank=True,
         help_text="Main content for the article.",
@@ -377,6 +521,11 @@ class Article(SeriesPostMixin, TaggedPage):
         help_text="Select the type of article.",
     )
 
+    # HTML of `content` as rendered when the page was last published, and a hash of the
+    # title and content it was rendered from (so it's never served for other versions)
+    rendered_content = TextField(blank=True, editable=False)
+    rendered_content_hash = CharField(max_length=64, blank=True, editable=False)
+
     promote_panels: ClassVar[list[PanelPlaceholder | FieldPanel]] = [
         FieldPanel("summary"),
         FieldPanel("page_type"),
@@ -411,14 +560,139 @@ class Article(SeriesPostMixin, TaggedPage):
     def get_context(self, request: HttpRequest, *args: Args, **kwargs: Kwargs) -> ArticleContext:
         """Provide extra context needed for the `Article` to render itself."""
         context = dict(super().get_context(request, *args, **kwargs))
-        context.update({"content": self.content})
+        context.update(
+            {
+                "content": self.content,
+                "rendered_content": self.get_rendered_content(),
+                "title_id": anchor_id(self.title, context["heading_ids"]),
+                "related_articles": self.get_related_articles(),
+            }
+        )
         return cast(ArticleContext, context)
 
+    def get_related_articles(self) -> list["Article"]:
+        """Return the live articles most related to this one, best first (in one query)."""
+        links = (
+            RelatedArticle.objects.filter(source=self, target__live=True)
+            .select_related("target")
+            .order_by("-score")[: getattr(settings, "PICATA_RELATED_ARTICLES", 5)]
+        )
+        targets = [link.target for link in links]
+        note_included(target.pk for target in targets)
+        return targets
+
+    def content_hash(self) -> str:
+        """Return a hash of the title and content that rendered content is derived from."""
+        source = json.dumps([self.title, list(self.content.raw_data)], default=str, sort_keys=True)
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def render_content(self) -> str:
+        """Render `content` exactly as `article.html` would, below the title's heading."""
+        heading_ids: set[str] = set()
+        anchor_id(self.title, heading_ids)  # The title heading claims its id first
+        context = {"heading_ids": heading_ids, "image_ids": set()}
+        return str(self.content.render_as_block(context=context))
+
+    def store_rendered_content(self) -> None:
+        """Render and store `content` for the page as it stands, without saving a revision."""
+        self.rendered_content = self.render_content()
+        self.rendered_content_hash = self.content_hash()
+        Article.objects.filter(pk=self.pk).update(
+            rendered_content=self.rendered_content,
+            rendered_content_hash=self.rendered_content_hash,
+        )
+
+    def clear_rendered_content(self) -> None:
+        """Discard any stored rendering of `content`."""
+        self.rendered_content = self.rendered_content_hash = ""
+        Article.objects.filter(pk=self.pk).update(rendered_content="", rendered_content_hash="")
+
+    @classmethod
+    def clear_rendered_content_referring_to(
+        cls, model: type[Model], object_ids: Iterable[int] | QuerySet
+    ) -> int:
+        """Discard the stored renderings of articles whose content refers to any given object.
+
+        Rendered links and images follow the URLs and files of what they refer to, which
+        `content_hash` doesn't cover, so they're cleared as those change; Wagtail's reference
+        index says which articles refer to what. `model` is the referred-to base model (e.g.
+        `Page`, not `Article`), and `object_ids` its objects' ids, or a queryset of them.
+        Returns how many renderings were cleared.
+        """
+        if isinstance(object_ids, QuerySet):
+            to_object_ids = object_ids.annotate(pk_text=Cast("pk", CharField())).values("pk_text")
+        else:
+            to_object_ids = [str(pk) for pk in object_ids]
+        references = ReferenceIndex.objects.filter(
+            content_type=ContentType.objects.get_for_model(cls),
+            to_content_type=ContentType.objects.get_for_model(model),
+            to_object_id__in=to_object_ids,
+        )
+        article_ids = {int(pk) for pk in references.values_list("object_id", flat=True)}
+        if not article_ids:
+            return 0
+        return (
+            cls.objects.filter(pk__in=article_ids)
+            .exclude(rendered_content="")
+            .update(rendered_content="", rendered_content_hash="")
+        )
+
+    def get_rendered_content(self) -> SafeString | None:
+        """Return stored rendered content, if it was rendered from the current title & content."""
+        if self.rendered_content and self.rendered_content_hash == self.content_hash():
+            return mark_safe(self.rendered_content)  # noqa: S308
+        return None
+
+
+class ArticleTerms(Model):
+    """Counts of the terms in a live article's text, maintained by `picata.related`."""
+
+    article: OneToOneField[Article] = OneToOneField(
+        Article, on_delete=CASCADE, primary_key=True, related_name="terms"
+    )
+    counts = JSONField(default=dict)
+    vector = JSONField(default=dict, help_text="TF-IDF weights of the most significant terms.")
+
+    class Meta:
+        """Index the weighted terms, for finding the articles sharing any of them."""
+
+        verbose_name_plural = "article terms"
+        indexes: ClassVar[list[GinIndex]] = [
+            GinIndex(fields=["vector"], name="picata_article_terms_vector")
+        ]
+
+    def __str__(self) -> str:
+        """Describe the record by its article and vocabulary size."""
+        return f"{self.article_id}: {len(self.counts)} terms"
+
+
+class RelatedArticle(Model):
+    """An article related to another, with its score; maintained by `picata.related`."""
+
+    source: ForeignKey[Article] = ForeignKey(
+        Article, on_delete=CASCADE, related_name="related_links"
+    )
+    target: ForeignKey[Article] = ForeignKey(Article, on_delete=CASCADE, related_name="+")
+    score = FloatField()
+
+    class Meta:
+        """Index links by source and descending score, for listing an article's best matches."""
+
+        indexes: ClassVar[list[Index]] = [
+            Index(fields=["source", "-score"], name="picata_related_source_score")
+        ]
+
+    def __str__(self) -> str:
+        """Describe the link by its endpoints and score."""
+        return f"{self.source_id} → {self.target_id} ({self.score:.3f})"
+
 
 class PostGroupPageContext(BasePageContext):
     """Return-type for a `PostGroupPage`'s context dictionary."""
 
     posts_by_year: OrderedDict[int, list[dict[str, str]]]
+    year: int | None
+    next_page_url: str | None
 
 
 class PostGroupPage(BasePage):
@@ -438,29 +712,44 @@ class PostGroupPage(BasePage):
         self, request: HttpRequest, *args: Args, **kwargs: Kwargs
     ) -> PostGroupPageContext:
         """Add a dictionary of posts grouped by year to the context dict."""
-        from picata.helpers.wagtail import page_preview_data, visible_pages_qs
+        from picata.helpers.wagtail import bulk_page_preview_data, visible_pages_qs
 
         children = visible_pages_qs(
-            cast(AbstractUser, request.user), cast(PageQuerySet, self.get_children())
-        ).specific()
-
-        child_data = sorted(
-            [page_preview_data(child, request.user) for child in children],
-            key=lambda p: p["list_date"],
-            reverse=True,
-        )
-
-        # Create an OrderedDict grouping posts by year in reverse chronological order
+            cast(AbstractUser, request.user), ChronoPageQuerySet(Page).listed_under(self)
+        ).by_listing_date()
+
+        # Narrow to a single year with `?year=`, and page through posts with `?after=`
+        year_param = request.GET.get("year", "")
+        digits = year_param.isascii() and year_param.isdecimal()
+        in_range = digits and len(year_param) <= len(str(MAXYEAR)) and 0 < int(year_param) < MAXYEAR
+        year = int(year_param) if in_range else None
+        if year:
+            children = children.in_year(year)
+        page_size = getattr(settings, "PICATA_POSTS_PER_PAGE", 20)
+        cursor = decode_date_cursor(request.GET.get("after"))
+        posts, next_cursor = children.specific().keyset_page(page_size, cursor, "listing_date")
+        child_data = bulk_page_preview_data(posts, request.user)
+
+        # Posts arrive in reverse chronological order, so each year's posts are adjacent
         posts_by_year: OrderedDict = OrderedDict()
-        for child in child_data:
-            # Group posts by year, defaulting to last-draft year if unpublished
-            if child["year"] not in posts_by_year:
-                posts_by_year[child["year"]] = []
-            posts_by_year[child["year"]].append(child)
+        for post, child in zip(posts, child_data, strict=True):
+            listing_year = localtime(post.listing_date).year if post.listing_date else now().year
+            posts_by_year.setdefault(listing_year, []).append(child)
+
+        next_page_url = None
+        if next_cursor:
+            query = request.GET.copy()
+            query["after"] = encode_date_cursor(next_cursor)
+            next_page_url = f"?{query.urlencode()}"
 
         return cast(
             PostGroupPageContext,
-            {**super().get_context(request, *args, **kwargs), "posts_by_year": posts_by_year},
+            {
+                **super().get_context(request, *args, **kwargs),
+                "posts_by_year": posts_by_year,
+                "year": year,
+                "next_page_url": next_page_url,
+            },
         )
 
     class Meta:
@@ -537,10 +826,11 @@ class HomePage(BasePage):
 
     def get_context(self, request: HttpRequest, *args: Args, **kwargs: Kwargs) -> HomePageContext:
         """Add content streams and a recent posts list to the context."""
-        from picata.helpers.wagtail import page_preview_data
+        from picata.helpers.wagtail import bulk_page_preview_data
 
-        recent_posts = Article.objects.live_for_user(request.user).by_date()
-        recent_posts = [page_preview_data(post, request.user) for post in recent_posts]
+        recent_count = getattr(settings, "PICATA_RECENT_POSTS", 5)
+        recent_posts = Article.objects.live_for_user(request.user).by_date()[:recent_count]
+        recent_posts = bulk_page_preview_data(recent_posts, request.user)
 
         return cast(
             HomePageContext,
@@ -569,11 +859,13 @@ class PostSeries(BasePage):
 
     summary = RichTextField(blank=True, help_text="A summary to be displayed in previews.")
     introduction = StreamField(
-        [
-            ("rich_text", RichTextBlock()),
-            ("code", CodeBlock()),
-            ("image", WrappedImageChooserBlock()),
-        ],
+        AnchoredStreamBlock(
+            [
+                ("rich_text", RichTextBlock()),
+                ("code", CodeBlock()),
+                ("image", WrappedImageChooserBlock()),
+            ]
+        ),
         blank=True,
         use_json_field=True,
         help_text="Content to introduce the series of articles.",
@@ -592,14 +884,23 @@ class PostSeries(BasePage):
     parent_page_types: ClassVar[list[str]] = ["PostGroupPage"]
     subpage_types: ClassVar[list[str]] = ["Article"]
 
+    def get_parts(self, user: UserOrNot = None) -> list[Article]:
+        """Return the articles in this series visible to `user`, most recent first.
+
+        Parts loaded in bulk by `picata.helpers.wagtail.prefetch_preview_data` are used
+        where available.
+        """
+        parts = getattr(self, "prefetched_parts", None)
+        if parts is None:
+            return list(Article.objects.child_of(self).by_date().live_for_user(user))
+        if user and user.is_authenticated:
+            return parts
+        return [part for part in parts if part.live]
+
     def get_publication_data(self, request: HttpRequest | None = None) -> dict[str, Any]:
         """Return publication data, using the most recent child article's data for sorting."""
         data = super().get_publication_data(request)
-        children = (
-            Article.objects.child_of(self)
-            .by_date()
-            .live_for_user(request.user if request else None)
-        )
+        children = self.get_parts(request.user if request else None)
         child_publication_data = [child.get_publication_data(request) for child in children]
 
         if child_publication_data:
@@ -614,15 +915,15 @@ class PostSeries(BasePage):
         self, user: UserOrNot = None, relative_to: Page | None = None
     ) -> dict[str, Any]:
         """Return preview data, including a sorted list of child articles as 'parts'."""
-        from picata.helpers.wagtail import page_preview_data
+        from picata.helpers.wagtail import bulk_page_preview_data
 
         site = self.get_site()
         data = {
             **super().get_preview_fields(user),
             "summary": self.summary,
         }
-        children = list(Article.objects.child_of(self).by_date().live_for_user(user))
-        part_previews = [page_preview_data(child, user) for child in children]
+        children = self.get_parts(user)
+        part_previews = bulk_page_preview_data(children, user)
         data["url"] = self.relative_url(site)
         data["parts"] = part_previews
         if relative_to and relative_to in children:
@@ -639,3 +940,106 @@ class PostSeries(BasePage):
                 "introduction": self.introduction,
             },
         )
+
+
+class PageDates(Model):
+    """The dates a page is ordered by in listings, copied into indexed columns.
+
+    Wagtail's pages table can't be indexed by this app, so `picata.page_dates` keeps a
+    row for every page as it's saved; `ChronoPageQuerySet` orders and pages by it. Each
+    row also notes the page's parent, so a listing's children are found by the index too.
+    """
+
+    page: OneToOneField[Page] = OneToOneField(
+        Page, on_delete=CASCADE, primary_key=True, related_name="dates"
+    )
+    parent: ForeignKey[Page | None] = ForeignKey(
+        Page, on_delete=CASCADE, null=True, related_name="child_dates"
+    )
+    effective_date = DateTimeField(
+        null=True, help_text="When the page was last published, or else last edited."
+    )
+    listing_date = DateTimeField(
+        null=True,
+        help_text="When the page (or, for a series, its latest live article) was first published.",
+    )
+
+    class Meta:
+        """Index pages by descending date and id, the orders of `ChronoPageQuerySet`."""
+
+        verbose_name_plural = "page dates"
+        indexes: ClassVar[list[Index]] = [
+            Index(fields=["-effective_date", "-page"], name="picata_page_effective_date"),
+            Index(fields=["parent", "-listing_date", "-page"], name="picata_page_listing_date"),
+        ]
+
+    def __str__(self) -> str:
+        """Describe the dates by their page."""
+        return f"Dates of page {self.page_id}"
+
+
+class PageSearchDocument(Model):
+    """A page's searchable text, as a weighted `tsvector` for Postgres full-text search.
+
+    Maintained by `picata.search.index_page` as pages are published; see `picata.search`.
+    """
+
+    page: OneToOneField[Page] = OneToOneField(
+        Page, on_delete=CASCADE, primary_key=True, related_name="search_document"
+    )
+    body = TextField(blank=True, help_text="Plain text of the page's search fields.")
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        """Index the vector for fast `@@` matching."""
+
+        indexes: ClassVar[list[GinIndex]] = [
+            GinIndex(fields=["search_vector"], name="picata_search_vector_gin")
+        ]
+
+    def __str__(self) -> str:
+        """Name the document after its page."""
+        return f"Search document for page {self.page_id}"
+
+
+class ExportDependency(Model):
+    """A page shown (e.g. as a preview) on another page, as of its last static export.
+
+    Recorded by `picata.export`, so publishing a page re-exports the pages that show it.
+    """
+
+    page: ForeignKey[Page] = ForeignKey(Page, on_delete=CASCADE, related_name="+")
+    included: ForeignKey[Page] = ForeignKey(Page, on_delete=CASCADE, related_name="+")
+
+    class Meta:
+        """Each page is recorded as included on another page at most once."""
+
+        constraints: ClassVar[list[UniqueConstraint]] = [
+            UniqueConstraint(fields=["page", "included"], name="picata_export_dependency_unique")
+        ]
+
+    def __str__(self) -> str:
+        """Describe the dependency by its pages' ids."""
+        return f"Page {self.included_id} shown on page {self.page_id}"
+
+
+class ImagePlaceholder(Model):
+    """A tiny, blurred copy of an image and its dominant colour, shown while it loads.
+
+    Computed from the image's file (as of `file_hash`) by `picata.placeholders`.
+    """
+
+    image: OneToOneField[Image] = OneToOneField(
+        Image, on_delete=CASCADE, primary_key=True, related_name="placeholder"
+    )
+    file_hash = CharField(max_length=40, blank=True)
+    data_uri = TextField()
+    colour = CharField(max_length=7)
+
+    def __str__(self) -> str:
+        """Describe the placeholder by its image and colour."""
+        return f"Image {self.image_id}: {self.colour}"
+
+    def style(self) -> str:
+        """Return CSS showing the placeholder behind an `<img>`, until the image covers it."""
+        return f"background: {self.colour} url({self.data_uri}) center / cover no-repeat"
@@ -0,0 +1,135 @@
+"""A cache of finished Wagtail page responses for anonymous visitors, purged page-by-page.
+
+Entries are keyed by host, path and query string, under a version number kept for each
+path. Purging a path deletes its version, so every variant of it (e.g. `?year=2024` on a
+listing) misses from then on, without the cache having to enumerate them.
+
+When a page is published, unpublished, moved, renamed or deleted, its path and those of
+all its ancestors (including the site's home page) are purged, once the change has been
+committed. Other pages that mention it (e.g. related articles and menus) catch up when
+their entries time out. The article feeds have their own cache, retired by the content
+generation (see `picata.views.PostsFeed`).
+"""
+
+import hashlib
+import time
+from functools import cache
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.utils.http import urlencode
+from wagtail.models import Site
+
+from picata.caches import ResultCache, cache_from_settings
+
+DEFAULT_PAGE_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"key_prefix": "picata:page", "timeout": 600},
+}
+
+# Cache-Control directives that mark a response as unfit for sharing
+UNCACHEABLE_DIRECTIVES = ("private", "no-cache", "no-store")
+
+# Request META key (which no HTTP header can set) marking internal requests to render afresh
+RENDER_AFRESH = "picata.render_afresh"
+
+
+@cache
+def get_page_cache() -> ResultCache | None:
+    """Return the page cache configured by `PICATA_PAGE_CACHE`, or None if it's disabled."""
+    if getattr(settings, "PICATA_PAGE_CACHE", DEFAULT_PAGE_CACHE) is None:
+        return None
+    return cache_from_settings("PICATA_PAGE_CACHE", DEFAULT_PAGE_CACHE)
+
+
+def path_version(page_cache: ResultCache, path: str) -> int:
+    """Return the current version of a path's entries, starting a new one if it has none."""
+    version = page_cache.get(f"version:{path}")
+    if version is None:
+        version = time.time_ns()
+        page_cache.set(f"version:{path}", version)
+    return version
+
+
+def entry_key(request: HttpRequest, version: int) -> str:
+    """Return the cache key for a request's response, under a version of its path."""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    variant = f"{version}|{request.scheme}|{request.get_host()}|{request.path}|{query}"
+    return hashlib.sha256(variant.encode()).hexdigest()
+
+
+def bypasses_cache(request: HttpRequest) -> bool:
+    """Return whether a request must be served afresh.
+
+    Only GETs and HEADs without a session are served from (or stored in) the cache; a
+    session is how a visitor is logged in, or has passed a page's password restriction.
+    Internal requests (e.g. from `picata.export`) can set `RENDER_AFRESH` in their META.
+    """
+    return (
+        request.method not in {"GET", "HEAD"}
+        or settings.SESSION_COOKIE_NAME in request.COOKIES
+        or bool(request.META.get(RENDER_AFRESH))
+    )
+
+
+def is_cacheable(request: HttpRequest, response: HttpResponse) -> bool:
+    """Return whether a response is a complete Wagtail page, fit to serve to any visitor."""
+    cache_control = response.get("Cache-Control", "")
+    return (
+        response.status_code == 200  # noqa: PLR2004
+        and not response.streaming
+        and request.resolver_match is not None
+        and request.resolver_match.url_name == "wagtail_serve"
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        and not any(directive in cache_control for directive in UNCACHEABLE_DIRECTIVES)
+    )
+
+
+def freeze_response(response: HttpResponse) -> dict[str, Any]:
+    """Return a response's status, headers and content, in a form fit for caching."""
+    return {
+        "status": response.status_code,
+        "headers": list(response.headers.items()),
+        "content": response.content,
+    }
+
+
+def thaw_response(entry: dict[str, Any]) -> HttpResponse:
+    """Rebuild a response from a cache entry made by `freeze_response`."""
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for header, value in entry["headers"]:
+        response.headers[header] = value
+    return response
+
+
+def site_paths(url_path: str) -> set[str]:
+    """Return the paths a page (by its `url_path`) and its ancestors are served at."""
+    segments = url_path.strip("/").split("/")
+    ancestor_url_paths = {
+        "/" + "".join(f"{s}/" for s in segments[:n]) for n in range(len(segments) + 1)
+    }
+    return {
+        "/" + ancestor[len(root_path.root_path) :]
+        for root_path in Site.get_site_root_paths()
+        for ancestor in ancestor_url_paths
+        if ancestor.startswith(root_path.root_path)
+    }
+
+
+def purge_paths(paths: set[str]) -> None:
+    """Retire every cached variant of the given paths."""
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        for path in paths:
+            page_cache.delete(f"version:{path}")
+
+
+def purge_url_paths(*url_paths: str) -> None:
+    """Purge the pages at the given `url_path`s and their ancestors, on commit."""
+    if get_page_cache() is None:
+        return
+    paths = set().union(*(site_paths(url_path) for url_path in url_paths if url_path))
+    transaction.on_commit(lambda: purge_paths(paths))
@@ -0,0 +1,82 @@
+"""Copies of pages' dates in indexed columns, for ordering and paging listings by index.
+
+Listings order pages by their dates (see `picata.models.ChronoPageQuerySet`), but those
+live in Wagtail's pages table, which this app's migrations can't index. Each page's
+`PageDates` row copies them into columns that are indexed, alongside its parent; it's
+written as the page is saved (which Wagtail does as revisions are saved, and as pages are
+published and unpublished) and moved, and deleted with the page. A series is listed under
+the date of its latest live article, so saving, moving or deleting an article rewrites its
+parent's row too. Migrations 0005 and 0011 fill in rows for existing pages.
+"""
+
+from datetime import datetime
+
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from wagtail.models import Page
+
+from picata.models import Article, PageDates
+
+# The fields of a page its dates (and its parent's listing date) are derived from; saves of
+# other fields leave them be
+DATE_FIELDS = frozenset(
+    {"first_published_at", "last_published_at", "latest_revision_created_at", "live"}
+)
+
+
+def effective_date(page: Page) -> datetime | None:
+    """Return when a page was last published, or else last edited (as a revision)."""
+    return page.last_published_at or page.latest_revision_created_at
+
+
+def own_listing_date(page: Page) -> datetime | None:
+    """Return when a page was first published, or else last edited, ignoring its children."""
+    return page.first_published_at or page.latest_revision_created_at or page.last_published_at
+
+
+def listing_date(page: Page) -> datetime | None:
+    """Return the date a page is listed under: its latest live article's, or else its own."""
+    latest_child = None
+    if page.numchild:
+        latest_child = (
+            Article.objects.live()
+            .child_of(page)
+            .aggregate(
+                latest=Max(
+                    Coalesce(
+                        "first_published_at", "latest_revision_created_at", "last_published_at"
+                    )
+                )
+            )["latest"]
+        )
+    return latest_child or own_listing_date(page)
+
+
+def find_parent(page: Page) -> Page | None:
+    """Return a page's parent, or None for the root (or a parent that's been deleted)."""
+    if page.is_root():
+        return None
+    return Page.objects.filter(path=page.path[: -Page.steplen]).first()
+
+
+def update_page_dates(page: Page, parent: Page | None) -> None:
+    """Write (or overwrite) a page's `PageDates` from its current dates, under `parent`."""
+    PageDates.objects.bulk_create(
+        [
+            PageDates(
+                page_id=page.pk,
+                parent_id=parent.pk if parent else None,
+                effective_date=effective_date(page),
+                listing_date=listing_date(page),
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["page"],
+        update_fields=["parent", "effective_date", "listing_date"],
+    )
+
+
+def update_listing_parent(page: Page, parent: Page | None) -> None:
+    """Rewrite the `PageDates` of an article's parent, whose listing date may follow it."""
+    if parent is not None and issubclass(page.specific_class or Page, Article):
+        update_page_dates(parent, find_parent(parent))
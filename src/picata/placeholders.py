@@ -0,0 +1,65 @@
+"""Low-quality image placeholders, shown inline while an image's real renditions load.
+
+Each image gets an `ImagePlaceholder`: a blurred thumbnail (at most `PICATA_PLACEHOLDER_SIZE`
+pixels on a side) as a WebP data URI, and the image's dominant colour. Both come from one
+reduced decode of the image's file, with Pillow doing the pixel work (scaling, blurring
+and colour quantisation) in C. They're computed in the rendition workers (see
+`picata.renditions`) once an image's saved, and again only if its file changes, and are
+rendered as the background of `WrappedImageChooserBlock`'s `<img>`.
+"""
+
+import base64
+import io
+from typing import IO
+
+from django.conf import settings
+from PIL import Image as PILImage
+from PIL import ImageFilter, ImageOps
+from wagtail.images import get_image_model
+from wagtail.utils.file import hash_filelike
+
+from picata.models import ImagePlaceholder
+
+# Size of the thumbnail the dominant colour's found in, and the number of colours it's reduced to
+COLOUR_SAMPLE_SIZE = 64
+COLOUR_SAMPLE_COLOURS = 8
+
+
+def compute_placeholder(file: IO[bytes]) -> tuple[str, str]:
+    """Return a blurred thumbnail (as a data URI) and the dominant colour of an image file."""
+    size = getattr(settings, "PICATA_PLACEHOLDER_SIZE", 16)
+    with PILImage.open(file) as source:
+        source.draft("RGB", (COLOUR_SAMPLE_SIZE, COLOUR_SAMPLE_SIZE))  # Decode JPEGs scaled down
+        sample = ImageOps.exif_transpose(source).convert("RGB")
+    sample.thumbnail((COLOUR_SAMPLE_SIZE, COLOUR_SAMPLE_SIZE))
+
+    quantised = sample.quantize(colors=COLOUR_SAMPLE_COLOURS)
+    _, index = max(quantised.getcolors() or [(1, 0)])
+    red, green, blue = (quantised.getpalette() or [0, 0, 0])[index * 3 : index * 3 + 3]
+
+    sample.thumbnail((size, size))
+    thumbnail = io.BytesIO()
+    sample.filter(ImageFilter.GaussianBlur(1)).save(thumbnail, "WEBP", quality=40)
+    data_uri = "data:image/webp;base64," + base64.b64encode(thumbnail.getvalue()).decode()
+    return data_uri, f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def store_placeholder(image_id: int) -> bool:
+    """Compute and store an image's placeholder, unless it's current; returns whether it was."""
+    image = get_image_model().objects.filter(pk=image_id).first()
+    if image is None:
+        return False
+    file_hash = image.file_hash
+    if not file_hash:  # Set by Wagtail's upload views, but not by every save
+        with image.open_file() as file:
+            file_hash = hash_filelike(file)
+        get_image_model().objects.filter(pk=image_id).update(file_hash=file_hash)
+    if ImagePlaceholder.objects.filter(image_id=image_id, file_hash=file_hash).exists():
+        return False
+    with image.open_file() as file:
+        data_uri, colour = compute_placeholder(file)
+    ImagePlaceholder.objects.update_or_create(
+        image_id=image_id,
+        defaults={"file_hash": file_hash, "data_uri": data_uri, "colour": colour},
+    )
+    return True
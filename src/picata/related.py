@@ -0,0 +1,333 @@
+"""Precomputed "related articles", scored by shared tags, article type and text similarity.
+
+Every live `Article`'s searchable text is reduced to term counts and weighted by TF-IDF
+into a sparse, unit-length vector, of which the most significant terms are kept (both in
+`ArticleTerms`). Candidates are scored by a weighted sum of the cosine similarity of their
+tag sets, whether they share an `ArticleType`, and the dot product of their text vectors.
+The best are stored as `RelatedArticle` rows, so rendering an article's related links is
+one indexed query.
+
+`rebuild_related_articles` scores every article through an inverted index of the vectors,
+whose postings keep only the articles each term is most significant to, so the work grows
+with the number of articles rather than its square. `update_related_articles` scores one
+article as it's published, against only the articles sharing a term, tag or type with it
+(found by the database), and slots it into those articles' lists where it now belongs; IDF
+weights drift as the corpus grows until the next rebuild. Articles live before their terms
+were first recorded are scored after `migrate` (see `picata.signals`).
+"""
+
+# NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
+# pyright: reportAttributeAccessIssue=false
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+from wagtail.search import index
+
+from picata.models import Article, ArticleTerms, PageTagRelation, RelatedArticle
+from picata.search import field_text
+
+TOKEN_REGEX = re.compile(r"[a-z][a-z0-9]{2,}")
+STOP_WORDS = frozenset(
+    "about after also and are because been before but can could does for from had has have "
+    "her his how into its just like more most not now our out she should some such than that "
+    "the their them then there these they this those through too use used using very was way "
+    "were what when where which while who will with would you your".split()
+)
+
+# Relative weights of each signal in an overall score
+TAG_WEIGHT = 0.5
+TYPE_WEIGHT = 0.2
+TEXT_WEIGHT = 0.3
+
+# Terms in more than this fraction of articles say little about relatedness, and are ignored
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+# How many of its most significant terms each article's vector keeps, and how many of the
+# articles each term is most significant to a rebuild's inverted index keeps; together they
+# bound the work of finding an article's text matches
+VECTOR_TERMS = 25
+MAX_POSTINGS = 100
+
+# How many terms' document frequencies to count in each query
+FREQUENCY_BATCH_SIZE = 200
+
+SparseVector = dict[str, float]
+
+
+def related_count() -> int:
+    """Return how many related articles to keep for each article."""
+    return getattr(settings, "PICATA_RELATED_ARTICLES", 5)
+
+
+def term_counts(article: Article) -> dict[str, int]:
+    """Count the terms in an article's searchable text (besides its tags and type)."""
+    texts = [
+        text
+        for field in article.search_fields
+        if isinstance(field, index.SearchField) and field.field_name not in {"tags", "page_type"}
+        for text in field_text(article, field)
+    ]
+    tokens = TOKEN_REGEX.findall(" ".join(texts).lower())
+    return dict(Counter(token for token in tokens if token not in STOP_WORDS))
+
+
+def inverse_document_frequencies(
+    document_frequency: Mapping[str, int], total: int
+) -> dict[str, float]:
+    """Weight terms by how few of `total` documents they're in, dropping ubiquitous ones."""
+    return {
+        term: math.log((1 + total) / (1 + frequency)) + 1
+        for term, frequency in document_frequency.items()
+        if frequency <= max(1, MAX_DOCUMENT_FREQUENCY * total)
+    }
+
+
+def unit_vector(counts: Mapping[str, int], idf: Mapping[str, float]) -> SparseVector:
+    """Weight a document's term counts by TF-IDF, into a unit-length sparse vector."""
+    vector = {
+        term: (1 + math.log(count)) * idf[term] for term, count in counts.items() if term in idf
+    }
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+def tfidf_vectors(counts_by_id: dict[int, dict[str, int]]) -> dict[int, SparseVector]:
+    """Weight each document's term counts by TF-IDF, into unit-length sparse vectors."""
+    document_frequency = Counter(term for counts in counts_by_id.values() for term in counts)
+    idf = inverse_document_frequencies(document_frequency, len(counts_by_id))
+    return {article_id: unit_vector(counts, idf) for article_id, counts in counts_by_id.items()}
+
+
+def significant_terms(vector: SparseVector) -> SparseVector:
+    """Keep the `VECTOR_TERMS` heaviest terms of a vector, at their weights in the whole."""
+    return dict(sorted(vector.items(), key=lambda item: (-item[1], item[0]))[:VECTOR_TERMS])
+
+
+def dot(vector: SparseVector, other: SparseVector) -> float:
+    """Return the dot product of two sparse vectors."""
+    return sum(weight * other.get(term, 0.0) for term, weight in vector.items())
+
+
+class Corpus:
+    """The types, tags and text vectors of some live articles, to score them against each other."""
+
+    def __init__(self, articles: QuerySet[Article], vectors: dict[int, SparseVector]) -> None:
+        """Load the given articles' types and tags (in two queries), alongside their vectors."""
+        self.page_types: dict[int, int | None] = dict(articles.values_list("pk", "page_type"))
+        self.tags: dict[int, set[int]] = defaultdict(set)
+        relations = PageTagRelation.objects.filter(content_object__in=articles.values("pk"))
+        for article_id, tag_id in relations.values_list("content_object", "tag"):
+            self.tags[article_id].add(tag_id)
+        self.vectors = {article_id: vectors.get(article_id, {}) for article_id in self.page_types}
+
+        self.ids_by_type: dict[int, list[int]] = defaultdict(list)
+        self.ids_by_tag: dict[int, set[int]] = defaultdict(set)
+        for article_id, page_type in sorted(self.page_types.items()):
+            if page_type is not None:
+                self.ids_by_type[page_type].append(article_id)
+            for tag_id in self.tags.get(article_id, set()):
+                self.ids_by_tag[tag_id].add(article_id)
+
+    def score(self, article_id: int, other_id: int, text_similarity: float) -> float:
+        """Combine tag overlap, a shared article type and text similarity into one score."""
+        tags, other_tags = self.tags.get(article_id, set()), self.tags.get(other_id, set())
+        tag_similarity = (
+            len(tags & other_tags) / math.sqrt(len(tags) * len(other_tags))
+            if tags and other_tags
+            else 0.0
+        )
+        page_type = self.page_types.get(article_id)
+        same_type = page_type is not None and page_type == self.page_types.get(other_id)
+        return (
+            TAG_WEIGHT * tag_similarity
+            + TYPE_WEIGHT * float(same_type)
+            + TEXT_WEIGHT * text_similarity
+        )
+
+    def postings(self) -> dict[str, list[tuple[int, float]]]:
+        """Index the articles by term, keeping the `MAX_POSTINGS` each term weighs most in."""
+        postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for article_id, vector in self.vectors.items():
+            for term, weight in vector.items():
+                postings[term].append((article_id, weight))
+        return {
+            term: heapq.nlargest(MAX_POSTINGS, entries, key=lambda entry: entry[1])
+            for term, entries in postings.items()
+        }
+
+    def text_similarities(
+        self, article_id: int, postings: dict[str, list[tuple[int, float]]]
+    ) -> dict[int, float]:
+        """Return an article's similarity to those indexed under its terms in `postings`."""
+        similarities: dict[int, float] = defaultdict(float)
+        for term, weight in self.vectors.get(article_id, {}).items():
+            for other_id, other_weight in postings.get(term, []):
+                if other_id != article_id:
+                    similarities[other_id] += weight * other_weight
+        return similarities
+
+    def candidates(self, article_id: int, text_similarity: dict[int, float]) -> set[int]:
+        """Return the articles that may rank among an article's best, given its text matches.
+
+        Those sharing a tag or a term are all candidates. Those sharing only its type all
+        score the same, and ties rank by id, so only the first few of them can make the cut.
+        """
+        found = text_similarity.keys() | {
+            other_id
+            for tag_id in self.tags.get(article_id, set())
+            for other_id in self.ids_by_tag[tag_id]
+        }
+        page_type = self.page_types.get(article_id)
+        if page_type is not None:
+            same_type = (
+                other_id
+                for other_id in self.ids_by_type[page_type]
+                if other_id not in found and other_id != article_id
+            )
+            found.update(islice(same_type, related_count()))
+        return found - {article_id}
+
+    def ranked(self, article_id: int, text_similarity: dict[int, float]) -> list[tuple[int, float]]:
+        """Score an article's candidates, returning the best `related_count()`, best first."""
+        scores = [
+            (other_id, self.score(article_id, other_id, text_similarity.get(other_id, 0.0)))
+            for other_id in self.candidates(article_id, text_similarity)
+        ]
+        scores = [(other_id, score) for other_id, score in scores if score > 0]
+        return sorted(scores, key=lambda item: (-item[1], item[0]))[: related_count()]
+
+
+def store_terms(article: Article) -> SparseVector:
+    """Record the term counts and vector of an article's current text, returning its vector.
+
+    The IDF weights come from the document frequencies of its terms among the other live
+    articles' recorded counts, which the database counts.
+    """
+    counts = term_counts(article)
+    others = ArticleTerms.objects.filter(article__live=True).exclude(article=article)
+    terms = list(counts)
+    total = others.count()
+    document_frequency: dict[str, int] = {}
+    for start in range(0, len(terms), FREQUENCY_BATCH_SIZE):
+        batch = terms[start : start + FREQUENCY_BATCH_SIZE]
+        frequencies = others.aggregate(
+            **{
+                f"term_{position}": Count("pk", filter=Q(counts__has_key=term))
+                for position, term in enumerate(batch)
+            }
+        )
+        for position, term in enumerate(batch):
+            document_frequency[term] = frequencies[f"term_{position}"] + 1  # This article's too
+    vector = significant_terms(
+        unit_vector(counts, inverse_document_frequencies(document_frequency, total + 1))
+    )
+    ArticleTerms.objects.update_or_create(
+        article=article, defaults={"counts": counts, "vector": vector}
+    )
+    return vector
+
+
+def rebuild_related_articles() -> int:
+    """Recompute every live article's terms and related articles, returning how many."""
+    articles = Article.objects.live().select_related("page_type").prefetch_related("tags")
+    with transaction.atomic():
+        counts_by_id = {article.pk: term_counts(article) for article in articles}
+        vectors = {
+            article_id: significant_terms(vector)
+            for article_id, vector in tfidf_vectors(counts_by_id).items()
+        }
+        ArticleTerms.objects.all().delete()
+        ArticleTerms.objects.bulk_create(
+            ArticleTerms(article_id=article_id, counts=counts, vector=vectors[article_id])
+            for article_id, counts in counts_by_id.items()
+        )
+        corpus = Corpus(Article.objects.live(), vectors)
+        postings = corpus.postings()
+        RelatedArticle.objects.all().delete()
+        RelatedArticle.objects.bulk_create(
+            (
+                RelatedArticle(source_id=article_id, target_id=other_id, score=score)
+                for article_id in corpus.page_types
+                for other_id, score in corpus.ranked(
+                    article_id, corpus.text_similarities(article_id, postings)
+                )
+            ),
+            batch_size=1000,
+        )
+    return len(corpus.page_types)
+
+
+def update_related_articles(article: Article) -> None:
+    """Refresh a newly-published article's related articles, and its place in others' lists.
+
+    Only the articles sharing a term, tag or type with it (or listing it already) are
+    loaded, and only their lists are locked and rewritten. Articles sharing only its type
+    all score the same, so only those first by id are considered, and of the rest, those
+    with room in their lists take it up only at the next rebuild.
+    """
+    vector = store_terms(article)
+    live = Article.objects.live().exclude(pk=article.pk)
+    text_vectors: dict[int, SparseVector] = {}
+    if vector:
+        sharing_terms = ArticleTerms.objects.filter(
+            article__in=live.values("pk"), vector__has_any_keys=list(vector)
+        )
+        text_vectors = dict(sharing_terms.values_list("article", "vector"))
+    tag_ids = PageTagRelation.objects.filter(content_object=article).values("tag")
+    sharing_tags = PageTagRelation.objects.filter(
+        tag__in=tag_ids, content_object__in=live.values("pk")
+    ).values_list("content_object", flat=True)
+    listing = RelatedArticle.objects.filter(target=article).values_list("source", flat=True)
+    found = text_vectors.keys() | set(sharing_tags) | set(listing)
+    if article.page_type_id is not None:
+        same_type = live.filter(page_type=article.page_type_id).exclude(pk__in=found)
+        found |= set(same_type.order_by("pk").values_list("pk", flat=True)[: related_count()])
+
+    corpus = Corpus(
+        Article.objects.live().filter(pk__in=found | {article.pk}),
+        {**text_vectors, article.pk: vector},
+    )
+    similarity = {other_id: dot(vector, other) for other_id, other in text_vectors.items()}
+    ranked = corpus.ranked(article.pk, {k: v for k, v in similarity.items() if v > 0})
+
+    with transaction.atomic():
+        RelatedArticle.objects.filter(source=article).delete()
+        RelatedArticle.objects.bulk_create(
+            RelatedArticle(source=article, target_id=other_id, score=score)
+            for other_id, score in ranked
+        )
+
+        # Slot the article into (or out of) other articles' lists, by the same symmetric score
+        others = corpus.page_types.keys() - {article.pk}
+        links_by_source = defaultdict(list)
+        locked = RelatedArticle.objects.filter(source__in=others).order_by("pk")
+        for link in locked.select_for_update():
+            links_by_source[link.source_id].append((link.target_id, link.score))
+        for other_id in others:
+            links = links_by_source[other_id]
+            score = corpus.score(article.pk, other_id, similarity.get(other_id, 0.0))
+            kept = [(target_id, s) for target_id, s in links if target_id != article.pk]
+            if score > 0:
+                kept.append((article.pk, score))
+            kept = sorted(kept, key=lambda item: (-item[1], item[0]))[: related_count()]
+            if article.pk in dict(links) or article.pk in dict(kept):
+                RelatedArticle.objects.filter(source_id=other_id).delete()
+                RelatedArticle.objects.bulk_create(
+                    RelatedArticle(source_id=other_id, target_id=target_id, score=s)
+                    for target_id, s in kept
+                )
+
+
+def remove_related_articles(article: Article) -> None:
+    """Forget an unpublished article's terms, and drop it from every related-articles list."""
+    ArticleTerms.objects.filter(article=article).delete()
+    RelatedArticle.objects.filter(source=article).delete()
+    RelatedArticle.objects.filter(target=article).delete()
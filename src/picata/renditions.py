@@ -0,0 +1,368 @@
+"""Planning, eager generation and responsive markup of image renditions.
+
+A rendition *plan* maps image ids to every filter spec the site's blocks and templates
+will ask for:
+
+- the responsive variants of images in `WrappedImageChooserBlock`s and rich text (see
+  below), planned as `RESPONSIVE` (or `RESPONSIVE-<max width>`) and expanded for each
+  image by the worker generating them;
+- "original", for images in other StreamField blocks (as `ImageChooserBlock` renders);
+- "fill-1200x630", for a site's `SocialSettings.default_social_image` (see base.html).
+
+Plans are made when an image is uploaded, when a page showing images is published, and
+when a social image is chosen, and their renditions generated in a bounded pool of worker
+processes (`PICATA_RENDITION_WORKERS`) once the change has been committed; submitting
+work never waits for it, though `when_done` can follow it up with another job (e.g. to
+re-render a page once its renditions exist). `manage.py generate_renditions` does the same
+for every live page.
+
+Responsive images are rendered by `picture_tag` as a `<picture>`, with a `<source>` for
+each of `PICATA_IMAGE_FORMATS` (e.g. AVIF and WebP) and a fallback `<img>` in the image's
+own format, each offering the image at `PICATA_IMAGE_WIDTHS`. Widths at or beyond the
+image's own would give identical renditions (Wagtail never scales up), so they're folded
+into one at its own width. Markup never waits for a rendition: those not yet generated
+are linked through Wagtail's image-serving view, which generates them on demand. Images
+loaded by `picture_images` bring their renditions and placeholders with them, so a page's
+pictures cost a fixed number of queries however many it shows.
+"""
+
+# NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
+# pyright: reportAttributeAccessIssue=false
+
+import logging
+import multiprocessing
+import re
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import SafeString
+from wagtail.blocks import ListBlock, RichTextBlock, StreamBlock, StructBlock
+from wagtail.fields import RichTextField, StreamField
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.formats import Format, get_image_format
+from wagtail.images.models import AbstractImage, Filter
+from wagtail.images.rich_text import ImageEmbedHandler
+from wagtail.models import Page
+
+from picata.media import image_url
+
+logger = logging.getLogger(__name__)
+
+# Filter specs requested for images in StreamFields, and for sites' social images
+IMAGE_BLOCK_FILTERS = ("original",)
+SOCIAL_IMAGE_FILTERS = ("fill-1200x630",)
+
+# Planned in place of the filter specs of an image's responsive variants (optionally suffixed
+# with a maximum width), which depend on the image's own width
+RESPONSIVE = "responsive"
+
+DEFAULT_IMAGE_WIDTHS = (480, 800, 1200, 1600)
+DEFAULT_IMAGE_FORMATS = ("avif", "webp")
+
+EMBED_REGEX = re.compile(r"<embed\b[^>]*>")
+ATTRIBUTE_REGEX = re.compile(r'([\w-]+)="([^"]*)"')
+
+# Filter specs needed for each image, by image id
+RenditionPlan = dict[int, set[str]]
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def image_widths(image: AbstractImage, max_width: int | None = None) -> list[int]:
+    """Return the widths to offer an image at, up to its own width (and `max_width`)."""
+    limit = min(image.width, max_width or image.width)
+    widths = getattr(settings, "PICATA_IMAGE_WIDTHS", DEFAULT_IMAGE_WIDTHS)
+    return sorted({width for width in widths if width < limit} | {limit})
+
+
+def image_formats() -> tuple[str, ...]:
+    """Return the formats offered as alternatives to an image's own, most preferred first."""
+    return tuple(getattr(settings, "PICATA_IMAGE_FORMATS", DEFAULT_IMAGE_FORMATS))
+
+
+def variant_filter_spec(width: int, image_format: str | None = None) -> str:
+    """Return the filter spec for an image's variant at a width (and in another format)."""
+    return f"width-{width}|format-{image_format}" if image_format else f"width-{width}"
+
+
+def responsive_spec(max_width: int | None = None) -> str:
+    """Return the plan entry for an image's responsive variants, up to `max_width`."""
+    return f"{RESPONSIVE}-{max_width}" if max_width else RESPONSIVE
+
+
+def responsive_filter_specs(image: AbstractImage, max_width: int | None = None) -> list[str]:
+    """Return the filter specs of every responsive variant of an image."""
+    return [
+        variant_filter_spec(width, image_format)
+        for image_format in (None, *image_formats())
+        for width in image_widths(image, max_width)
+    ]
+
+
+def expand_filter_specs(image: AbstractImage, filter_specs: Iterable[str]) -> list[str]:
+    """Return the filter specs in a plan's entry for an image, with `RESPONSIVE` expanded."""
+    expanded: list[str] = []
+    for filter_spec in filter_specs:
+        if filter_spec == RESPONSIVE or filter_spec.startswith(f"{RESPONSIVE}-"):
+            max_width = filter_spec.removeprefix(RESPONSIVE).lstrip("-")
+            expanded += responsive_filter_specs(image, int(max_width) if max_width else None)
+        else:
+            expanded.append(filter_spec)
+    return list(dict.fromkeys(expanded))
+
+
+def merge_plans(*plans: RenditionPlan) -> RenditionPlan:
+    """Combine several plans into one."""
+    merged: RenditionPlan = defaultdict(set)
+    for plan in plans:
+        for image_id, filter_specs in plan.items():
+            merged[image_id] |= filter_specs
+    return dict(merged)
+
+
+def plan_rich_text(html: str) -> RenditionPlan:
+    """Plan renditions for the images embedded in some rich text (in its database format)."""
+    plan: RenditionPlan = defaultdict(set)
+    for embed in EMBED_REGEX.findall(html):
+        attributes = dict(ATTRIBUTE_REGEX.findall(embed))
+        if attributes.get("embedtype") != "image" or not attributes.get("id", "").isdigit():
+            continue
+        try:
+            image_format = get_image_format(attributes.get("format", ""))
+        except KeyError:
+            continue
+        if isinstance(image_format, ResponsiveFormat):
+            plan[int(attributes["id"])].add(responsive_spec(image_format.max_width))
+        else:
+            plan[int(attributes["id"])].add(image_format.filter_spec)
+    return dict(plan)
+
+
+def plan_block(block: Any, value: Any) -> RenditionPlan:  # noqa: ANN401
+    """Plan renditions for the images in a block's value, and those of its children."""
+    if not value:
+        return {}
+    if isinstance(block, ImageChooserBlock):
+        return {value.pk: set(getattr(block, "planned_filter_specs", IMAGE_BLOCK_FILTERS))}
+    if isinstance(block, RichTextBlock):
+        return plan_rich_text(value.source)
+    if isinstance(block, StreamBlock):
+        children = [(child.block, child.value) for child in value]
+    elif isinstance(block, StructBlock):
+        children = [(child, value.get(name)) for name, child in block.child_blocks.items()]
+    elif isinstance(block, ListBlock):
+        children = [(block.child_block, item) for item in value]
+    else:
+        children = []
+    return merge_plans(*(plan_block(child, child_value) for child, child_value in children))
+
+
+def plan_page(page: Page) -> RenditionPlan:
+    """Plan renditions for every image shown in a (specific) page's content."""
+    plans = []
+    for field in page._meta.get_fields():  # noqa: SLF001
+        if isinstance(field, StreamField):
+            plans.append(plan_block(field.stream_block, getattr(page, field.name)))
+        elif isinstance(field, RichTextField):
+            plans.append(plan_rich_text(getattr(page, field.name) or ""))
+    return merge_plans(*plans)
+
+
+def plan_social_image(image_id: int | None) -> RenditionPlan:
+    """Plan renditions for an image chosen as a site's default social image."""
+    return {image_id: set(SOCIAL_IMAGE_FILTERS)} if image_id else {}
+
+
+def plan_upload(image: AbstractImage) -> RenditionPlan:
+    """Plan renditions for a newly-uploaded image, as it'd be shown in a page's content."""
+    return {image.pk: {RESPONSIVE, *IMAGE_BLOCK_FILTERS}}
+
+
+def generate_renditions(image_id: int, filter_specs: list[str]) -> int:
+    """Create an image's missing renditions, returning the number of filter specs covered."""
+    image = get_image_model().objects.filter(pk=image_id).first()
+    if image is None:
+        return 0
+    expanded = expand_filter_specs(image, filter_specs)
+    image.get_renditions(*expanded)
+    return len(expanded)
+
+
+def get_pool() -> ProcessPoolExecutor | None:
+    """Return this process's pool of image-processing workers, or None to work in-process."""
+    global _pool  # noqa: PLW0603
+    workers = getattr(settings, "PICATA_RENDITION_WORKERS", 2)
+    # Worker processes (e.g. saving images, which submits jobs of its own) work in-process
+    if workers < 1 or multiprocessing.parent_process() is not None:
+        return None
+    if _pool is None:
+        # Spawned (rather than forked) workers share no database connections with this process
+        _pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+        )
+    return _pool
+
+
+def log_failure(future: Future) -> None:
+    """Log the exception from a failed job, if any."""
+    if future.exception() is not None:
+        logger.error("Background image processing failed", exc_info=future.exception())
+
+
+def submit_job(function: Callable[..., Any], *args: Any) -> Future:  # noqa: ANN401
+    """Run a (picklable, module-level) function in the worker pool, without waiting for it."""
+    pool = get_pool()
+    if pool is None:
+        future: Future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as error:  # noqa: BLE001
+            future.set_exception(error)
+            log_failure(future)
+        return future
+    future = pool.submit(function, *args)
+    future.add_done_callback(log_failure)
+    return future
+
+
+def when_done(futures: Iterable[Future], function: Callable[..., Any], *args: Any) -> None:  # noqa: ANN401
+    """Submit a job once every one of `futures` has finished (whether or not it succeeded)."""
+    pending = set(futures)
+    lock = threading.Lock()
+
+    def finished(future: Future) -> None:
+        with lock:
+            pending.discard(future)
+            if pending:
+                return
+        submit_job(function, *args)
+
+    if not pending:
+        submit_job(function, *args)
+    for future in list(pending):
+        future.add_done_callback(finished)
+
+
+def submit_plan(plan: RenditionPlan) -> list[Future]:
+    """Start generating a plan's renditions, one job per image, without waiting for them."""
+    return [
+        submit_job(generate_renditions, image_id, sorted(filter_specs))
+        for image_id, filter_specs in plan.items()
+    ]
+
+
+def schedule_plan(plan: RenditionPlan) -> None:
+    """Submit a plan's renditions for generation once the current transaction commits."""
+    if plan:
+        transaction.on_commit(lambda: submit_plan(plan))
+
+
+def plan_site(pages: Iterable[Page]) -> RenditionPlan:
+    """Plan renditions for the given pages, and every site's social image."""
+    from picata.models import SocialSettings  # Avoid circular imports
+
+    social_image_ids = SocialSettings.objects.values_list("default_social_image", flat=True)
+    return merge_plans(
+        *(plan_page(page) for page in pages),
+        *(plan_social_image(image_id) for image_id in social_image_ids),
+    )
+
+
+def picture_images() -> QuerySet:
+    """Return a queryset of images loading their renditions and placeholders along with them."""
+    return get_image_model().objects.select_related("placeholder").prefetch_renditions()
+
+
+def picture_tag(
+    image: AbstractImage,
+    alt_text: str | None = None,
+    *,
+    max_width: int | None = None,
+    lazy: bool = True,
+    attributes: dict[str, Any] | None = None,
+) -> SafeString:
+    """Return a `<picture>` offering an image's responsive variants, without generating any.
+
+    The `<img>` carries the intrinsic dimensions of the largest variant (so the browser can
+    reserve its space before it loads), any extra `attributes`, and (when `lazy`, i.e.
+    probably below the fold) `loading="lazy"`. Existing renditions are looked up in one
+    query, or none if the image was loaded by `picture_images`.
+    """
+    widths = image_widths(image, max_width)
+    specs = [
+        variant_filter_spec(width, image_format)
+        for image_format in (None, *image_formats())
+        for width in widths
+    ]
+    existing = {
+        rendition.filter_spec: rendition.url
+        for rendition in image.find_existing_renditions(*map(Filter, specs)).values()
+    }
+
+    def srcset(image_format: str | None) -> str:
+        return ", ".join(
+            f"{existing.get(spec) or image_url(image, spec)} {width}w"
+            for width in widths
+            for spec in [variant_filter_spec(width, image_format)]
+        )
+
+    largest = widths[-1]
+    sizes = f"(max-width: {largest}px) 100vw, {largest}px"
+    fallback = variant_filter_spec(largest)
+    img_attributes = {
+        "alt": image.default_alt_text if alt_text is None else alt_text,
+        "src": existing.get(fallback) or image_url(image, fallback),
+        "srcset": srcset(None),
+        "sizes": sizes,
+        "width": largest,
+        "height": round(image.height * largest / image.width),
+        "decoding": "async",
+        **({"loading": "lazy"} if lazy else {}),
+        **(attributes or {}),
+    }
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((image_format, srcset(image_format), sizes) for image_format in image_formats()),
+    )
+    return format_html("<picture>{}<img{}></picture>", sources, flatatt(img_attributes))
+
+
+class ResponsiveFormat(Format):
+    """A rich text image format rendering `picture_tag`s, up to its filter spec's width."""
+
+    def __init__(self, name: str, label: str, classname: str, max_width: int) -> None:
+        """Initialise the format, with a nominal filter spec of `width-<max_width>`."""
+        super().__init__(name, label, classname, f"width-{max_width}")
+        self.max_width = max_width
+
+    def image_to_html(
+        self,
+        image: AbstractImage,
+        alt_text: str,
+        extra_attributes: dict[str, Any] | None = None,
+    ) -> SafeString:
+        """Render the image as a lazily-loaded `<picture>`."""
+        attributes = {**(extra_attributes or {}), "class": self.classname}
+        return picture_tag(image, alt_text, max_width=self.max_width, attributes=attributes)
+
+
+class ResponsiveImageEmbedHandler(ImageEmbedHandler):
+    """Wagtail's rich text image embed handler, loading images by `picture_images`."""
+
+    @classmethod
+    def get_many(cls, attrs_list: list[dict]) -> list[AbstractImage | None]:
+        """Return the image embedded by each of `attrs_list`, in a fixed number of queries."""
+        ids = [attrs.get("id") for attrs in attrs_list]
+        images = {str(pk): image for pk, image in picture_images().in_bulk(ids).items()}
+        return [images.get(str(image_id)) for image_id in ids]
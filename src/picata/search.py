@@ -0,0 +1,158 @@
+"""Postgres-native full-text search over pages.
+
+Each page's `search_fields` are gathered into a `PageSearchDocument`, holding a stored,
+weighted `tsvector` (with a GIN index) and the plain text used for result snippets. A
+query is then a single indexed `@@` match, ranked with `ts_rank` and highlighted with
+`ts_headline`, rather than a scan over every page.
+
+Where the database isn't Postgres (or `PICATA_POSTGRES_SEARCH` is False), searches fall
+back to Wagtail's configured search backend. So do searches over live pages without
+documents, e.g. those published before documents were introduced, until they're filled
+in by `manage.py update_search_documents`.
+"""
+
+# NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
+# pyright: reportAttributeAccessIssue=false
+
+from collections import defaultdict
+from collections.abc import Iterable
+from functools import reduce
+from html import escape
+from operator import add
+from typing import Any
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import F, ForeignKey, TextField, Value
+from django.utils.safestring import SafeString, mark_safe
+from wagtail.models import Page
+from wagtail.query import PageQuerySet
+from wagtail.search import index
+from wagtail.search.backends.base import BaseSearchResults
+
+from picata.models import PageSearchDocument
+
+# Weight ('A' highest to 'D' lowest) given to the text of each search field, by name
+FIELD_WEIGHTS = {
+    "title": "A",
+    "seo_title": "A",
+    "tagline": "B",
+    "summary": "B",
+    "search_description": "B",
+    "tags": "B",
+    "page_type": "B",
+}
+DEFAULT_WEIGHT = "C"
+
+# Markers for highlighted terms, swapped for <mark> tags once the snippet's been escaped
+START_SEL, STOP_SEL = "\x02", "\x03"
+
+
+def search_config() -> str:
+    """Return the Postgres text search configuration to use (e.g. "english")."""
+    return getattr(settings, "PICATA_SEARCH_CONFIG", "english")
+
+
+def uses_postgres_search() -> bool:
+    """Return whether searches should use the Postgres-native search documents."""
+    return connection.vendor == "postgresql" and getattr(settings, "PICATA_POSTGRES_SEARCH", True)
+
+
+def flatten_text(value: Any) -> list[str]:  # noqa: ANN401
+    """Flatten a search field's value (a string, object, or nested list of them) to strings."""
+    if value is None:
+        return []
+    if isinstance(value, list | tuple):
+        return [text for item in value for text in flatten_text(item)]
+    return [str(value)]
+
+
+def field_text(page: Page, field: index.SearchField) -> list[str]:
+    """Return the searchable text in one of a page's search fields."""
+    try:
+        model_field = field.get_field(type(page))
+    except FieldDoesNotExist:
+        model_field = None
+    if isinstance(model_field, ForeignKey):
+        # Index the related object's string representation, rather than its primary key
+        return flatten_text(getattr(page, field.field_name))
+    return flatten_text(field.get_value(page))
+
+
+def weighted_text(page: Page) -> dict[str, str]:
+    """Gather the text in a page's search fields, grouped by weight."""
+    texts: dict[str, list[str]] = defaultdict(list)
+    for field in page.search_fields:
+        if isinstance(field, index.SearchField):
+            weight = FIELD_WEIGHTS.get(field.field_name, DEFAULT_WEIGHT)
+            texts[weight].extend(field_text(page, field))
+    return {weight: "\n".join(text for text in texts[weight] if text) for weight in sorted(texts)}
+
+
+def index_page(page: Page) -> None:
+    """Create or refresh the search document for a (specific) page."""
+    texts = weighted_text(page)
+    config = search_config()
+    vector = reduce(
+        add,
+        (
+            SearchVector(Value(text, output_field=TextField()), weight=weight, config=config)
+            for weight, text in texts.items()
+        ),
+    )
+    PageSearchDocument.objects.update_or_create(
+        page=page, defaults={"body": "\n".join(texts.values()), "search_vector": vector}
+    )
+
+
+def index_pages(pages: Iterable[Page]) -> int:
+    """Create or refresh search documents for many pages, returning how many were indexed."""
+    count = 0
+    for page in pages:
+        index_page(page.specific)
+        count += 1
+    return count
+
+
+def documents_cover(pages: PageQuerySet) -> bool:
+    """Return whether every live page among `pages` (below the tree root) has a document."""
+    return not pages.live().filter(depth__gt=1, search_document__isnull=True).exists()
+
+
+def search_pages(pages: PageQuerySet, query: str) -> PageQuerySet | BaseSearchResults:
+    """Search `pages` for `query`, returning results in order of relevance.
+
+    With Postgres search, results are annotated with their `rank` and a raw `snippet`
+    (see `format_snippet`).
+    """
+    if not (uses_postgres_search() and documents_cover(pages)):
+        return pages.search(query)
+
+    config = search_config()
+    search_query = SearchQuery(query, config=config, search_type="websearch")
+    return (
+        pages.filter(search_document__search_vector=search_query)
+        .annotate(
+            rank=SearchRank(F("search_document__search_vector"), search_query),
+            snippet=SearchHeadline(
+                "search_document__body",
+                search_query,
+                config=config,
+                start_sel=START_SEL,
+                stop_sel=STOP_SEL,
+                max_words=getattr(settings, "PICATA_SEARCH_SNIPPET_WORDS", 35),
+                min_words=15,
+                max_fragments=2,
+                fragment_delimiter=" … ",
+            ),
+        )
+        .order_by("-rank", "pk")
+    )
+
+
+def format_snippet(snippet: str) -> SafeString:
+    """Escape a raw `ts_headline` snippet, wrapping its highlighted terms in <mark> tags."""
+    html = escape(snippet).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+    return mark_safe(html)  # noqa: S308
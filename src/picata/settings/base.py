@@ -72,6 +72,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    "picata.middleware.PageCacheMiddleware",
     "picata.middleware.HTMLProcessingMiddleware",
 ]
 
@@ -112,6 +113,16 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -343,3 +354,115 @@ WAGTAILDOCS_EXTENSIONS = [
     "xlsx",
     "zip",
 ]
+
+
+# Picata
+
+# Cache for documents post-processed by `HTMLProcessingMiddleware`, keyed by a hash of the
+# raw response body and the registered transformers. Use "picata.caches.DjangoCache" (with
+# e.g. `{"alias": "default", "timeout": 3600}`) to share results between worker processes.
+PICATA_HTML_CACHE = {
+    "BACKEND": "picata.caches.LRUCache",
+    "OPTIONS": {"max_entries": 256},
+}
+
+# Document transformation strategy for `HTMLProcessingMiddleware`: "tree" parses each response
+# into a full lxml tree for every transformer to search, then pretty-prints it; "stream" makes a
+# single event-driven pass, buffering only the elements transformers have declared an interest in.
+PICATA_HTML_PIPELINE = "tree"
+
+# Cache for Pygments-highlighted `CodeBlock`s, keyed by language and a hash of the code; an
+# in-process LRU tier in front of the Django cache named by "alias" (shared between workers).
+PICATA_HIGHLIGHT_CACHE = {
+    "BACKEND": "picata.caches.TieredCache",
+    "OPTIONS": {"max_entries": 512, "alias": "default", "key_prefix": "picata:pygments"},
+}
+
+# Number of posts per page on `PostGroupPage` listings (paginated by effective date), and in
+# the `HomePage`'s "Recent posts".
+PICATA_POSTS_PER_PAGE = 20
+PICATA_RECENT_POSTS = 5
+
+# Number of results per page of search results.
+PICATA_SEARCH_RESULTS_PER_PAGE = 20
+
+# Search pages with Postgres full-text search documents (see `picata.search`) when the database
+# is Postgres, ranking results with `ts_rank` and highlighting them with `ts_headline` snippets
+# of up to PICATA_SEARCH_SNIPPET_WORDS words. Build the documents for existing pages with
+# `manage.py update_search_documents`.
+PICATA_POSTGRES_SEARCH = True
+PICATA_SEARCH_CONFIG = "english"
+PICATA_SEARCH_SNIPPET_WORDS = 35
+
+# Cache for pages of search results for visitors who aren't logged in, keyed by the normalised
+# search parameters and the current content generation. The generation is a counter (held in
+# the Django cache named by PICATA_GENERATION_CACHE) bumped whenever a page is published,
+# unpublished or deleted, retiring every result cached before; with more than one worker
+# process, that cache must be shared between them (e.g. Redis or Memcached).
+PICATA_SEARCH_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"alias": "default", "key_prefix": "picata:search", "timeout": 600},
+}
+PICATA_GENERATION_CACHE = "default"
+
+# Cache for the site menu's pages, per site and login state, keyed by the content generation (so
+# an in-process cache is safe, as long as the generation's shared).
+PICATA_MENU_CACHE = {
+    "BACKEND": "picata.caches.LRUCache",
+    "OPTIONS": {"max_entries": 16},
+}
+
+# Number of articles in the RSS and Atom feeds, and the cache for their serialised bytes (kept
+# per feed type and host until the content generation changes).
+PICATA_FEED_ITEMS = 10
+PICATA_FEED_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"alias": "default", "key_prefix": "picata:feed", "timeout": None},
+}
+
+# Cache of finished Wagtail pages served to visitors without a session, keyed by host, path and
+# query string, and purged for a page and its ancestors as it's published, unpublished, moved or
+# deleted. Purges must reach every worker process, so use a cache they share. None disables it.
+PICATA_PAGE_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"alias": "default", "key_prefix": "picata:page", "timeout": 600},
+}
+
+# Directory to write static copies of the sitemap and feeds to (with .gz and .br variants), for
+# nginx to serve without Django; they're rewritten as pages are published, and by
+# `manage.py write_static_artifacts`. None disables them (leaving the views to serve).
+PICATA_ARTIFACTS_ROOT = None
+
+# Directory the whole public site is exported to as static files by `manage.py export_site`, for
+# nginx to serve (see config/nginx-site-export.conf). Once it's been exported, publishing a page
+# re-exports the pages showing it. None disables re-exporting on publish.
+PICATA_EXPORT_ROOT = None
+
+# Related articles, scored by shared tags, article type and TF-IDF text similarity, are kept
+# up to date as articles are published; `manage.py rebuild_related_articles` rescores them all
+PICATA_RELATED_ARTICLES = 5
+
+# Image renditions are planned (for every filter spec the site's blocks and templates use) and
+# generated in this many worker processes when images are uploaded and pages published, so no
+# request waits on them; `manage.py generate_renditions` fills in any missing. 0 works in-process.
+PICATA_RENDITION_WORKERS = 2
+
+# Responsive images (in WrappedImageChooserBlocks and rich text) are offered at these widths,
+# in each of these formats as well as their own, as <picture>s with srcsets
+PICATA_IMAGE_WIDTHS = [480, 800, 1200, 1600]
+PICATA_IMAGE_FORMATS = ["avif", "webp"]
+
+# Largest side (in pixels) of the blurred thumbnails shown in place of images as they load,
+# computed by the rendition workers when images are saved
+PICATA_PLACEHOLDER_SIZE = 16
+
+# Images' renditions and documents' files are checked by Django, then (where this is set) sent
+# by nginx, via an X-Accel-Redirect to this `internal` location aliasing MEDIA_ROOT; otherwise
+# they're streamed by Django. Renditions' files are remembered, by image and filter spec, in
+# PICATA_RENDITION_PATH_CACHE, which should be shared by every worker process.
+PICATA_ACCEL_REDIRECT_URL = None
+PICATA_RENDITION_PATH_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"alias": "default", "key_prefix": "picata:rendition", "timeout": None},
+}
+SENDFILE_BACKEND = "picata.media"
@@ -29,6 +29,9 @@ with contextlib.suppress(Exception):
 INTERNAL_IPS += CLASS_C_DEVICE_ADDRS
 ALLOWED_HOSTS += CLASS_C_NETWORK_ADDR
 
+# Always render pages afresh while developing
+PICATA_PAGE_CACHE = None
+
 if getenv("DJANGO_MANAGEMENT_COMMAND", "").startswith("runserver"):
     logger.warning(
         "Loading picata.settings.dev…\n"
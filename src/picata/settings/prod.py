@@ -7,6 +7,19 @@ from .base import *  # noqa: F403
 # outdated JavaScript / CSS assets being served from cache
 # (e.g. after a Wagtail upgrade).
 # See https://docs.djangoproject.com/en/5.1/ref/contrib/staticfiles/#manifeststaticfilesstorage
-STORAGES["staticfiles"] = {
-    "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+# Picata's subclass also writes .gz and .br variants of files, for nginx to serve as they are.
+STORAGES["staticfiles"] = {"BACKEND": "picata.storage.PrecompressedManifestStaticFilesStorage"}
+
+# Share cached results (and the content generation, and page cache purges) between gunicorn's
+# worker processes
+CACHES["default"] = {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+    "LOCATION": BASE_DIR / "cache",
+    "OPTIONS": {"MAX_ENTRIES": 10000},
 }
+
+# Write the sitemap and feeds to disk as pages are published, for nginx to serve directly
+PICATA_ARTIFACTS_ROOT = BASE_DIR / "artifacts"
+
+# Have nginx send images' and documents' bytes, once Django's checked they may be seen
+PICATA_ACCEL_REDIRECT_URL = "/internal-media/"
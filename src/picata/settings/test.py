@@ -4,3 +4,9 @@ from .base import *  # noqa: F403
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "django-insecure-9yz$rw8%)1wm-l)j6q-r&$bu_n52sv=4q6)c5u8n10+5w+anec"  # noqa: S105
+
+# Render every page afresh (tests of the page cache enable it themselves)
+PICATA_PAGE_CACHE = None
+
+# Generate renditions in-process, rather than spawning workers
+PICATA_RENDITION_WORKERS = 0
@@ -0,0 +1,269 @@
+"""Receivers for Wagtail's page lifecycle signals, keeping derived data up to date.
+
+Receivers are connected in `picata.apps.Config.ready`.
+"""
+
+import logging
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Model
+from wagtail.models import Page
+
+from picata.artifacts import artifacts_root, write_artifacts
+from picata.caches import bump_content_generation
+from picata.export import affected_page_ids, export_page_changes, export_root
+from picata.media import forget_image_paths, forget_rendition_path
+from picata.models import Article, SocialSettings, TaggedPage
+from picata.page_cache import purge_url_paths
+from picata.page_dates import DATE_FIELDS, find_parent, update_listing_parent, update_page_dates
+from picata.placeholders import store_placeholder
+from picata.related import (
+    rebuild_related_articles,
+    remove_related_articles,
+    update_related_articles,
+)
+from picata.renditions import (
+    plan_page,
+    plan_social_image,
+    plan_upload,
+    schedule_plan,
+    submit_job,
+    submit_plan,
+    when_done,
+)
+from picata.search import index_page, uses_postgres_search
+from picata.tag_index import update_page_tags
+
+logger = logging.getLogger(__name__)
+
+
+def store_rendered_content(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Render and store a newly-published `Article`'s content."""
+    if isinstance(instance, Article):
+        instance.store_rendered_content()
+        logger.debug(f"Stored rendered content for article {instance.pk}")
+
+
+def clear_rendered_content(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Discard the rendered content of an unpublished `Article`."""
+    if isinstance(instance, Article):
+        instance.clear_rendered_content()
+
+
+def forget_renderings_of_links(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Clear stored article content linking to a page that's been (un)published or deleted."""
+    if isinstance(instance, Page):
+        Article.clear_rendered_content_referring_to(Page, [instance.pk])
+
+
+def forget_renderings_of_moved_links(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Clear stored article content linking to a moved (or renamed) page, or its descendants."""
+    Article.clear_rendered_content_referring_to(
+        Page, Page.objects.descendant_of(instance, inclusive=True)
+    )
+
+
+def forget_renderings_of_image(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401
+    """Clear stored article content showing an image that's been changed or deleted.
+
+    Saves just filling in the image's (lazily computed) file hash change nothing shown.
+    """
+    if kwargs.get("created") or kwargs.get("raw") or kwargs.get("update_fields") == {"file_hash"}:
+        return
+    Article.clear_rendered_content_referring_to(sender, [instance.pk])
+
+
+def refresh_related_articles(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Re-score a newly-published `Article` against the others."""
+    if isinstance(instance, Article):
+        update_related_articles(instance)
+
+
+def forget_related_articles(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Drop an unpublished `Article` from every related-articles list."""
+    if isinstance(instance, Article):
+        remove_related_articles(instance)
+
+
+def fill_related_articles(sender: Any, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Score related articles after migrating, if any live article's terms are missing.
+
+    Articles published before their terms were recorded (see migrations 0008 and 0013) have
+    none, and scoring them needs the real models' search fields, so it's done here.
+    """
+    if Article.objects.live().filter(terms__isnull=True).exists():
+        count = rebuild_related_articles()
+        logger.info(f"Scored related articles for {count} articles")
+
+
+def update_search_document(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Refresh the full-text search document of a newly-published page."""
+    if uses_postgres_search():
+        index_page(instance.specific)
+
+
+def copy_page_dates(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Copy a saved page's dates into its indexed `PageDates`, if they may have changed."""
+    update_fields = kwargs.get("update_fields")
+    if (
+        isinstance(instance, Page)
+        and not kwargs.get("raw")
+        and (update_fields is None or DATE_FIELDS & set(update_fields))
+    ):
+        parent = find_parent(instance)
+        update_page_dates(instance, parent)
+        update_listing_parent(instance, parent)
+
+
+def move_page_dates(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Note a moved page's new parent in its `PageDates`, and rewrite both parents' dates."""
+    before, after = kwargs["parent_page_before"], kwargs["parent_page_after"]
+    update_page_dates(instance, after)
+    update_listing_parent(instance, after)
+    if before.pk != after.pk:
+        update_listing_parent(instance, before)
+
+
+def forget_page_dates(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Rewrite the dates of a deleted article's parent (its own go with it)."""
+    update_listing_parent(instance, find_parent(instance))
+
+
+def retire_cached_content(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Start a new content generation when a page is published, unpublished, moved or deleted."""
+    if isinstance(instance, Page):
+        generation = bump_content_generation()
+        logger.debug(f"Page {instance.pk} changed; content generation is now {generation}")
+
+
+def retire_on_page_created(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401
+    """Start a new content generation when a page is added to the tree."""
+    if kwargs.get("created") and not kwargs.get("raw"):
+        retire_cached_content(sender, instance)
+
+
+def index_page_tags(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Update the tag index for a tagged page that's been published or unpublished."""
+    if isinstance(instance, TaggedPage):
+        update_page_tags(instance.pk, live=instance.live)
+
+
+def unindex_page_tags(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Remove a deleted tagged page from the tag index."""
+    if isinstance(instance, TaggedPage):
+        update_page_tags(instance.pk, live=False)
+
+
+def schedule_artifacts(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Rewrite the static sitemap and feeds once a page change has been committed."""
+    if isinstance(instance, Page) and artifacts_root() is not None:
+        transaction.on_commit(write_artifacts_safely)
+
+
+def write_artifacts_safely() -> None:
+    """Write the static artifacts, logging (rather than raising) any failure to do so."""
+    try:
+        paths = write_artifacts()
+    except Exception:
+        logger.exception("Couldn't write static artifacts; nginx will fall back to Django")
+    else:
+        logger.debug(f"Wrote {len(paths)} static artifacts")
+
+
+def purge_cached_page(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Purge the cached responses of a changed page (and its ancestors)."""
+    if isinstance(instance, Page):
+        purge_url_paths(instance.url_path)
+
+
+def purge_moved_page(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Purge the cached responses of a moved page, at its old and new paths."""
+    purge_url_paths(kwargs["url_path_before"], kwargs["url_path_after"])
+
+
+def purge_renamed_page(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Purge the cached responses of a page whose slug has changed, at its old and new paths."""
+    purge_url_paths(kwargs["instance_before"].url_path, instance.url_path)
+
+
+def schedule_export(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Re-export the pages affected by a page change in the background, once it's committed.
+
+    They're found now, while a page being deleted (which Wagtail unpublishes first) exists.
+    """
+    if export_root() is not None:
+        change = (instance.pk, instance.url_path, affected_page_ids(instance))
+        transaction.on_commit(lambda: submit_job(export_changes_safely, *change))
+
+
+def export_changes_safely(page_id: int, url_path: str, affected_ids: set[int] | None) -> None:
+    """Re-export the pages affected by a page change, logging (rather than raising) failures."""
+    try:
+        count = export_page_changes(page_id, url_path, affected_ids)
+    except Exception:
+        logger.exception(f"Couldn't re-export pages affected by page {page_id}")
+    else:
+        logger.debug(f"Re-exported {count} pages affected by page {page_id}")
+
+
+def plan_page_renditions(sender: type[Page], instance: Page, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Generate the renditions (and placeholders) of a newly-published page's images.
+
+    They're generated in the background once the page is committed; then the page's markup
+    is refreshed, since it was rendered as it was published, linking renditions through
+    Wagtail's image-serving view.
+    """
+    plan = plan_page(instance.specific)
+    if plan:
+        page_id = instance.pk
+        transaction.on_commit(
+            lambda: when_done(
+                [*submit_plan(plan), *(submit_job(store_placeholder, pk) for pk in plan)],
+                refresh_page_markup,
+                page_id,
+            )
+        )
+
+
+def refresh_page_markup(page_id: int) -> None:
+    """Re-store a live page's rendered content, then purge and re-export it (a worker job)."""
+    page = Page.objects.live().filter(pk=page_id).specific().first()
+    if page is None:
+        return
+    if isinstance(page, Article) and page.get_rendered_content() is not None:
+        page.store_rendered_content()
+    purge_url_paths(page.url_path)
+    if export_root() is not None:
+        export_changes_safely(page.pk, page.url_path, {page.pk})
+    logger.debug(f"Refreshed the markup of page {page_id} now its renditions exist")
+
+
+def plan_upload_renditions(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Generate the renditions a newly-uploaded image will be shown at, in the background."""
+    if kwargs.get("created") and not kwargs.get("raw"):
+        schedule_plan(plan_upload(instance))
+
+
+def schedule_placeholder(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Compute a saved image's placeholder (if its file's new or changed), in the background."""
+    if not kwargs.get("raw"):
+        image_id = instance.pk
+        transaction.on_commit(lambda: submit_job(store_placeholder, image_id))
+
+
+def plan_social_renditions(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Generate the rendition of a site's chosen social image, in the background."""
+    if isinstance(instance, SocialSettings) and not kwargs.get("raw"):
+        schedule_plan(plan_social_image(instance.default_social_image_id))
+
+
+def forget_deleted_rendition(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Stop serving a deleted rendition's file from the cache of renditions' paths."""
+    forget_rendition_path(instance.image_id, instance.filter_spec)
+
+
+def forget_saved_image(sender: type[Model], instance: Model, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    """Stop serving a saved image's renditions from the cache of their paths (and versions)."""
+    if not kwargs.get("created") and not kwargs.get("raw"):
+        transaction.on_commit(lambda: forget_image_paths(instance))
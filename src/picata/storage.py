@@ -0,0 +1,89 @@
+"""Static files storage writing precompressed variants, for nginx to serve as they are.
+
+`collectstatic` hashes files' names as `ManifestStaticFilesStorage` does, then writes
+`.gz` (and, with the `brotli` package, `.br`) siblings of every compressible file, in a
+pool of threads (zlib and Brotli release the GIL while compressing). Files with current
+variants are skipped: hashed files (whose names change with their content) once they have
+variants, and other files if their variants are newer than them. nginx serves variants
+with `gzip_static` (and `brotli_static`), and hashed files as immutable (see
+`config/nginx-site-prod.conf`).
+
+Each process parses the manifest once, sharing it between instances of the storage.
+"""
+
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+from picata.artifacts import variant_paths, write_variants
+
+# Extensions of files worth compressing (i.e. not already-compressed images, fonts, etc.)
+COMPRESSIBLE_EXTENSIONS = frozenset(
+    {".css", ".csv", ".html", ".ico", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".xml"}
+)
+
+# Parsed manifests' paths and hashes, by the manifest file's path and modification time
+MANIFESTS: dict[tuple[str, float], tuple[dict[str, str], str]] = {}
+
+# Files smaller than this are sent as they are, since compressing gains little on them
+MIN_COMPRESS_SIZE = 256
+
+
+def is_compressible(path: Path) -> bool:
+    """Return whether a file's worth compressing, by its extension and size."""
+    return path.suffix in COMPRESSIBLE_EXTENSIONS and path.stat().st_size >= MIN_COMPRESS_SIZE
+
+
+def variants_current(path: Path, *, hashed: bool = False) -> bool:
+    """Return whether a file's variants exist (and, unless its name is hashed, are newer).
+
+    A hashed name is derived from the file's content, so any variants of it are current,
+    even where Django's rewritten the file (as it does post-processed files every run).
+    """
+    mtime = path.stat().st_mtime
+    return all(
+        variant.exists() and (hashed or variant.stat().st_mtime >= mtime)
+        for variant in variant_paths(path)
+    )
+
+
+def compress_file(path: Path, *, hashed: bool = False) -> bool:
+    """Write a file's precompressed variants, unless they're current; returns whether it did."""
+    if not is_compressible(path) or variants_current(path, hashed=hashed):
+        return False
+    write_variants(path, path.read_bytes())
+    return True
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """A `ManifestStaticFilesStorage` writing `.gz` and `.br` variants of its files."""
+
+    def load_manifest(self) -> tuple[dict[str, str], str]:
+        """Return the manifest's contents, parsed once per process (and manifest file)."""
+        try:
+            path = self.manifest_storage.path(self.manifest_name)
+            key = (path, Path(path).stat().st_mtime)
+        except (FileNotFoundError, NotImplementedError):
+            return super().load_manifest()
+        if key not in MANIFESTS:
+            MANIFESTS[key] = super().load_manifest()
+        return MANIFESTS[key]
+
+    def post_process(self, paths: dict[str, Any], *args: Any, **options: Any) -> Iterator[Any]:  # noqa: ANN401
+        """Hash files' names, then compress the original and hashed files in parallel."""
+        yield from super().post_process(paths, *args, **options)
+        if options.get("dry_run"):
+            return
+        hashed_names = set(self.hashed_files.values())
+        names = sorted(name for name in set(paths) | hashed_names if self.exists(name))
+        with ThreadPoolExecutor(os.cpu_count()) as pool:
+            futures = [
+                pool.submit(compress_file, Path(self.path(name)), hashed=name in hashed_names)
+                for name in names
+            ]
+        for future in futures:
+            future.result()  # Raise any error compressing a file
@@ -0,0 +1,234 @@
+"""Single-pass HTML transformation, re-serialising documents as lxml parses them.
+
+Rather than building a whole tree, running XPath scans over it for each transformer,
+and pretty-printing it again, the "stream" pipeline feeds the raw document to an lxml
+parser target which writes markup straight back out. Only elements some transformer
+has claimed (by tag name) are buffered into small subtrees, handed to each interested
+transformer in turn, and then serialised in place.
+
+Because output is produced as parsing proceeds, the same machinery transforms
+streaming responses chunk-by-chunk, without ever holding the whole document.
+"""
+
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from html import escape
+from typing import Any, Protocol, runtime_checkable
+
+from lxml import etree
+
+# Elements which never have content, and so never get a closing tag
+VOID_ELEMENTS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+# Elements whose text content is written out verbatim
+RAW_TEXT_ELEMENTS = frozenset({"script", "style"})
+
+
+@runtime_checkable
+class ElementTransformer(Protocol):
+    """A transformer able to take part in the single-pass pipeline."""
+
+    tags: frozenset[str]
+
+    def transform_element(
+        self, element: etree._Element, ancestors: tuple[str, ...], state: dict[Any, Any]
+    ) -> None:
+        """Transform `element` in place, given the tag names of its ancestors (outermost first).
+
+        `state` is a dictionary shared by all transformers for the current document.
+        """
+
+
+def supports_single_pass(transformers: Iterable[object]) -> bool:
+    """Return whether every transformer given declares tags and an element-level hook."""
+    return all(
+        isinstance(transformer, ElementTransformer) and transformer.tags
+        for transformer in transformers
+    )
+
+
+def start_tag(tag: str, attrib: dict[str, str]) -> str:
+    """Serialise an opening tag."""
+    attrs = "".join(f' {name}="{escape(value)}"' for name, value in attrib.items())
+    return f"<{tag}{attrs}>"
+
+
+class TransformingSerializer:
+    """An lxml parser target which writes out HTML, transforming claimed elements en route.
+
+    Output accumulates until it's collected with `drain`, so a document may be fed
+    to the parser (and its transformed markup read back) in chunks.
+    """
+
+    def __init__(self, transformers: Sequence[ElementTransformer]) -> None:
+        """Index transformers by the tags they claim and initialise per-document state."""
+        self.claims: dict[str, list[ElementTransformer]] = {}
+        for transformer in transformers:
+            for tag in transformer.tags:
+                self.claims.setdefault(tag, []).append(transformer)
+        self.state: dict[Any, Any] = {}
+        self.ancestors: list[str] = []
+        self.output: list[str] = []
+        self.builder: etree.TreeBuilder | None = None
+        self.depth = 0
+
+    def doctype(self, name: str, pubid: str | None, system: str | None) -> None:
+        """Write the document type declaration."""
+        declaration = f"<!DOCTYPE {name}"
+        if pubid:
+            declaration += f' PUBLIC "{pubid}"'
+        if system:
+            declaration += f' "{system}"'
+        self.output.append(f"{declaration}>\n")
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        """Write an opening tag, or start (or continue) buffering a claimed element."""
+        if self.builder is not None:
+            self.builder.start(tag, attrib)
+            self.depth += 1
+        elif tag in self.claims:
+            self.builder = etree.TreeBuilder()
+            self.builder.start(tag, attrib)
+            self.depth = 1
+        else:
+            self.output.append(start_tag(tag, attrib))
+            self.ancestors.append(tag)
+
+    def end(self, tag: str) -> None:
+        """Write a closing tag, or transform and write a claimed element once it's complete."""
+        if self.builder is not None:
+            self.builder.end(tag)
+            self.depth -= 1
+            if self.depth == 0:
+                element = self.builder.close()
+                self.builder = None
+                self._transform(element)
+            return
+        self.ancestors.pop()
+        if tag not in VOID_ELEMENTS:
+            self.output.append(f"</{tag}>")
+
+    def data(self, data: str) -> None:
+        """Write (escaped) text content."""
+        if self.builder is not None:
+            self.builder.data(data)
+        elif self.ancestors and self.ancestors[-1] in RAW_TEXT_ELEMENTS:
+            self.output.append(data)
+        else:
+            self.output.append(escape(data, quote=False))
+
+    def comment(self, text: str) -> None:
+        """Write a comment."""
+        if self.builder is not None:
+            self.builder.comment(text)
+        else:
+            self.output.append(f"<!--{text}-->")
+
+    def drain(self) -> str:
+        """Return all output written since the last call."""
+        chunk = "".join(self.output)
+        self.output.clear()
+        return chunk
+
+    def close(self) -> str:
+        """Finish the document, returning any output not yet drained."""
+        return self.drain()
+
+    def _transform(self, element: etree._Element) -> None:
+        """Run transformers over each claimed element in a buffered subtree, then write it."""
+        for claimed in list(element.iter(*self.claims)):
+            inner_ancestors = reversed([parent.tag for parent in claimed.iterancestors()])
+            ancestors = (*self.ancestors, *inner_ancestors)
+            for transformer in self.claims[claimed.tag]:
+                transformer.transform_element(claimed, ancestors, self.state)
+        self.output.append(etree.tostring(element, method="html", encoding=str))
+
+
+class ChunkTransformer:
+    """Incrementally transform an HTML document arriving as a sequence of byte chunks."""
+
+    def __init__(self, transformers: Sequence[ElementTransformer], encoding: str = "utf-8") -> None:
+        """Set up a push parser feeding a `TransformingSerializer`."""
+        self.encoding = encoding
+        self.serializer = TransformingSerializer(transformers)
+        self.parser = etree.HTMLParser(target=self.serializer, encoding=encoding)
+        self.pending = b""
+        self.started = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Parse another chunk of the document, returning whatever output is ready.
+
+        Input is only handed to the parser up to the last '>' seen, so no tag is ever
+        split between feeds; libxml2's push parser treats the remainder of a <script>
+        or <style> as text if their closing tag arrives in pieces.
+        """
+        data = self.pending + chunk
+        boundary = data.rfind(b">") + 1
+        if boundary:
+            self.parser.feed(data[:boundary])
+            self.started = True
+        self.pending = data[boundary:]
+        return self.serializer.drain().encode(self.encoding)
+
+    def close(self) -> bytes:
+        """Finish parsing the document, returning the remaining output."""
+        if self.pending:
+            self.parser.feed(self.pending)
+        elif not self.started:
+            return b""  # An empty document; there's nothing for the parser to close
+        return self.parser.close().encode(self.encoding)
+
+
+def transform_html(
+    content: bytes, transformers: Sequence[ElementTransformer], encoding: str = "utf-8"
+) -> str:
+    """Transform a whole HTML document in a single pass."""
+    parser = etree.HTMLParser(target=TransformingSerializer(transformers), encoding=encoding)
+    parser.feed(content)
+    return parser.close()
+
+
+def transform_html_chunks(
+    chunks: Iterable[bytes], transformers: Sequence[ElementTransformer], encoding: str = "utf-8"
+) -> Iterator[bytes]:
+    """Transform a streamed HTML document, yielding output as soon as it's ready."""
+    chunk_transformer = ChunkTransformer(transformers, encoding)
+    for chunk in chunks:
+        output = chunk_transformer.feed(chunk)
+        if output:
+            yield output
+    tail = chunk_transformer.close()
+    if tail:
+        yield tail
+
+
+async def atransform_html_chunks(
+    chunks: AsyncIterable[bytes],
+    transformers: Sequence[ElementTransformer],
+    encoding: str = "utf-8",
+) -> AsyncIterator[bytes]:
+    """Transform an asynchronously streamed HTML document; see `transform_html_chunks`."""
+    chunk_transformer = ChunkTransformer(transformers, encoding)
+    async for chunk in chunks:
+        output = chunk_transformer.feed(chunk)
+        if output:
+            yield output
+    tail = chunk_transformer.close()
+    if tail:
+        yield tail
@@ -0,0 +1,140 @@
+"""A maintained index of which live pages carry each tag.
+
+Each `PageTag` has a `TagIndexEntry` holding the sorted ids of the live pages tagged
+with it. Entries are updated a page at a time as pages are published, unpublished or
+deleted, so tag intersections, faceted counts and "related by tags" lookups become set
+operations over a small in-memory `TagIndex` rather than joins over the whole site.
+Migration 0012 fills in the entries for pages published before.
+
+Each process keeps the `TagIndex` it last loaded until the content generation changes
+(see `picata.caches.content_generation`).
+"""
+
+# NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
+# pyright: reportAttributeAccessIssue=false
+
+import threading
+from bisect import insort
+from collections import Counter
+from collections.abc import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from picata.caches import content_generation
+from picata.models import PageTagRelation, TagIndexEntry
+
+
+class TagIndex:
+    """An immutable snapshot of the tag index, mapping tag names to sorted live page ids."""
+
+    def __init__(self, page_ids_by_tag: dict[str, list[int]]) -> None:
+        """Index the given page ids by tag, and each page's tags by page id."""
+        self.page_ids_by_tag = {tag: frozenset(ids) for tag, ids in page_ids_by_tag.items()}
+        self.tags_by_page_id: dict[int, set[str]] = {}
+        for tag, ids in page_ids_by_tag.items():
+            for page_id in ids:
+                self.tags_by_page_id.setdefault(page_id, set()).add(tag)
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of live pages carrying each tag, most-used first (a tag cloud)."""
+        return dict(
+            sorted(
+                ((tag, len(ids)) for tag, ids in self.page_ids_by_tag.items() if ids),
+                key=lambda item: (-item[1], item[0]),
+            )
+        )
+
+    def pages_tagged_with_all(self, tags: Iterable[str]) -> set[int]:
+        """Return the ids of live pages carrying every one of the given tags."""
+        id_sets = sorted((self.page_ids_by_tag.get(tag, frozenset()) for tag in set(tags)), key=len)
+        if not id_sets:
+            return set()
+        return set(id_sets[0]).intersection(*id_sets[1:])
+
+    def facet_counts(self, page_ids: Iterable[int], exclude: Iterable[str] = ()) -> dict[str, int]:
+        """Count the tags carried by the given pages, most common first.
+
+        Tags in `exclude` (e.g. those already searched for) are left out.
+        """
+        excluded = set(exclude)
+        counter = Counter(
+            tag
+            for page_id in page_ids
+            for tag in self.tags_by_page_id.get(page_id, ())
+            if tag not in excluded
+        )
+        return dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+
+    def related_by_tags(self, page_id: int, limit: int | None = None) -> list[tuple[int, int]]:
+        """Return `(page_id, shared_tag_count)` for pages sharing tags with a page, best first."""
+        counter = Counter(
+            other_id
+            for tag in self.tags_by_page_id.get(page_id, ())
+            for other_id in self.page_ids_by_tag[tag]
+            if other_id != page_id
+        )
+        return sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+_loaded: tuple[int, TagIndex] | None = None
+_lock = threading.Lock()
+
+
+def get_tag_index() -> TagIndex:
+    """Return the tag index, (re)loading it in one query if the content generation's moved on."""
+    global _loaded  # noqa: PLW0603
+    generation = content_generation()
+    with _lock:
+        if _loaded is None or _loaded[0] != generation:
+            entries = TagIndexEntry.objects.select_related("tag")
+            _loaded = (generation, TagIndex({entry.tag.name: entry.page_ids for entry in entries}))
+        return _loaded[1]
+
+
+def update_page_tags(page_id: int, *, live: bool) -> None:
+    """Bring the index up to date with a page's current tags (or its absence, if not live)."""
+    tag_ids = (
+        set(PageTagRelation.objects.filter(content_object_id=page_id).values_list("tag", flat=True))
+        if live
+        else set()
+    )
+    # Lock just the entries of the page's current tags and those it's indexed under (SQLite,
+    # which can't look inside JSON, has no row locks to narrow anyway)
+    locked = TagIndexEntry.objects.select_for_update().order_by("tag")
+    if connection.features.supports_json_field_contains:
+        locked = locked.filter(Q(tag_id__in=tag_ids) | Q(page_ids__contains=[page_id]))
+    with transaction.atomic():
+        entries = {entry.tag_id: entry for entry in locked}
+        for tag_id in tag_ids - entries.keys():
+            entries[tag_id] = TagIndexEntry.objects.create(tag_id=tag_id)
+
+        changed = []
+        for tag_id, entry in entries.items():
+            if tag_id in tag_ids and page_id not in entry.page_ids:
+                insort(entry.page_ids, page_id)
+            elif tag_id not in tag_ids and page_id in entry.page_ids:
+                entry.page_ids.remove(page_id)
+            else:
+                continue
+            entry.page_count = len(entry.page_ids)
+            changed.append(entry)
+        TagIndexEntry.objects.bulk_update(changed, ["page_ids", "page_count"])
+
+
+def rebuild_tag_index() -> int:
+    """Rebuild every entry of the index from scratch, returning the number of tags indexed."""
+    page_ids_by_tag: dict[int, list[int]] = {}
+    relations = PageTagRelation.objects.filter(content_object__live=True).order_by(
+        "tag", "content_object"
+    )
+    for tag_id, page_id in relations.values_list("tag", "content_object").distinct():
+        page_ids_by_tag.setdefault(tag_id, []).append(page_id)
+
+    with transaction.atomic():
+        TagIndexEntry.objects.all().delete()
+        TagIndexEntry.objects.bulk_create(
+            TagIndexEntry(tag_id=tag_id, page_ids=page_ids, page_count=len(page_ids))
+            for tag_id, page_ids in page_ids_by_tag.items()
+        )
+    return len(page_ids_by_tag)
@@ -3,11 +3,13 @@
 # NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
 # pyright: reportAttributeAccessIssue=false
 
+from functools import cache
 from typing import TYPE_CHECKING, TypedDict
 
 from django import template
 from wagtail.models import Page, Site
 
+from picata.caches import ResultCache, cache_from_settings, content_generation
 from picata.typing import Context
 
 if TYPE_CHECKING:
@@ -15,42 +17,84 @@ if TYPE_CHECKING:
 
 register = template.Library()
 
+DEFAULT_MENU_CACHE = {
+    "BACKEND": "picata.caches.LRUCache",
+    "OPTIONS": {"max_entries": 16},
+}
+
+
+class MenuItem(TypedDict):
+    """What `site_menu.html` shows of a page in the site menu."""
+
+    pk: int
+    path: str
+    title: str
+    url: str | None
+    live: bool
+
 
 class SiteMenuContext(TypedDict):
     """Context returned from `render_site_menu` for `site_menu.html`."""
 
-    menu_pages: list[Page]
-    current_section: Page | None
+    menu_pages: list[MenuItem]
+    current_section: int | None
+
+
+@cache
+def get_menu_cache() -> ResultCache:
+    """Return the cache of site menus, as configured by `PICATA_MENU_CACHE`."""
+    return cache_from_settings("PICATA_MENU_CACHE", DEFAULT_MENU_CACHE)
+
+
+def menu_items(site: Site, request: "HttpRequest") -> list[MenuItem]:
+    """Return the site root and its child pages in the menu (only live ones, if anonymous)."""
+    root_page = site.root_page.specific
+    top_pages = root_page.get_children().in_menu()
+    if not request.user.is_authenticated:
+        top_pages = top_pages.live()
+    return [
+        {
+            "pk": page.pk,
+            "path": page.path,
+            "title": page.title,
+            "url": page.get_url(request),
+            "live": page.live,
+        }
+        for page in [root_page, *top_pages.specific()]
+    ]
 
 
 @register.inclusion_tag("picata/tags/site_menu.html", takes_context=True)
 def render_site_menu(context: Context) -> SiteMenuContext:
-    """Fetch the site root and its child pages for the site menu."""
-    current_page: Page | None = context.get("self")
-    active_section = None
+    """Fetch the site root and its child pages for the site menu.
 
+    The menu is cached per site and authentication state, until the content generation
+    moves on (i.e. pages are created, moved, published or unpublished).
+    """
+    current_page: Page | None = context.get("self")
     request: HttpRequest = context["request"]
     current_site = Site.find_for_request(request)
     if not current_site:
         raise ValueError("No Wagtail Site found for the current request.")
 
-    # Get menu pages as a list of pages starting with the root, followed by its children
-    root_page = current_site.root_page.specific
+    authenticated = request.user.is_authenticated
+    key = f"{content_generation()}:{current_site.pk}:{authenticated}"
+    menu_cache = get_menu_cache()
+    menu_pages = menu_cache.get(key)
+    if menu_pages is None:
+        menu_pages = menu_items(current_site, request)
+        menu_cache.set(key, menu_pages)
 
-    top_pages = root_page.get_children().in_menu()
-    if not request.user.is_authenticated:
-        top_pages = top_pages.live()
-    top_pages = top_pages.specific()
-
-    menu_pages = [root_page, *top_pages]
-
-    # Find which page in the set of menu pages that the current page is a descendant of
-    if current_page == root_page:
-        active_section = root_page
-    else:
-        for page in top_pages:
-            if current_page and (current_page == page or current_page.is_descendant_of(page)):
-                active_section = page
-                break
+    # Find the menu page that the current page is (or descends from), by materialised path
+    active_section = None
+    current_path = getattr(current_page, "path", None)
+    if current_path is not None:
+        root, *top_pages = menu_pages
+        if current_path == root["path"]:
+            active_section = root["pk"]
+        else:
+            active_section = next(
+                (page["pk"] for page in top_pages if current_path.startswith(page["path"])), None
+            )
 
     return {"menu_pages": menu_pages, "current_section": active_section}
@@ -1,61 +1,155 @@
-"""Callables to transform the response."""
+"""Callables to transform the response.
 
-from lxml import etree
+Every transformer can be called with a whole parsed document (the "tree" pipeline).
+Transformers which also declare the element `tags` they care about, and implement
+`transform_element`, can take part in the single-pass "stream" pipeline, where
+they're handed each matching element (with the tag names of its ancestors) as the
+document is parsed; see `picata.streaming`.
+"""
+
+from collections.abc import Iterable
+from html import escape
+from typing import Any
+
+from lxml import etree, html
 
 from picata.helpers import ALPHANUMERIC_REGEX, get_full_text
 
+HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+
+
+def unique_slug(text: str, seen_ids: set[str]) -> str:
+    """Slugify `text` into an id not yet in `seen_ids`, and record it there."""
+    slug = text.lower().replace(" ", "-")
+    unique_id = slug
+    count = 1
+    while unique_id in seen_ids:
+        unique_id = f"{slug}-{count}"
+        count += 1
+    seen_ids.add(unique_id)
+    return unique_id
+
+
+def sanitize_id(id_value: str) -> str:
+    """Sanitize an id by removing non-alphanumeric characters."""
+    return ALPHANUMERIC_REGEX.sub("", id_value)
+
+
+def anchor_id(text: str, seen_ids: set[str]) -> str:
+    """Return the id `add_heading_ids` and `AnchorInserter` would give a heading with `text`."""
+    return sanitize_id(unique_slug(text, seen_ids))
 
-def add_heading_ids(tree: etree._Element) -> None:
-    """Add a unique id to any heading in <main> missing one, derived from its inner text."""
-    seen_ids = set()
-    main = tree.xpath("/html/body/main")
-    if not main:
+
+def insert_anchor(target: etree._Element) -> None:
+    """Append an anchored pilcrow to a target with an id, unless it contains a link."""
+    target_id = target.get("id")
+    if not target_id or target.xpath(".//a"):
         return
 
-    for heading in main[0].xpath(".//h1|//h2|//h3|//h4|//h5|//h6"):
-        # Exclude headings in <nav> tags and those already having an id.
-        if heading.xpath("ancestor::nav") or heading.get("id"):
-            continue
-        heading_text = get_full_text(heading)
-        slug = heading_text.lower().replace(" ", "-")
-        unique_id = slug
-        count = 1
-        while unique_id in seen_ids:
-            unique_id = f"{slug}-{count}"
-            count += 1
-        seen_ids.add(unique_id)
-        heading.set("id", unique_id)
+    sanitized_id = sanitize_id(target_id)
+    if sanitized_id != target_id:
+        target.set("id", sanitized_id)
+
+    # Append an anchored pilcrow to the target element
+    anchor = etree.Element("a", href=f"#{target_id}", **{"class": "target-link"})
+    anchor.text = "¶"
+    target.append(anchor)
+
+
+def annotate_headings(fragment: str, seen_ids: set[str] | None = None) -> str:
+    """Give the headings in an HTML fragment slugged ids and anchored pilcrows.
+
+    This is the render-time equivalent of running `add_heading_ids` and then an
+    `AnchorInserter` over the document; pass the same `seen_ids` set when annotating
+    several fragments of one page to keep their ids unique.
+    """
+    seen_ids = set() if seen_ids is None else seen_ids
+    container = html.fragment_fromstring(fragment, create_parent="div")
+    for heading in container.iter(*HEADING_TAGS):
+        if not heading.get("id"):
+            heading.set("id", anchor_id(get_full_text(heading), seen_ids))
+        insert_anchor(heading)
+    # lxml's unescaped the leading text, so escape it again, as it would when serialising
+    return escape(container.text or "", quote=False) + "".join(
+        etree.tostring(child, method="html", encoding=str) for child in container
+    )
+
+
+class HeadingIdAdder:
+    """Transformer to add a unique id to any heading in <main> missing one."""
+
+    tags = HEADING_TAGS
+
+    def __repr__(self) -> str:
+        """Describe the transformer (used to key cached output)."""
+        return "HeadingIdAdder()"
+
+    def __call__(self, tree: etree._Element) -> None:
+        """Add ids to headings in the document's <main>, derived from their inner text."""
+        seen_ids: set[str] = set()
+        main = tree.xpath("/html/body/main")
+        if not main:
+            return
+
+        for heading in main[0].xpath(".//h1|//h2|//h3|//h4|//h5|//h6"):
+            # Exclude headings in <nav> tags and those already having an id.
+            if heading.xpath("ancestor::nav") or heading.get("id"):
+                continue
+            heading.set("id", unique_slug(get_full_text(heading), seen_ids))
+
+    def transform_element(
+        self, element: etree._Element, ancestors: tuple[str, ...], state: dict[Any, Any]
+    ) -> None:
+        """Add an id to a single heading, if it's in <main>, outside <nav>, and lacks one."""
+        if "main" not in ancestors or "nav" in ancestors or element.get("id"):
+            return
+        seen_ids = state.setdefault(self, set())
+        element.set("id", unique_slug(get_full_text(element), seen_ids))
+
+
+add_heading_ids = HeadingIdAdder()
 
 
 class AnchorInserter:
     """Transformer to insert anchored pilcrows into targeted elements in the document."""
 
-    def __init__(self, root: str, targets: str) -> None:
-        """Remember the root paths we're to operate on."""
+    def __init__(
+        self,
+        root: str,
+        targets: str,
+        root_tag: str | None = None,
+        target_tags: Iterable[str] = (),
+    ) -> None:
+        """Remember the root paths we're to operate on.
+
+        The optional `root_tag` and `target_tags` express the same selection as
+        tag names, allowing the inserter to run in the single-pass pipeline.
+        """
         self.root_xpath = root
         self.targets_xpath = targets
+        self.root_tag = root_tag
+        self.tags = frozenset(target_tags) if root_tag else frozenset()
+
+    def __repr__(self) -> str:
+        """Describe the inserter by its configuration (used to key cached output)."""
+        return (
+            f"AnchorInserter(root={self.root_xpath!r}, targets={self.targets_xpath!r}, "
+            f"root_tag={self.root_tag!r}, target_tags={sorted(self.tags)!r})"
+        )
 
     def __call__(self, tree: etree._Element) -> None:
         """Inserts anchors into targets within the specified roots."""
         for root_element in tree.xpath(self.root_xpath):
             self._process_targets(root_element, self.targets_xpath)
 
+    def transform_element(
+        self, element: etree._Element, ancestors: tuple[str, ...], state: dict[Any, Any]
+    ) -> None:
+        """Insert an anchor into a single target, if it's within an element of `root_tag`."""
+        if self.root_tag in ancestors:
+            insert_anchor(element)
+
     def _process_targets(self, root: etree._Element, targets: str) -> None:
         """Processes targets within a given root element, inserting anchors."""
         for target in root.xpath(targets):
-            target_id = target.get("id")
-            if not target_id or target.xpath(".//a"):
-                continue
-
-            sanitized_id = self._sanitize_id(target_id)
-            if sanitized_id != target_id:
-                target.set("id", sanitized_id)
-
-            # Append an anchored pilcrow to the target element
-            anchor = etree.Element("a", href=f"#{target_id}", **{"class": "target-link"})
-            anchor.text = "¶"
-            target.append(anchor)
-
-    def _sanitize_id(self, id_value: str) -> str:
-        """Sanitize the ID by removing non-alphanumeric characters."""
-        return ALPHANUMERIC_REGEX.sub("", id_value)
+            insert_anchor(target)
@@ -4,7 +4,7 @@ NB: This module split the picata.typing module into a package in order to avoid
 circular imports during program initialisation, with the `from wagtail` imports.
 """
 
-from typing import Any
+from typing import Any, NotRequired
 
 from wagtail.blocks import StructBlock
 from wagtail.models import Page
@@ -18,6 +18,8 @@ class BlockRenderContextDict(Context):
 
     self: StructBlock
     page: Page
+    heading_ids: NotRequired[set[str]]
+    image_ids: NotRequired[set[int]]
 
 
 BlockRenderContext = BlockRenderContextDict | None
@@ -8,8 +8,8 @@ from wagtail import urls as wagtail_urls
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.contrib.sitemaps.views import sitemap
 from wagtail.documents import urls as wagtaildocs_urls
-from wagtail.images.views.serve import ServeView
 
+from picata.media import ImageServeView
 from picata.views import AtomArticleFeed, RSSArticleFeed, search
 
 urlpatterns = [
@@ -17,7 +17,9 @@ urlpatterns = [
     path("admin/", include(wagtailadmin_urls)),  # Wagtail Admin
     path("documents/", include(wagtaildocs_urls)),  # Wagtail documents
     re_path(
-        r"^images/([^/]*)/(\d*)/([^/]*)/[^/]*$", ServeView.as_view(), name="wagtailimages_serve"
+        r"^images/([^/]*)/(\d*)/([^/]*)/[^/]*$",
+        ImageServeView.as_view(),
+        name="wagtailimages_serve",
     ),
     path("sitemap.xml", sitemap),
     path("feeds/rss/", RSSArticleFeed(), name="rss_feed"),
@@ -3,22 +3,36 @@
 # NB: Django's meta-class shenanigans over-complicate type hinting when QuerySets get involved.
 # pyright: reportAttributeAccessIssue=false, reportArgumentType=false
 
+import hashlib
+import json
 import logging
 from datetime import datetime
-from typing import TYPE_CHECKING, NoReturn
+from functools import cache
+from typing import TYPE_CHECKING, Any, NoReturn
 
+from django.conf import settings
 from django.contrib.syndication.views import Feed
+from django.core.paginator import Paginator
+from django.db.models import Max, QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response
 from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date, quote_etag
+from wagtail.models import Page, Site
 
+from picata.caches import ResultCache, cache_from_settings, content_generation
 from picata.helpers.wagtail import (
+    bulk_page_preview_data,
+    bulk_specific,
     filter_pages_by_tags,
     filter_pages_by_type,
-    page_preview_data,
     visible_pages_qs,
 )
 from picata.models import Article, ArticleType
+from picata.search import format_snippet, search_pages
+from picata.tag_index import get_tag_index
+from picata.typing import UserOrNot
 
 if TYPE_CHECKING:
     from wagtail.query import PageQuerySet
@@ -26,16 +40,78 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_FEED_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"key_prefix": "picata:feed", "timeout": None},
+}
+
+
+@cache
+def get_feed_cache() -> ResultCache:
+    """Return the cache of serialised feeds, as configured by `PICATA_FEED_CACHE`."""
+    return cache_from_settings("PICATA_FEED_CACHE", DEFAULT_FEED_CACHE)
+
+
 class PostsFeed(Feed):
-    """Base class for RSS and Atom article feeds."""
+    """Base class for RSS and Atom article feeds.
+
+    Each feed is bounded to the latest `PICATA_FEED_ITEMS` articles, and its serialised
+    bytes are cached per feed type and host until the content generation moves on (i.e.
+    until something's published). Responses carry an `ETag` and a `Last-Modified` date (of
+    the most recently published article), so polling feed readers get a 304 when nothing's
+    changed.
+    """
 
     title = "hpk.io Articles"
     link = "https://hpk.io/blog/"
     description = "Latest posts on hpk.io"
 
+    def __call__(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:  # noqa: ANN401
+        """Serve the feed from the cache (or build and cache it), honouring conditional GETs."""
+        key = ":".join(
+            [
+                str(content_generation()),
+                type(self).__name__,
+                request.scheme,
+                request.get_host(),
+            ]
+        )
+        feed_cache = get_feed_cache()
+        cached = feed_cache.get(key)
+        if cached is None:
+            response = super().__call__(request, *args, **kwargs)
+            latest = Article.objects.live().aggregate(latest=Max("last_published_at"))["latest"]
+            cached = {
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "etag": quote_etag(hashlib.sha256(response.content).hexdigest()),
+                "last_modified": int(latest.timestamp()) if latest else None,
+            }
+            feed_cache.set(key, cached)
+
+        response = HttpResponse(cached["content"], content_type=cached["content_type"])
+        response.headers["ETag"] = cached["etag"]
+        if cached["last_modified"] is not None:
+            response.headers["Last-Modified"] = http_date(cached["last_modified"])
+        return get_conditional_response(
+            request,
+            etag=cached["etag"],
+            last_modified=cached["last_modified"],
+            response=response,
+        )
+
     def items(self) -> list[Article]:
-        """Return the latest 10 published articles."""
-        return list(Article.objects.live().order_by("-first_published_at"))
+        """Return the latest `PICATA_FEED_ITEMS` published articles."""
+        articles = list(
+            Article.objects.live().order_by("-first_published_at")[
+                : getattr(settings, "PICATA_FEED_ITEMS", 10)
+            ]
+        )
+        # Share one lookup of the sites' root paths between every item's `full_url`
+        root_paths = Site.get_site_root_paths()
+        for article in articles:
+            article._wagtail_cached_site_root_paths = root_paths  # noqa: SLF001
+        return articles
 
     def item_title(self, item: Article) -> str:
         """Return the article title."""
@@ -46,8 +122,8 @@ class PostsFeed(Feed):
         return item.full_url
 
     def item_description(self, item: Article) -> str:
-        """Return the article body as HTML with absolute URLs."""
-        return item.content
+        """Return the article body as HTML, using its stored rendering where current."""
+        return item.get_rendered_content() or item.render_content()
 
     def item_pubdate(self, item: Article) -> datetime:
         """Return the article creation date."""
@@ -91,42 +167,141 @@ def preview(request: HttpRequest, file: str) -> HttpResponse:
     return render(request, f"picata/previews/{file}.html")
 
 
-def search(request: HttpRequest) -> HttpResponse:
-    """Render search results from the `query` and `tags` GET parameters."""
-    results: dict[str, str | list[str] | set[str]] = {}
+DEFAULT_SEARCH_CACHE = {
+    "BACKEND": "picata.caches.DjangoCache",
+    "OPTIONS": {"key_prefix": "picata:search", "timeout": 600},
+}
 
-    # Base QuerySet for all pages
-    pages: PageQuerySet = visible_pages_qs(request.user)
 
-    # Perform search by query
-    query_string = request.GET.get("query")
-    if query_string:
-        pages = pages.search(query_string)
-        results["query"] = query_string
+@cache
+def get_search_cache() -> ResultCache:
+    """Return the cache of search results, as configured by `PICATA_SEARCH_CACHE`."""
+    return cache_from_settings("PICATA_SEARCH_CACHE", DEFAULT_SEARCH_CACHE)
+
+
+def split_param(value: str | None) -> list[str]:
+    """Split a comma-separated GET parameter into a sorted list of distinct, non-empty items."""
+    return sorted({item.strip() for item in (value or "").split(",") if item.strip()})
+
 
-    # Resolve specific pages post-search
-    specific_pages = [page.specific for page in pages]
+def search_results(
+    user: UserOrNot,
+    query: str,
+    tags: list[str],
+    page_type_slugs: list[str],
+    page_number: str | None,
+) -> dict[str, Any]:
+    """Run a search, returning a page of results as ids, preview data and pagination state.
 
-    # Filter by page types
-    page_types_string = request.GET.get("page_types")
-    if page_types_string:
-        page_type_slugs = {slug.strip() for slug in page_types_string.split(",") if slug.strip()}
+    Type and tag filters are applied in the database, before any full-text search.
+    """
+    # Base QuerySet for all pages, filtered by page types and tags
+    pages: PageQuerySet = visible_pages_qs(user)
+    page_type_names = []
+    if page_type_slugs:
         matching_page_types = ArticleType.objects.filter(slug__in=page_type_slugs)
-        specific_pages = filter_pages_by_type(specific_pages, page_type_slugs)
-        results["page_types"] = [page_type.name for page_type in matching_page_types]
+        pages = filter_pages_by_type(pages, set(page_type_slugs))
+        page_type_names = [page_type.name for page_type in matching_page_types]
+    if tags:
+        live_only = not (user and user.is_authenticated)
+        pages = filter_pages_by_tags(pages, set(tags), live_only=live_only)
 
-    # Filter by tags
-    tags_string = request.GET.get("tags")
-    if tags_string:
-        tags = {tag.strip() for tag in tags_string.split(",") if tag.strip()}
-        specific_pages = filter_pages_by_tags(specific_pages, tags)
-        results["tags"] = tags
+    # Perform search by query (or list filtered pages in tree order)
+    pages = search_pages(pages, query) if query else pages.order_by("path")
 
     # Handle empty cases
-    if not (query_string or tags_string or page_types_string):
-        specific_pages = []
+    if not (query or tags or page_type_slugs):
+        pages = Page.objects.none()
+
+    # Count the tags on all the hits, to offer as refinements
+    tag_facets = (
+        get_tag_index().facet_counts(pages.values_list("pk", flat=True), exclude=tags)
+        if isinstance(pages, QuerySet)
+        else {}
+    )
+
+    # Resolve specific pages for just the requested page of results
+    paginator = Paginator(pages, getattr(settings, "PICATA_SEARCH_RESULTS_PER_PAGE", 20))
+    results_page = paginator.get_page(page_number)
+    specific_pages = bulk_specific(results_page)
+
+    # Enhance pages with preview and publication data, and any highlighted search snippets
+    page_previews = bulk_page_preview_data(specific_pages, user)
+    for page, preview in zip(results_page, page_previews, strict=True):
+        if getattr(page, "snippet", None):
+            preview["snippet"] = format_snippet(page.snippet)
+
+    return {
+        "page_ids": [page.pk for page in specific_pages],
+        "previews": page_previews,
+        "page_type_names": page_type_names,
+        "tag_facets": tag_facets,
+        "previous_page": results_page.previous_page_number()
+        if results_page.has_previous()
+        else None,
+        "next_page": results_page.next_page_number() if results_page.has_next() else None,
+    }
+
+
+def search(request: HttpRequest) -> HttpResponse:
+    """Render search results from the `query`, `page_types` and `tags` GET parameters.
+
+    Results are paginated (with the `page` parameter). For visitors who aren't logged in,
+    they're cached under the normalised parameters and the current content generation;
+    logged-in users also see drafts, which don't start a new generation as they're saved.
+    """
+    query_string = " ".join(request.GET.get("query", "").split())
+    tags = split_param(request.GET.get("tags"))
+    page_type_slugs = split_param(request.GET.get("page_types"))
+    page_number = request.GET.get("page", "1")
+
+    if request.user.is_authenticated:
+        found = search_results(request.user, query_string, tags, page_type_slugs, page_number)
+    else:
+        key_data = [content_generation(), query_string, tags, page_type_slugs, page_number]
+        key = hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+        search_cache = get_search_cache()
+        found = search_cache.get(key)
+        if found is None:
+            found = search_results(request.user, query_string, tags, page_type_slugs, page_number)
+            search_cache.set(key, found)
+
+    results: dict[str, str | list[str] | set[str]] = {}
+    if query_string:
+        results["query"] = query_string
+    if page_type_slugs:
+        results["page_types"] = found["page_type_names"]
+    if tags:
+        results["tags"] = set(tags)
+
+    return render(
+        request,
+        "picata/search_results.html",
+        {
+            **results,
+            "pages": found["previews"],
+            "tag_facets": [
+                (tag, count, refine_url(request, "tags", tag))
+                for tag, count in found["tag_facets"].items()
+            ],
+            "previous_page_url": page_url(request, found["previous_page"])
+            if found["previous_page"]
+            else None,
+            "next_page_url": page_url(request, found["next_page"]) if found["next_page"] else None,
+        },
+    )
+
+
+def page_url(request: HttpRequest, number: int) -> str:
+    """Return a relative URL for the current request with its `page` parameter replaced."""
+    query = request.GET.copy()
+    query["page"] = str(number)
+    return f"?{query.urlencode()}"
 
-    # Enhance pages with preview and publication data
-    page_previews = [page_preview_data(page, request.user) for page in specific_pages]
 
-    return render(request, "picata/search_results.html", {**results, "pages": page_previews})
+def refine_url(request: HttpRequest, param: str, item: str) -> str:
+    """Return a relative URL for the current request, adding `item` to a comma-separated param."""
+    query = request.GET.copy()
+    query[param] = ",".join([*split_param(query.get(param)), item])
+    query.pop("page", None)
+    return f"?{query.urlencode()}"
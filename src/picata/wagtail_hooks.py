@@ -6,14 +6,17 @@ See: https://docs.wagtail.org/en/stable/reference/hooks.html
 import logging
 from typing import ClassVar
 
-from django.db.models import QuerySet, Value
+from django.db.models import Model, QuerySet, Value
 from django.db.models.functions import Coalesce
 from django.http import HttpRequest
 from wagtail import hooks
 from wagtail.models import Page
+from wagtail.rich_text.feature_registry import FeatureRegistry
 from wagtail.snippets.views.snippets import SnippetViewSet
 
+from picata.caches import bump_content_generation
 from picata.models import PageTag
+from picata.renditions import ResponsiveImageEmbedHandler
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,12 @@ def order_admin_menu_by_date(parent_page: Page, pages: QuerySet, request: HttpRe
     return pages
 
 
+@hooks.register("register_rich_text_features", order=1)  # type: ignore[reportOptionalCall]
+def register_responsive_image_embeds(features: FeatureRegistry) -> None:
+    """Load rich text's images with their renditions (after Wagtail's own handler's added)."""
+    features.register_embed_type(ResponsiveImageEmbedHandler)
+
+
 class PageTagViewSet(SnippetViewSet):
     """Viewset for managing `PageTag`s."""
 
@@ -41,3 +50,18 @@ class PageTagViewSet(SnippetViewSet):
 def register_article_tag_viewset() -> SnippetViewSet:
     """Make `PageTag`s editable via the Wagtail admin."""
     return PageTagViewSet(model=PageTag)
+
+
+@hooks.register("after_create_snippet")  # type: ignore[reportOptionalCall]
+@hooks.register("after_edit_snippet")  # type: ignore[reportOptionalCall]
+def retire_content_after_tag_edit(request: HttpRequest, instance: Model) -> None:  # noqa: ARG001
+    """Have every process reload the tag index (and re-render tag names) after a tag edit."""
+    if isinstance(instance, PageTag):
+        bump_content_generation()
+
+
+@hooks.register("after_delete_snippet")  # type: ignore[reportOptionalCall]
+def retire_content_after_tag_delete(request: HttpRequest, instances: list[Model]) -> None:  # noqa: ARG001
+    """Have every process reload the tag index after tags (and their entries) are deleted."""
+    if any(isinstance(instance, PageTag) for instance in instances):
+        bump_content_generation()
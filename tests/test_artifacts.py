@@ -0,0 +1,27 @@
+"""Test the static sitemap and feeds written for nginx."""
+
+import gzip
+from pathlib import Path
+
+import pytest
+
+from picata.artifacts import write_artifacts, write_with_variants
+
+
+def test_write_with_variants(tmp_path: Path) -> None:
+    """Test that a file is written with a matching gzipped sibling, and no temporary files."""
+    paths = write_with_variants(tmp_path / "feeds" / "index.xml", b"<rss/>")
+    assert (tmp_path / "feeds" / "index.xml").read_bytes() == b"<rss/>"
+    assert gzip.decompress((tmp_path / "feeds" / "index.xml.gz").read_bytes()) == b"<rss/>"
+    assert sorted(path.name for path in (tmp_path / "feeds").iterdir()) == sorted(
+        path.name for path in paths
+    )
+
+
+@pytest.mark.django_db
+def test_write_artifacts(tmp_path: Path) -> None:
+    """Test that the sitemap and both feeds are rendered to disk."""
+    write_artifacts(tmp_path)
+    assert b"<urlset" in (tmp_path / "sitemap.xml").read_bytes()
+    assert b"<rss" in (tmp_path / "feeds" / "rss" / "index.xml").read_bytes()
+    assert b"<feed" in (tmp_path / "feeds" / "atom" / "index.xml").read_bytes()
@@ -0,0 +1,39 @@
+"""Test rendering of custom Wagtail blocks."""
+
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from picata.blocks import CodeBlock, get_highlight_cache
+from picata.caches import TieredCache
+
+
+def test_code_highlighting_is_memoised() -> None:
+    """Test that identical code is only run through Pygments once."""
+    block = CodeBlock()
+    value = {"code": "def memoised(): pass", "language": "python"}
+    get_highlight_cache.cache_clear()
+    cache_settings = {"BACKEND": "picata.caches.LRUCache", "OPTIONS": {"max_entries": 16}}
+    with (
+        override_settings(PICATA_HIGHLIGHT_CACHE=cache_settings),
+        patch("picata.blocks.pygments.highlight", return_value="<div>hi</div>") as highlight,
+    ):
+        first = block.render_basic(value)
+        second = block.render_basic(value)
+    get_highlight_cache.cache_clear()
+    assert first == second == "<div>hi</div>"
+    assert highlight.call_count == 1
+
+
+def test_unknown_language_falls_back_to_preformatted_text() -> None:
+    """Test that code in an unknown language is rendered without highlighting."""
+    assert CodeBlock().render_basic({"code": "x", "language": ""}) == "<pre><code>x</code></pre>"
+
+
+def test_tiered_cache_repopulates_local_tier() -> None:
+    """Test that a hit in the shared tier is copied into the local one."""
+    tiered = TieredCache(max_entries=4, key_prefix="test-tiered")
+    tiered.set("key", "value")
+    tiered.local.clear()
+    assert tiered.get("key") == "value"
+    assert tiered.local.get("key") == "value"
@@ -0,0 +1,52 @@
+"""Test the static export of the site, and its tracking of which pages show which."""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from django.test import override_settings
+from wagtail.models import Site
+
+from picata.export import affected_page_ids, export_site
+from picata.models import Article, ExportDependency, PostGroupPage
+
+
+@pytest.mark.django_db
+def test_export_records_listings_dependencies(tmp_path: Path) -> None:
+    """Test that pages are exported as index files, and listings recorded as showing posts."""
+    home = Site.objects.get(is_default_site=True).root_page
+    blog = home.add_child(instance=PostGroupPage(title="Blog", slug="blog"))
+    blog.save_revision().publish()
+    content = json.dumps([{"type": "rich_text", "value": "<p>Hello</p>"}])
+    article = blog.add_child(instance=Article(title="Post", slug="post", content=content))
+    article.save_revision().publish()
+
+    assert export_site(tmp_path / "export", workers=1) >= 2  # noqa: PLR2004
+    assert b"Hello" in (tmp_path / "export" / "blog" / "post" / "index.html").read_bytes()
+    assert (tmp_path / "export" / "sitemap.xml").exists()
+    assert ExportDependency.objects.filter(page=blog, included=article).exists()
+    assert {article.pk, blog.pk, home.pk} <= (affected_page_ids(article) or set())
+
+
+@pytest.mark.django_db
+def test_deleted_pages_withdrawn(
+    tmp_path: Path, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that deleting a page removes its files, and re-exports the pages that showed it."""
+    home = Site.objects.get(is_default_site=True).root_page
+    blog = home.add_child(instance=PostGroupPage(title="Blog", slug="blog"))
+    blog.save_revision().publish()
+    content = json.dumps([{"type": "rich_text", "value": "<p>Goodbye</p>"}])
+    article = blog.add_child(instance=Article(title="Doomed post", slug="post", content=content))
+    article.save_revision().publish()
+    root = tmp_path / "export"
+    with override_settings(PICATA_EXPORT_ROOT=root):
+        export_site(root, workers=1)
+        assert b"Doomed post" in (root / "blog" / "index.html").read_bytes()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            article.delete()
+    assert not (root / "blog" / "post" / "index.html").exists()
+    assert b"Doomed post" not in (root / "blog" / "index.html").read_bytes()
+    assert not ExportDependency.objects.filter(page=blog).exists()
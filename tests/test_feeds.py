@@ -0,0 +1,27 @@
+"""Test that syndication feeds are bounded and answer conditional GETs."""
+
+import pytest
+from django.test import Client, override_settings
+from wagtail.models import Site
+
+from picata.models import Article
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_FEED_ITEMS=2)
+def test_feed_is_bounded_and_conditional(client: Client) -> None:
+    """Test that feeds hold at most `PICATA_FEED_ITEMS` items, and 304 when unchanged."""
+    root = Site.objects.get(is_default_site=True).root_page
+    for number in range(3):
+        article = Article(title=f"Post {number}", slug=f"post-{number}", content="[]")
+        root.add_child(instance=article)
+        article.save_revision().publish()
+
+    response = client.get("/feeds/rss/")
+    assert response.status_code == 200  # noqa: PLR2004
+    assert response.content.count(b"<item>") == 2  # noqa: PLR2004
+
+    unchanged = client.get("/feeds/rss/", headers={"if-none-match": response["ETag"]})
+    assert unchanged.status_code == 304  # noqa: PLR2004
+    unmodified = client.get("/feeds/rss/", headers={"if-modified-since": response["Last-Modified"]})
+    assert unmodified.status_code == 304  # noqa: PLR2004
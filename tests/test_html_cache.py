@@ -0,0 +1,45 @@
+"""Test the bounded caches and their use by `HTMLProcessingMiddleware`."""
+
+from unittest.mock import patch
+
+from django.http import HttpRequest, HttpResponse
+
+from picata.caches import LRUCache
+from picata.middleware import HTMLProcessingMiddleware
+
+DOCUMENT = b"<!DOCTYPE html><html><body><main><h2>Hello world</h2></main></body></html>"
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    """Test that reading an entry protects it from eviction when the cache is full."""
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3  # noqa: PLR2004
+    assert len(cache) == 2  # noqa: PLR2004
+
+
+def test_identical_documents_are_transformed_once() -> None:
+    """Test that a byte-identical response is served from the cache."""
+    middleware = HTMLProcessingMiddleware(lambda _: HttpResponse(DOCUMENT))
+    middleware.cache = LRUCache()
+
+    with patch.object(middleware, "process", wraps=middleware.process) as process:
+        first = middleware(HttpRequest())
+        second = middleware(HttpRequest())
+
+    assert process.call_count == 1
+    assert first.content == second.content
+    assert b'id="hello-world"' in second.content
+
+
+def test_cache_key_depends_on_transformers_and_pipeline() -> None:
+    """Test that changing the registered transformers or the pipeline changes the cache key."""
+    key = HTMLProcessingMiddleware.cache_key(DOCUMENT)
+    with patch.object(HTMLProcessingMiddleware, "transformers", []):
+        assert HTMLProcessingMiddleware.cache_key(DOCUMENT) != key
+    assert HTMLProcessingMiddleware.cache_key(DOCUMENT, "stream") != key
@@ -0,0 +1,223 @@
+"""Test the date-ordered listings of posts, and the indexed dates they're ordered by."""
+
+import importlib
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import pytest
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from wagtail.models import Page, Site
+
+from picata.helpers import decode_date_cursor, encode_date_cursor
+from picata.helpers.wagtail import page_preview_data, prefetch_preview_data
+from picata.models import Article, ArticleType, PageDates, PostGroupPage, PostSeries
+
+
+@pytest.fixture
+def blog() -> PostGroupPage:
+    """Create and publish a post listing under the home page."""
+    home = Site.objects.get(is_default_site=True).root_page
+    blog = home.add_child(instance=PostGroupPage(title="Blog", slug="blog"))
+    blog.save_revision().publish()
+    return blog
+
+
+def add_article(parent: Page, slug: str, *, publish: bool = True) -> Article:
+    """Add an article under `parent`, saved as a revision and (by default) published."""
+    article = parent.add_child(
+        instance=Article(title=slug.title(), slug=slug, content="[]", live=publish)
+    )
+    revision = article.save_revision()
+    if publish:
+        revision.publish()
+    article.refresh_from_db()
+    return article
+
+
+def dated(page: Page, year: int, month: int = 6) -> Page:
+    """Backdate a page's publication to the given month, saving it."""
+    page.first_published_at = page.last_published_at = datetime(year, month, 1, tzinfo=UTC)
+    page.save()
+    return page
+
+
+def listed_titles(client: Client, url: str) -> dict[int, list[str]]:
+    """Return the titles of the posts listed at `url`, by the year they're listed under."""
+    response = client.get(url)
+    assert response.status_code == 200  # noqa: PLR2004
+    return {
+        year: [post["title"] for post in posts]
+        for year, posts in response.context["posts_by_year"].items()
+    }
+
+
+@pytest.fixture
+def series(blog: PostGroupPage) -> PostSeries:
+    """Create and publish a series (listed under 2022 until it has articles) in the blog."""
+    series = blog.add_child(instance=PostSeries(title="Series", slug="series"))
+    series.save_revision().publish()
+    series.refresh_from_db()
+    return dated(series, 2022)
+
+
+@pytest.mark.django_db
+def test_page_dates_follow_saves(blog: PostGroupPage) -> None:
+    """Test that pages' indexed dates are copied as they're created, drafted and published."""
+    article = blog.add_child(instance=Article(title="Post", slug="post", content="[]"))
+    assert PageDates.objects.get(page=article).effective_date is None
+    revision = article.save_revision()
+    assert PageDates.objects.get(page=article).effective_date == revision.created_at
+    revision.publish()
+    article.refresh_from_db()
+    assert PageDates.objects.get(page=article).effective_date == article.last_published_at
+    assert set(Page.objects.values_list("pk", flat=True)) == set(
+        PageDates.objects.values_list("page", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_empty_listing(client: Client, blog: PostGroupPage) -> None:
+    """Test that a listing with no posts lists nothing (rather than every other page)."""
+    response = client.get(blog.url)
+    assert response.status_code == 200  # noqa: PLR2004
+    assert response.context["posts_by_year"] == {}
+
+
+@pytest.mark.django_db
+def test_series_listed_by_latest_article(
+    client: Client, blog: PostGroupPage, series: PostSeries
+) -> None:
+    """Test that a series is listed under its latest live article's date, as they change."""
+    dated(add_article(blog, "older"), 2023, 1)
+    dated(add_article(blog, "newer"), 2023, 9)
+    assert listed_titles(client, blog.url) == {2023: ["Newer", "Older"], 2022: ["Series"]}
+
+    part = dated(add_article(series, "part"), 2023, 5)
+    add_article(series, "draft", publish=False)
+    assert listed_titles(client, blog.url) == {2023: ["Newer", "Series", "Older"]}
+
+    dated(part, 2024, 3)
+    assert listed_titles(client, blog.url) == {2024: ["Series"], 2023: ["Newer", "Older"]}
+
+    part.unpublish()
+    assert listed_titles(client, blog.url) == {2023: ["Newer", "Older"], 2022: ["Series"]}
+
+
+@pytest.mark.django_db
+def test_listing_follows_moves_and_deletions(
+    client: Client, blog: PostGroupPage, series: PostSeries
+) -> None:
+    """Test that moved and deleted articles leave their series' (and listings') dates right."""
+    part = dated(add_article(series, "part"), 2024)
+    part.move(blog, pos="last-child")
+    assert listed_titles(client, blog.url) == {2024: ["Part"], 2022: ["Series"]}
+    assert PageDates.objects.get(page=part).parent_id == blog.pk
+
+    Page.objects.get(pk=part.pk).move(Page.objects.get(pk=series.pk), pos="last-child")
+    assert listed_titles(client, blog.url) == {2024: ["Series"]}
+    Page.objects.get(pk=part.pk).delete()
+    assert listed_titles(client, blog.url) == {2022: ["Series"]}
+
+
+@pytest.mark.django_db
+def test_listing_by_year(client: Client, blog: PostGroupPage, series: PostSeries) -> None:
+    """Test that `?year=` lists only the posts listed under that year, and ignores junk."""
+    dated(add_article(blog, "first"), 2023, 1)
+    dated(add_article(series, "part"), 2024, 12)
+    dated(add_article(blog, "last"), 2025, 1)
+    assert listed_titles(client, f"{blog.url}?year=2024") == {2024: ["Series"]}
+    assert listed_titles(client, f"{blog.url}?year=2022") == {}
+    for junk in ["99999", "²", "9" * 5000, "0", "-1"]:
+        assert len(listed_titles(client, f"{blog.url}?year={junk}")) == 3  # noqa: PLR2004
+
+
+@pytest.mark.django_db
+def test_listing_dates_backfilled(blog: PostGroupPage, series: PostSeries) -> None:
+    """Test that the migration adding listing dates fills them in as saves would have."""
+    dated(add_article(blog, "post"), 2023)
+    dated(add_article(series, "part"), 2024)
+    expected = set(PageDates.objects.values_list("page", "parent", "listing_date"))
+    PageDates.objects.update(parent=None, listing_date=None)
+
+    migration = importlib.import_module("picata.migrations.0011_pagedates_listing_date")
+    migration.copy_listing_dates(apps, None)
+    assert set(PageDates.objects.values_list("page", "parent", "listing_date")) == expected
+
+
+def add_posts(blog: PostGroupPage, series: PostSeries, *slugs: str) -> None:
+    """Add a tagged review to `blog`, and an article to `series`, for each slug."""
+    review, _ = ArticleType.objects.get_or_create(name="Review", slug="review")
+    for slug in slugs:
+        article = add_article(blog, slug)
+        article.page_type = review
+        article.tags.add("python", slug)
+        article.save_revision().publish()
+        add_article(series, f"{slug}-part")
+
+
+@pytest.mark.django_db
+def test_listing_queries_dont_grow_with_posts(
+    rf: RequestFactory,
+    blog: PostGroupPage,
+    series: PostSeries,
+    django_assert_num_queries: Callable,
+) -> None:
+    """Test that a listing costs the same number of queries however many posts it lists."""
+    request = rf.get(blog.url)
+    request.user = AnonymousUser()
+    add_posts(blog, series, "first")
+    blog.get_context(request)  # Warm per-process caches (of sites, say)
+    with CaptureQueriesContext(connection) as queries:
+        assert sum(map(len, blog.get_context(request)["posts_by_year"].values())) == 2  # noqa: PLR2004
+
+    add_posts(blog, series, "second", "third", "fourth")
+    with django_assert_num_queries(len(queries)):
+        assert sum(map(len, blog.get_context(request)["posts_by_year"].values())) == 5  # noqa: PLR2004
+
+
+@pytest.mark.django_db
+def test_preview_data_prefetched(
+    blog: PostGroupPage, series: PostSeries, django_assert_num_queries: Callable
+) -> None:
+    """Test that preview data needs no queries of its own once prefetched."""
+    add_article(series, "part")
+    article = add_article(blog, "post")
+    article.tags.add("python")
+    article.save_revision().publish()
+    pages = list(Page.objects.child_of(blog).specific())
+    user = AnonymousUser()
+
+    prefetch_preview_data(pages, user)
+    with django_assert_num_queries(0):
+        previews = [page_preview_data(page, user) for page in pages]
+    assert {preview["title"] for preview in previews} == {"Series", "Post"}
+
+
+def test_date_cursors() -> None:
+    """Test that cursors survive the query string, and junk ones are ignored."""
+    date = datetime(2023, 6, 1, tzinfo=UTC)
+    assert decode_date_cursor(encode_date_cursor((date, 12))) == (date, 12)
+    assert decode_date_cursor(encode_date_cursor((None, 12))) == (None, 12)
+    for token in [None, "", "junk", "2023-06-01_", "yesterday_12", "2023-06-01_x"]:
+        assert decode_date_cursor(token) is None
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_POSTS_PER_PAGE=2)
+def test_paging_through_tied_dates(client: Client, blog: PostGroupPage) -> None:
+    """Test that paging lists posts sharing a date exactly once each, newest id first."""
+    posts = [dated(add_article(blog, slug), 2023) for slug in ["a", "b", "c", "d", "e"]]
+    titles, query, pages = [], "", 0
+    while query is not None:
+        response = client.get(f"{blog.url}{query}")
+        titles += [post["title"] for post in response.context["posts_by_year"][2023]]
+        query, pages = response.context["next_page_url"], pages + 1
+    assert titles == [post.title for post in reversed(posts)]
+    assert pages == 3  # noqa: PLR2004
+
+    for junk in ["junk", "2023-06-01_x"]:
+        assert listed_titles(client, f"{blog.url}?after={junk}") == {2023: ["E", "D"]}
@@ -0,0 +1,87 @@
+"""Test serving images' renditions by X-Accel-Redirect, from a cache of their paths."""
+
+import io
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+from django.core.files.images import ImageFile
+from django.test import Client, override_settings
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+from wagtail.images.models import AbstractImage
+
+from picata.media import get_rendition_path_cache, image_url
+
+PATH_CACHE = {"BACKEND": "picata.caches.LRUCache", "OPTIONS": {"max_entries": 16}}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@pytest.fixture
+def accel_media(tmp_path: Path) -> Iterator[None]:
+    """Serve media from a temporary MEDIA_ROOT through nginx, with a fresh path cache."""
+    get_rendition_path_cache.cache_clear()
+    with override_settings(
+        MEDIA_ROOT=tmp_path,
+        PICATA_ACCEL_REDIRECT_URL="/internal-media/",
+        PICATA_RENDITION_PATH_CACHE=PATH_CACHE,
+    ):
+        yield
+    get_rendition_path_cache.cache_clear()
+
+
+def png(width: int, height: int) -> ImageFile:
+    """Return a blank PNG file of the given size."""
+    content = io.BytesIO()
+    PILImage.new("RGB", (width, height)).save(content, "PNG")
+    return ImageFile(content, name="test.png")
+
+
+@pytest.fixture
+def image(accel_media: None) -> AbstractImage:  # noqa: ARG001
+    """Create a 40x30 image (with no renditions cached)."""
+    get_image_model().get_rendition_model().cache_backend.clear()
+    return get_image_model().objects.create(title="Test", file=png(40, 30))
+
+
+@pytest.mark.django_db
+def test_renditions_sent_by_nginx(
+    client: Client, image: AbstractImage, django_assert_num_queries: Callable
+) -> None:
+    """Test that renditions are handed to nginx, and repeat requests skip the database."""
+    url = image_url(image, "width-20")
+
+    response = client.get(url)
+    location = response["X-Accel-Redirect"]
+    assert location.startswith("/internal-media/images/test.")
+    assert response["Content-Type"] == "image/png"
+    assert response["Cache-Control"] == IMMUTABLE
+
+    with django_assert_num_queries(0):
+        assert client.get(url)["X-Accel-Redirect"] == location
+    assert client.get(url.replace("width-20", "width-10")).status_code == 403  # noqa: PLR2004
+
+    image.renditions.all().delete()
+    assert get_rendition_path_cache().get(f"{image.pk}:width-20") is None
+
+
+@pytest.mark.django_db
+def test_replaced_images_revalidated(
+    client: Client, image: AbstractImage, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that URLs only cache for good at their image's version, which its file changes."""
+    old_url = image_url(image, "width-20")
+    assert client.get(old_url)["Cache-Control"] == IMMUTABLE
+    assert client.get(old_url.split("?")[0])["Cache-Control"] == "max-age=3600, public"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        image.file = png(60, 30)
+        image.file_hash = ""
+        image.save()
+        image.renditions.all().delete()
+    assert get_rendition_path_cache().get(f"{image.pk}:width-20") is None
+
+    new_url = image_url(image, "width-20")
+    assert new_url != old_url
+    assert client.get(old_url)["Cache-Control"] == "max-age=3600, public"
+    assert client.get(new_url)["Cache-Control"] == IMMUTABLE
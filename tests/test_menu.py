@@ -0,0 +1,35 @@
+"""Test the cached site menu, and finding its active section by materialised path."""
+
+from collections.abc import Callable
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from wagtail.models import Site
+
+from picata.models import BasicPage
+from picata.templatetags.tags.menu_tags import get_menu_cache, render_site_menu
+
+
+@pytest.mark.django_db
+def test_menu_cached_with_active_section(django_assert_num_queries: Callable) -> None:
+    """Test that the menu marks the section holding the current page, from cache."""
+    get_menu_cache().clear()
+    site = Site.objects.get(is_default_site=True)
+    section = site.root_page.add_child(
+        instance=BasicPage(title="Section", slug="section", show_in_menus=True, content="[]")
+    )
+    section.save_revision().publish()
+    page = section.add_child(instance=BasicPage(title="Page", slug="page", content="[]"))
+
+    request = RequestFactory().get("/section/page/")
+    request.user = AnonymousUser()
+    request._wagtail_site = site  # noqa: SLF001 (as found by Wagtail's `serve` view)
+    menu = render_site_menu({"request": request, "self": page})
+    assert [item["title"] for item in menu["menu_pages"]] == [site.root_page.title, "Section"]
+    assert menu["current_section"] == section.pk
+
+    with django_assert_num_queries(0):
+        assert (
+            render_site_menu({"request": request, "self": section})["current_section"] == section.pk
+        )
@@ -0,0 +1,48 @@
+"""Test the anonymous page cache, and its purging as pages are published."""
+
+from collections.abc import Callable, Iterator
+
+import pytest
+from django.test import Client, override_settings
+from wagtail.models import Site
+
+from picata.models import BasicPage
+from picata.page_cache import get_page_cache, site_paths
+
+PAGE_CACHE = {"BACKEND": "picata.caches.LRUCache", "OPTIONS": {"max_entries": 16}}
+
+
+@pytest.fixture
+def page_cache() -> Iterator[None]:
+    """Enable a fresh, in-process page cache for the duration of a test."""
+    get_page_cache.cache_clear()
+    with override_settings(PICATA_PAGE_CACHE=PAGE_CACHE):
+        yield
+    get_page_cache.cache_clear()
+
+
+@pytest.mark.django_db
+def test_site_paths() -> None:
+    """Test that a page's own path is purged along with its ancestors', up to the home page."""
+    root_path = Site.objects.get(is_default_site=True).root_page.url_path
+    assert site_paths(f"{root_path}blog/post/") == {"/", "/blog/", "/blog/post/"}
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("page_cache")
+def test_pages_cached_until_published(
+    client: Client, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that anonymous visitors get a cached page until it's published again."""
+    home = Site.objects.get(is_default_site=True).root_page
+    page = home.add_child(instance=BasicPage(title="Before", slug="about", content="[]"))
+    page.save_revision().publish()
+
+    assert b"Before" in client.get("/about/").content
+    BasicPage.objects.filter(pk=page.pk).update(title="Behind the cache's back")
+    assert b"Before" in client.get("/about/").content
+
+    page.title = "After"
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    assert b"After" in client.get("/about/").content
@@ -0,0 +1,46 @@
+"""Test the low-quality placeholders computed for images."""
+
+import base64
+import io
+from pathlib import Path
+
+import pytest
+from django.core.files.images import ImageFile
+from django.test import override_settings
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+
+from picata.models import ImagePlaceholder
+from picata.placeholders import compute_placeholder, store_placeholder
+
+
+def image_file(size: tuple[int, int]) -> io.BytesIO:
+    """Return a PNG that's mostly red, with a smaller blue stripe down its left side."""
+    image = PILImage.new("RGB", size, (255, 0, 0))
+    image.paste((0, 0, 255), (0, 0, size[0] // 4, size[1]))
+    content = io.BytesIO()
+    image.save(content, "PNG")
+    content.seek(0)
+    return content
+
+
+def test_compute_placeholder() -> None:
+    """Test that the placeholder is a tiny thumbnail, coloured by the image's main colour."""
+    data_uri, colour = compute_placeholder(image_file((800, 400)))
+    assert colour == "#ff0000"
+    prefix = "data:image/webp;base64,"
+    assert data_uri.startswith(prefix)
+    with PILImage.open(io.BytesIO(base64.b64decode(data_uri.removeprefix(prefix)))) as thumbnail:
+        assert thumbnail.size == (16, 8)
+
+
+@pytest.mark.django_db
+def test_store_placeholder_once_per_file(tmp_path: Path) -> None:
+    """Test that a placeholder's stored for an image, and only recomputed if its file changes."""
+    with override_settings(MEDIA_ROOT=tmp_path):
+        image = get_image_model().objects.create(
+            title="Stripes", file=ImageFile(image_file((40, 20)), name="stripes.png")
+        )
+        assert store_placeholder(image.pk)
+        assert not store_placeholder(image.pk)
+    assert ImagePlaceholder.objects.get(image=image).colour == "#ff0000"
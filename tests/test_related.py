@@ -0,0 +1,127 @@
+"""Test TF-IDF weighting of article terms, and the upkeep of related articles."""
+
+import json
+import math
+
+import pytest
+from django.test import override_settings
+from wagtail.models import Site
+
+from picata.models import Article, ArticleTerms, ArticleType, RelatedArticle
+from picata.related import rebuild_related_articles, tfidf_vectors
+from picata.signals import fill_related_articles
+
+
+def test_tfidf_vectors() -> None:
+    """Test that vectors are unit length, and that rarer terms outweigh common ones."""
+    vectors = tfidf_vectors(
+        {
+            1: {"caching": 2, "django": 1},
+            2: {"django": 1, "rust": 3},
+            3: {"caching": 1, "postgres": 1},
+            4: {"postgres": 2},
+        }
+    )
+    for vector in vectors.values():
+        assert math.isclose(sum(weight * weight for weight in vector.values()), 1.0)
+    assert vectors[2]["rust"] > vectors[2]["django"]
+
+
+def test_tfidf_ignores_ubiquitous_terms() -> None:
+    """Test that terms found in most articles are dropped as uninformative."""
+    vectors = tfidf_vectors({1: {"code": 1, "wagtail": 1}, 2: {"code": 1}, 3: {"code": 1}})
+    assert "code" not in vectors[1]
+    assert vectors[2] == {}
+
+
+def published(slug: str, text: str, *tags: str, page_type: ArticleType | None = None) -> Article:
+    """Create and publish an article under the home page, with the given text and tags."""
+    home = Site.objects.get(is_default_site=True).root_page
+    content = json.dumps([{"type": "rich_text", "value": f"<p>{text}</p>"}])
+    article = home.add_child(
+        instance=Article(title=slug.title(), slug=slug, content=content, page_type=page_type)
+    )
+    article.tags.add(*tags)
+    article.save_revision().publish()
+    return article
+
+
+def related_slugs() -> dict[str, list[str]]:
+    """Return the slugs of each live article's related articles, by its slug."""
+    return {
+        article.slug: [related.slug for related in article.get_related_articles()]
+        for article in Article.objects.live().order_by("pk")
+    }
+
+
+@pytest.fixture
+def articles() -> dict[str, Article]:
+    """Publish two articles sharing terms, two sharing a tag, and one apart from the rest."""
+    return {
+        slug: published(slug, text, *tags)
+        for slug, text, tags in [
+            ("garden", "Tomatoes ripen slowly in shade", ()),
+            ("borrowing", "Lifetimes and ownership", ("rust",)),
+            ("traits", "Generics with dispatch", ("rust",)),
+            ("vacuum", "Postgres vacuum reclaims dead tuples", ()),
+            ("planner", "Postgres planner statistics after vacuum", ()),
+        ]
+    }
+
+
+@pytest.mark.django_db
+def test_publishing_relates_articles(articles: dict[str, Article]) -> None:
+    """Test that published articles find, and join, the lists of those they share terms with."""
+    expected = {
+        "garden": [],
+        "borrowing": ["traits"],
+        "traits": ["borrowing"],
+        "vacuum": ["planner"],
+        "planner": ["vacuum"],
+    }
+    assert related_slugs() == expected
+    assert set(ArticleTerms.objects.values_list("article", flat=True)) == {
+        article.pk for article in articles.values()
+    }
+
+    rebuild_related_articles()
+    assert related_slugs() == expected
+
+
+@pytest.mark.django_db
+def test_publishing_leaves_unrelated_lists_be(articles: dict[str, Article]) -> None:
+    """Test that only the lists of articles sharing something with a published one change."""
+    unrelated = set(RelatedArticle.objects.filter(source=articles["borrowing"]))
+    articles["planner"].save_revision().publish()
+    assert set(RelatedArticle.objects.filter(source=articles["borrowing"])) == unrelated
+    assert related_slugs()["vacuum"] == ["planner"]
+
+
+@pytest.mark.django_db
+def test_unpublishing_drops_article(articles: dict[str, Article]) -> None:
+    """Test that an unpublished article leaves every list, and its terms are forgotten."""
+    articles["planner"].unpublish()
+    assert related_slugs()["vacuum"] == []
+    assert not RelatedArticle.objects.filter(target=articles["planner"]).exists()
+    assert not ArticleTerms.objects.filter(article=articles["planner"]).exists()
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_RELATED_ARTICLES=2)
+def test_articles_related_by_type_alone() -> None:
+    """Test that articles sharing only a type are related, earliest first."""
+    review = ArticleType.objects.create(name="Review", slug="review")
+    first, second, third = (published(slug, "", page_type=review) for slug in ["a", "b", "c"])
+    assert related_slugs() == {"a": ["b", "c"], "b": ["a", "c"], "c": ["a", "b"]}
+    assert RelatedArticle.objects.get(source=third, target=first).score == pytest.approx(0.2)
+    assert second.get_related_articles() == [first, third]
+
+
+@pytest.mark.django_db
+def test_missing_terms_filled_in_after_migrating(articles: dict[str, Article]) -> None:
+    """Test that articles published before terms were recorded are scored by `migrate`."""
+    ArticleTerms.objects.all().delete()
+    RelatedArticle.objects.all().delete()
+    fill_related_articles(sender=None)
+    assert related_slugs()["vacuum"] == ["planner"]
+    assert ArticleTerms.objects.count() == len(articles)
@@ -0,0 +1,89 @@
+"""Test that articles' stored rendered content is cleared as what it links to changes."""
+
+import io
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from django.core.files.images import ImageFile
+from django.test import Client, override_settings
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+from wagtail.models import Page, Site
+
+from picata.models import Article, BasicPage
+
+
+def publish_article(content: list[dict], capture: Callable) -> Article:
+    """Create and publish an article (and its references, as on commit) under the home page."""
+    home = Site.objects.get(is_default_site=True).root_page
+    with capture(execute=True):  # Wagtail indexes references on commit
+        article = home.add_child(
+            instance=Article(title="Post", slug="post", content=json.dumps(content))
+        )
+        article.save_revision().publish()
+    return Article.objects.get(pk=article.pk)
+
+
+def stored_content(article: Article) -> str | None:
+    """Return the article's stored rendered content, if it's still current."""
+    return Article.objects.get(pk=article.pk).get_rendered_content()
+
+
+@pytest.mark.django_db
+def test_links_rerendered_after_moves(
+    client: Client, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that content linking to a renamed, moved or deleted page is rendered afresh."""
+    home = Site.objects.get(is_default_site=True).root_page
+    target = home.add_child(instance=BasicPage(title="Target", slug="target"))
+    target.save_revision().publish()
+    link = f'<p><a linktype="page" id="{target.pk}">Target</a></p>'
+    article = publish_article(
+        [{"type": "rich_text", "value": link}], django_capture_on_commit_callbacks
+    )
+    assert 'href="/target/"' in (stored_content(article) or "")
+
+    target.slug = "moved"
+    target.save_revision().publish()
+    assert stored_content(article) is None
+    assert 'href="/moved/"' in client.get(article.url).content.decode()
+
+    article.save_revision().publish()
+    assert 'href="/moved/"' in (stored_content(article) or "")
+    section = home.add_child(instance=BasicPage(title="Section", slug="section"))
+    Page.objects.get(pk=target.pk).move(Page.objects.get(pk=section.pk), pos="last-child")
+    assert stored_content(article) is None
+    assert 'href="/section/moved/"' in client.get(article.url).content.decode()
+
+    article.save_revision().publish()
+    Page.objects.get(pk=target.pk).delete()
+    assert stored_content(article) is None
+
+
+@pytest.mark.django_db
+def test_images_rerendered_after_changes(
+    tmp_path: Path, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that content showing an image is re-rendered once the image is changed or deleted."""
+    content = io.BytesIO()
+    PILImage.new("RGB", (400, 300)).save(content, "PNG")
+    with override_settings(MEDIA_ROOT=tmp_path):
+        image = get_image_model().objects.create(
+            title="Photo", file=ImageFile(content, name="photo.png")
+        )
+        article = publish_article(
+            [{"type": "image", "value": image.pk}], django_capture_on_commit_callbacks
+        )
+        assert "/media/images/photo" in (stored_content(article) or "")
+
+        image.focal_point_x, image.focal_point_y = 100, 100
+        image.focal_point_width = image.focal_point_height = 50
+        image.save()
+        assert stored_content(article) is None
+
+        article.save_revision().publish()
+        assert stored_content(article) is not None
+        image.delete()
+        assert stored_content(article) is None
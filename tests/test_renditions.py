@@ -0,0 +1,130 @@
+"""Test the planning of image renditions to generate ahead of requests."""
+
+import io
+import json
+import re
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from django.core.files.images import ImageFile
+from django.test import override_settings
+from PIL import Image as PILImage
+from wagtail.blocks import ListBlock, RichTextBlock, StreamBlock, StructBlock
+from wagtail.images import get_image_model
+from wagtail.images.models import AbstractImage
+from wagtail.models import Site
+
+from picata.blocks import WrappedImageChooserBlock
+from picata.models import Article
+from picata.renditions import (
+    expand_filter_specs,
+    merge_plans,
+    picture_tag,
+    plan_block,
+    plan_rich_text,
+    plan_social_image,
+    responsive_filter_specs,
+)
+
+
+@pytest.fixture
+def image(tmp_path: Path) -> Iterator[AbstractImage]:
+    """Create a 1000x500 image, stored in a temporary MEDIA_ROOT (with no renditions cached)."""
+    get_image_model().get_rendition_model().cache_backend.clear()
+    content = io.BytesIO()
+    PILImage.new("RGB", (1000, 500)).save(content, "PNG")
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield get_image_model().objects.create(
+            title="Wide", file=ImageFile(content, name="wide.png")
+        )
+
+
+def test_plan_rich_text() -> None:
+    """Test that embedded images are planned at their format's filter spec, and others skipped."""
+    html = (
+        '<p>Text</p><embed alt="A" embedtype="image" format="left" id="3"/>'
+        '<embed embedtype="image" format="no-such-format" id="4"/>'
+        '<embed embedtype="media" url="https://example.com/video"/>'
+    )
+    assert plan_rich_text(html) == {3: {"responsive-500"}}
+
+
+def test_plan_nested_blocks() -> None:
+    """Test that images are found throughout nested streams, structs and lists."""
+    stream_block = StreamBlock(
+        [
+            ("figure", StructBlock([("image", WrappedImageChooserBlock(required=False))])),
+            ("gallery", ListBlock(WrappedImageChooserBlock())),
+            ("text", RichTextBlock()),
+        ]
+    )
+    value = stream_block.to_python([])
+    value.append(("figure", {"image": SimpleNamespace(pk=1)}))
+    value.append(("gallery", [SimpleNamespace(pk=2), SimpleNamespace(pk=1)]))
+    value.append(("text", stream_block.child_blocks["text"].to_python("<p>No images</p>")))
+    assert merge_plans(plan_block(stream_block, value), plan_social_image(2)) == {
+        1: {"responsive"},
+        2: {"responsive", "fill-1200x630"},
+    }
+
+
+@override_settings(PICATA_IMAGE_WIDTHS=[480, 800, 1200], PICATA_IMAGE_FORMATS=["webp"])
+def test_responsive_specs_stop_at_image_width() -> None:
+    """Test that variants are planned up to the image's own width, and not beyond."""
+    image = SimpleNamespace(width=1000, height=500)
+    assert expand_filter_specs(image, ["responsive", "original"]) == [
+        "width-480",
+        "width-800",
+        "width-1000",
+        "width-480|format-webp",
+        "width-800|format-webp",
+        "width-1000|format-webp",
+        "original",
+    ]
+    assert expand_filter_specs(image, ["responsive-500"])[:2] == ["width-480", "width-500"]
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_IMAGE_WIDTHS=[480, 800], PICATA_IMAGE_FORMATS=["avif", "webp"])
+def test_picture_tag(image: AbstractImage) -> None:
+    """Test that pictures offer each format at every width, at its own width too."""
+    html = picture_tag(image, lazy=True)
+    assert html.startswith('<picture><source type="image/avif" srcset="')
+    assert '<source type="image/webp"' in html
+    assert re.search(r"/width-480%7Cformat-avif/wide.png\?v=\w+ 480w, ", html)
+    assert 'width="1000"' in html
+    assert 'height="500"' in html
+    assert 'loading="lazy"' in html
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_IMAGE_WIDTHS=[480], PICATA_IMAGE_FORMATS=["webp"])
+def test_pictures_loaded_in_bulk(image: AbstractImage, django_assert_num_queries: Callable) -> None:
+    """Test that a stream's pictures cost the same few queries however many it shows."""
+    stream_block = StreamBlock([("image", WrappedImageChooserBlock())])
+    image.get_renditions(*responsive_filter_specs(image))
+    value = stream_block.to_python([{"type": "image", "value": image.pk}] * 3)
+    with django_assert_num_queries(2):  # The images (and placeholders), and their renditions
+        html = str(stream_block.render(value))
+    assert html.count("<picture>") == 3  # noqa: PLR2004
+    assert "/images/" not in html.replace("/media/images/", "")
+
+
+@pytest.mark.django_db
+@override_settings(PICATA_IMAGE_WIDTHS=[480], PICATA_IMAGE_FORMATS=["webp"])
+def test_stored_content_refreshed_with_renditions(
+    image: AbstractImage, django_capture_on_commit_callbacks: Callable
+) -> None:
+    """Test that content stored on publish links renditions once they've been generated."""
+    embed = f'<embed embedtype="image" format="left" id="{image.pk}" alt="Wide"/>'
+    content = json.dumps([{"type": "rich_text", "value": f"<p>Text</p>{embed}"}])
+    home = Site.objects.get(is_default_site=True).root_page
+    article = home.add_child(instance=Article(title="Post", slug="post", content=content))
+    with django_capture_on_commit_callbacks(execute=True):
+        article.save_revision().publish()
+    article.refresh_from_db()
+    stored = article.get_rendered_content() or ""
+    assert "/media/images/wide.width-480.format-webp" in stored
+    assert "/images/" not in stored.replace("/media/images/", "")
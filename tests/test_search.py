@@ -0,0 +1,196 @@
+"""Test search documents, ranked search against Postgres (where available), filters and caching."""
+
+import json
+from collections.abc import Callable, Iterator
+
+import pytest
+from django.contrib.auth.models import AbstractUser
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import Client, override_settings
+from wagtail.models import Page, Site
+
+from picata.caches import bump_content_generation, content_generation
+from picata.helpers.wagtail import bulk_specific, filter_pages_by_tags, filter_pages_by_type
+from picata.models import Article, ArticleType, PostGroupPage
+from picata.search import format_snippet, index_pages, search_pages, weighted_text
+from picata.views import get_search_cache
+
+CONTENT = json.dumps([{"type": "rich_text", "value": "<p>Tuning <b>caches</b> in Django</p>"}])
+
+
+@pytest.mark.django_db
+def test_weighted_text() -> None:
+    """Test that titles, summaries and content are grouped under their weights."""
+    article = Article(title="Caching", summary="<p>Why caches help</p>", content=CONTENT)
+    texts = weighted_text(article)
+    assert texts["A"] == "Caching"
+    assert "Why caches help" in texts["B"]
+    assert "Tuning caches in Django" in texts["C"]
+
+
+def test_format_snippet() -> None:
+    """Test that snippets are escaped, and their highlighted terms marked up."""
+    snippet = format_snippet("if a < b then \x02cache\x03 it")
+    assert snippet == "if a &lt; b then <mark>cache</mark> it"
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs a Postgres database")
+def test_postgres_search_ranks_title_matches_first() -> None:
+    """Test that a match in a page's title outranks one in its content."""
+    root = Page.objects.get(depth=1)
+    in_content = root.add_child(instance=Article(title="Performance", slug="a", content=CONTENT))
+    in_title = root.add_child(instance=Article(title="Caches", slug="b", content="[]"))
+    index_pages(Page.objects.filter(depth__gt=1).specific())
+
+    results = list(search_pages(Page.objects.all(), "caches"))
+    assert [page.pk for page in results] == [in_title.pk, in_content.pk]
+    assert "<mark>" in format_snippet(results[1].snippet)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs a Postgres database")
+def test_search_falls_back_until_documents_filled_in(
+    django_capture_on_commit_callbacks: Callable,
+) -> None:
+    """Test that live pages without documents are searched through Wagtail until indexed."""
+    root = Page.objects.get(depth=1)
+    with django_capture_on_commit_callbacks(execute=True):  # Wagtail indexes on commit
+        article = root.add_child(instance=Article(title="Caches", slug="a", content=CONTENT))
+    results = search_pages(Page.objects.all(), "caches")
+    assert not isinstance(results, QuerySet)
+    assert [page.pk for page in results] == [article.pk]
+
+    index_pages(Page.objects.filter(depth__gt=1).specific())
+    results = search_pages(Page.objects.all(), "caches")
+    assert isinstance(results, QuerySet)
+    assert [page.pk for page in results] == [article.pk]
+
+
+@pytest.fixture
+def search_cache() -> Iterator[None]:
+    """Cache search results in a fresh, in-process cache."""
+    get_search_cache.cache_clear()
+    cache_settings = {"BACKEND": "picata.caches.LRUCache", "OPTIONS": {"max_entries": 16}}
+    with override_settings(PICATA_SEARCH_CACHE=cache_settings):
+        yield
+    get_search_cache.cache_clear()
+
+
+@pytest.fixture
+def article(django_capture_on_commit_callbacks: Callable) -> Article:
+    """Create a live article under the home page (indexed, as on commit)."""
+    home = Site.objects.get(is_default_site=True).root_page
+    with django_capture_on_commit_callbacks(execute=True):
+        return home.add_child(instance=Article(title="Caches", slug="caches", content=CONTENT))
+
+
+def test_content_generation_bumps() -> None:
+    """Test that bumping the content generation moves every reader on to the next one."""
+    generation = content_generation()
+    assert content_generation() == generation
+    assert bump_content_generation() == generation + 1
+    assert content_generation() == generation + 1
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("search_cache", "article")
+def test_results_cached_by_exact_query(client: Client) -> None:
+    """Test that results are cached per query as it was typed, not as it's matched."""
+    for query in ("caches", "Caches", "caches", "  caches "):
+        response = client.get("/search/", {"query": query})
+        assert response.context["query"] == query.strip()
+        assert [page["title"] for page in response.context["pages"]] == ["Caches"]
+    assert len(get_search_cache()) == 2  # noqa: PLR2004
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("search_cache")
+def test_logged_in_results_not_cached(
+    client: Client, admin_user: AbstractUser, article: Article
+) -> None:
+    """Test that logged-in users' results (which include drafts) are never cached."""
+    client.force_login(admin_user)
+    assert [page["title"] for page in client.get("/search/?query=caches").context["pages"]] == [
+        "Caches"
+    ]
+    article.unpublish()
+    assert client.get("/search/?query=caches").context["pages"][0]["live"] is False
+    assert len(get_search_cache()) == 0
+
+
+@pytest.fixture
+def tagged_articles() -> dict[str, Article]:
+    """Publish articles with overlapping tags, some of them reviews."""
+    home = Site.objects.get(is_default_site=True).root_page
+    review = ArticleType.objects.create(name="Review", slug="review")
+    guide = ArticleType.objects.create(name="Guide", slug="guide")
+    articles = {}
+    for slug, page_type, tags in [
+        ("both", review, ["python", "django"]),
+        ("python", guide, ["python"]),
+        ("django", review, ["django"]),
+        ("untyped", None, ["python", "django", "rust"]),
+    ]:
+        article = home.add_child(
+            instance=Article(title=slug, slug=slug, content="[]", page_type=page_type)
+        )
+        article.tags.add(*tags)
+        article.save_revision().publish()
+        articles[slug] = article
+    return articles
+
+
+def slugs(pages: QuerySet) -> set[str]:
+    """Return the slugs of a queryset's pages."""
+    return set(pages.values_list("slug", flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("live_only", [False, True])
+def test_tag_filters_need_every_tag(tagged_articles: dict[str, Article], live_only: bool) -> None:  # noqa: FBT001
+    """Test that filtering by tags keeps pages tagged with all of them, from either source."""
+    pages = Page.objects.live()
+    assert slugs(filter_pages_by_tags(pages, {"python", "django"}, live_only=live_only)) == {
+        "both",
+        "untyped",
+    }
+    assert slugs(filter_pages_by_tags(pages, {"rust"}, live_only=live_only)) == {"untyped"}
+    assert slugs(filter_pages_by_tags(pages, {"python", "missing"}, live_only=live_only)) == set()
+
+    tagged_articles["untyped"].unpublish()
+    assert slugs(filter_pages_by_tags(pages, {"rust"}, live_only=live_only)) == set()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("tagged_articles")
+def test_type_filters_need_any_type() -> None:
+    """Test that filtering by page types keeps articles of any of them, and nothing else."""
+    pages = Page.objects.all()
+    assert slugs(filter_pages_by_type(pages, {"review"})) == {"both", "django"}
+    assert slugs(filter_pages_by_type(pages, {"review", "guide"})) == {"both", "python", "django"}
+    assert slugs(filter_pages_by_type(pages, {"missing"})) == set()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("tagged_articles")
+def test_search_filters_combine(client: Client) -> None:
+    """Test that the search view applies tag and type filters together."""
+    response = client.get("/search/", {"tags": "python,django", "page_types": "review"})
+    assert [page["title"] for page in response.context["pages"]] == ["both"]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("tagged_articles")
+def test_bulk_specific_queries_each_type_once(django_assert_num_queries: Callable) -> None:
+    """Test that specific pages are fetched with a query per type, in the order given."""
+    home = Site.objects.get(is_default_site=True).root_page
+    home.add_child(instance=PostGroupPage(title="Blog", slug="blog"))
+    pages = list(Page.objects.filter(depth__gt=1).order_by("-path"))
+    bulk_specific(pages)  # Warm the content type cache
+
+    with django_assert_num_queries(len({page.content_type_id for page in pages})):
+        specific = bulk_specific(pages)
+    assert [page.pk for page in specific] == [page.pk for page in pages]
+    assert [type(page) for page in specific] == [page.specific_class for page in pages]
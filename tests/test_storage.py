@@ -0,0 +1,46 @@
+"""Test the static files storage writing precompressed variants of hashed files."""
+
+import gzip
+from pathlib import Path
+
+from picata.storage import PrecompressedManifestStaticFilesStorage
+
+STYLESHEET = "body { background: url('logo.png'); }\n" * 20
+
+
+def collect(location: Path) -> PrecompressedManifestStaticFilesStorage:
+    """Collect a stylesheet and an image into `location`, as `collectstatic` would."""
+    storage = PrecompressedManifestStaticFilesStorage(location=location)
+    location.mkdir(exist_ok=True)
+    (location / "site.css").write_text(STYLESHEET)
+    (location / "logo.png").write_bytes(b"\x89PNG" * 100)
+    paths = {name: (storage, name) for name in ("site.css", "logo.png")}
+    list(storage.post_process(paths))
+    return storage
+
+
+def test_hashed_files_precompressed(tmp_path: Path) -> None:
+    """Test that compressible files get .gz variants, both as collected and hashed."""
+    storage = collect(tmp_path)
+    hashed_css = tmp_path / storage.hashed_files["site.css"]
+    assert gzip.decompress((tmp_path / "site.css.gz").read_bytes()).decode() == STYLESHEET
+    assert gzip.decompress(Path(f"{hashed_css}.gz").read_bytes()).startswith(b"body")
+    assert not list(tmp_path.glob("logo*.png.gz"))
+
+
+def test_unchanged_files_skipped(tmp_path: Path) -> None:
+    """Test that variants are left alone when their files haven't changed since."""
+    storage = collect(tmp_path)
+    variant = tmp_path / "site.css.gz"
+    variant.write_bytes(b"untouched")
+    list(storage.post_process({"site.css": (storage, "site.css")}))
+    assert variant.read_bytes() == b"untouched"
+
+
+def test_manifest_shared(tmp_path: Path) -> None:
+    """Test that storages share the manifest, parsed once."""
+    collect(tmp_path)
+    first = PrecompressedManifestStaticFilesStorage(location=tmp_path)
+    second = PrecompressedManifestStaticFilesStorage(location=tmp_path)
+    assert "site.css" in first.hashed_files
+    assert first.hashed_files is second.hashed_files
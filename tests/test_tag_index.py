@@ -0,0 +1,68 @@
+"""Test set operations over the precomputed tag index, and its upkeep."""
+
+import importlib
+
+import pytest
+from django.apps import apps
+from wagtail.models import Site
+
+from picata.models import Article, TagIndexEntry
+from picata.tag_index import TagIndex
+
+INDEX = TagIndex({"python": [1, 2, 3, 4], "django": [2, 3], "rust": [4, 5]})
+
+
+def test_tag_intersection_and_counts() -> None:
+    """Test all-of tag lookups, and tag counts ordered most-used first."""
+    assert INDEX.pages_tagged_with_all(["python", "django"]) == {2, 3}
+    assert INDEX.pages_tagged_with_all(["django", "rust"]) == set()
+    assert INDEX.pages_tagged_with_all(["missing"]) == set()
+    assert list(INDEX.counts().items()) == [("python", 4), ("django", 2), ("rust", 2)]
+
+
+def test_facets_and_related_pages() -> None:
+    """Test faceted counts over a result set, and pages ranked by shared tags."""
+    assert INDEX.facet_counts([1, 2, 4], exclude=["python"]) == {"django": 1, "rust": 1}
+    assert INDEX.related_by_tags(3) == [(2, 2), (1, 1), (4, 1)]
+    assert INDEX.related_by_tags(3, limit=1) == [(2, 2)]
+
+
+def indexed_tags() -> dict[str, list[int]]:
+    """Return the page ids held by each entry of the tag index, by tag name."""
+    return {entry.tag.name: entry.page_ids for entry in TagIndexEntry.objects.select_related("tag")}
+
+
+def tagged_article(slug: str, *tags: str) -> Article:
+    """Create and publish an article under the home page, with the given tags."""
+    home = Site.objects.get(is_default_site=True).root_page
+    article = home.add_child(instance=Article(title=slug.title(), slug=slug, content="[]"))
+    article.tags.add(*tags)
+    article.save_revision().publish()
+    return article
+
+
+@pytest.mark.django_db
+def test_index_follows_publishing() -> None:
+    """Test that pages join and leave tags' entries as they're retagged and unpublished."""
+    first = tagged_article("first", "python", "django")
+    second = tagged_article("second", "python")
+    assert indexed_tags() == {"python": [first.pk, second.pk], "django": [first.pk]}
+
+    first.tags.set(["rust"])
+    first.save_revision().publish()
+    assert indexed_tags() == {"python": [second.pk], "django": [], "rust": [first.pk]}
+
+    second.unpublish()
+    assert indexed_tags() == {"python": [], "django": [], "rust": [first.pk]}
+
+
+@pytest.mark.django_db
+def test_index_filled_in_by_migration() -> None:
+    """Test that the migration filling in the index matches what publishing maintains."""
+    tagged_article("first", "python", "django")
+    tagged_article("second", "python")
+    expected = indexed_tags()
+    TagIndexEntry.objects.all().delete()
+
+    importlib.import_module("picata.migrations.0012_fill_tag_index").fill_tag_index(apps, None)
+    assert indexed_tags() == expected
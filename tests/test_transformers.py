@@ -0,0 +1,81 @@
+"""Test the document transformers in both the tree and single-pass pipelines."""
+
+from django.http import HttpRequest, StreamingHttpResponse
+from lxml import etree
+
+from picata.middleware import HTMLProcessingMiddleware
+from picata.streaming import transform_html, transform_html_chunks
+from picata.transformers import HEADING_TAGS, AnchorInserter, add_heading_ids, annotate_headings
+
+DOCUMENT = (
+    b"<!DOCTYPE html><html><body><header><h1>Site</h1></header><main>"
+    b"<nav><h2>Contents</h2></nav><article><h2>Intro</h2><p>A &amp; B</p><h2>Intro</h2>"
+    b"<script>if (a < b) {}</script></article></main></body></html>"
+)
+
+TRANSFORMERS = [
+    add_heading_ids,
+    AnchorInserter(
+        root=".//article",
+        targets=".//h2",
+        root_tag="article",
+        target_tags=HEADING_TAGS,
+    ),
+]
+
+
+def test_single_pass_matches_tree_pipeline() -> None:
+    """Test that the single-pass pipeline adds the same ids and anchors as the tree pipeline."""
+    tree = etree.fromstring(DOCUMENT, etree.HTMLParser())  # noqa: S320
+    for transformer in TRANSFORMERS:
+        transformer(tree)
+    streamed = etree.fromstring(transform_html(DOCUMENT, TRANSFORMERS), etree.HTMLParser())  # noqa: S320
+
+    def headings(root: etree._Element) -> list[bytes]:
+        return [etree.tostring(h) for h in root.iter("h2")]
+
+    assert headings(streamed) == headings(tree)
+
+
+def test_single_pass_output() -> None:
+    """Test ids, anchors, escaping and raw text in single-pass output."""
+    html = transform_html(DOCUMENT, TRANSFORMERS)
+    assert html.startswith("<!DOCTYPE html>")
+    assert "<h2>Contents</h2>" in html
+    assert '<h2 id="intro">Intro<a href="#intro" class="target-link">¶</a></h2>' in html
+    assert 'id="intro1"' in html
+    assert "A &amp; B" in html
+    assert "if (a < b) {}" in html
+
+
+def test_chunked_output_matches_whole_document() -> None:
+    """Test that feeding a document in small chunks gives the same output as feeding it whole."""
+    chunks = [DOCUMENT[i : i + 7] for i in range(0, len(DOCUMENT), 7)]
+    streamed = b"".join(transform_html_chunks(chunks, TRANSFORMERS))
+    assert streamed.decode() == transform_html(DOCUMENT, TRANSFORMERS)
+
+
+def test_streaming_response_stays_streaming() -> None:
+    """Test that the middleware transforms streaming responses without buffering them."""
+    chunks = [DOCUMENT[:50], DOCUMENT[50:]]
+    middleware = HTMLProcessingMiddleware(lambda _: StreamingHttpResponse(iter(chunks)))
+    response = middleware(HttpRequest())
+    assert response.streaming
+    assert b'id="intro"' in b"".join(response.streaming_content)
+
+
+def test_render_time_annotation() -> None:
+    """Test that headings in a fragment get the ids and anchors the transformers would add."""
+    seen_ids = {"intro"}
+    html = annotate_headings("lead <h2>Intro</h2><p>x</p><h3 id='kept'>Kept</h3>", seen_ids)
+    assert html.startswith("lead ")
+    assert '<h2 id="intro1">Intro<a href="#intro1" class="target-link">¶</a></h2>' in html
+    assert '<h3 id="kept">Kept<a href="#kept" class="target-link">¶</a></h3>' in html
+    assert "intro-1" in seen_ids
+
+
+def test_render_time_annotation_escapes_text() -> None:
+    """Test that markup escaped in a fragment's leading text stays escaped."""
+    html = annotate_headings("&lt;script&gt;alert(1)&lt;/script&gt; <h2>Intro</h2>")
+    assert html.startswith("&lt;script&gt;alert(1)&lt;/script&gt; <h2")
+    assert "<script>" not in html